@@ -0,0 +1,70 @@
+"""
+Micro-benchmark: per-request overhead of a fresh client vs. a shared pooled client.
+
+Usage:
+    python -m benchmarks.bench_client_reuse --requests 500
+"""
+
+import argparse
+import time
+
+from benchmarks.mock_server import MockServer
+from llmbatch.models.schemas import Body, OpenAIBatch
+from llmbatch.pipelines.inference import process_request
+from llmbatch.services.openai_service import OpenAIService
+
+
+def _request(i: int) -> OpenAIBatch:
+    return OpenAIBatch(
+        custom_id=f"bench{i}_rep00",
+        body=Body(
+            messages=[{"role": "user", "content": "ping"}],
+            model="mock",
+            temperature=0.0,
+            max_tokens=8,
+        ),
+    )
+
+
+def bench_fresh_client(n: int, base_url: str) -> float:
+    start = time.perf_counter()
+    for i in range(n):
+        service = OpenAIService(base_url=base_url)
+        process_request(_request(i), "bench", service=service)
+        service.close()
+    return (time.perf_counter() - start) / n
+
+
+def bench_shared_client(n: int, base_url: str) -> float:
+    service = OpenAIService(base_url=base_url)
+    start = time.perf_counter()
+    for i in range(n):
+        process_request(_request(i), "bench", service=service)
+    elapsed = time.perf_counter() - start
+    service.close()
+    return elapsed / n
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    with MockServer() as server:
+        # Warm up imports and the server before timing anything.
+        bench_shared_client(10, server.url)
+        server.connections.clear()
+        fresh = bench_fresh_client(args.requests, server.url)
+        fresh_connections = len(server.connections)
+        server.connections.clear()
+        shared = bench_shared_client(args.requests, server.url)
+        shared_connections = len(server.connections)
+
+    print(f"requests:            {args.requests}")
+    print(f"fresh client/request {fresh * 1000:8.3f} ms  ({fresh_connections} conns)")
+    print(f"shared pooled client {shared * 1000:8.3f} ms  ({shared_connections} conns)")
+    print(f"overhead saved       {(fresh - shared) * 1000:8.3f} ms/request")
+
+
+if __name__ == "__main__":
+    main()
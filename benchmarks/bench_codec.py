@@ -0,0 +1,99 @@
+"""
+Benchmark: JSONL write/read throughput of the stdlib path vs. `llmbatch.utils.codec`.
+
+Usage:
+    python -m benchmarks.bench_codec --requests 2000 --image-kb 200
+"""
+
+import argparse
+import base64
+import json
+import os
+import tempfile
+import time
+
+from llmbatch.models.schemas import Body, OpenAIBatch
+from llmbatch.utils import codec
+
+
+def make_batch(n: int, image_kb: int) -> list[OpenAIBatch]:
+    image = base64.b64encode(os.urandom(image_kb * 768)).decode("ascii")
+    items = []
+    for i in range(n):
+        content: list[dict] = [{"type": "text", "text": f"Question {i}: describe."}]
+        if image_kb:
+            content.append(
+                {
+                    "type": "image_url",
+                    "image_url": {"url": f"data:image/jpeg;base64,{image}"},
+                }
+            )
+        items.append(
+            OpenAIBatch(
+                custom_id=f"q{i}_rep00",
+                body=Body(
+                    messages=[
+                        {"role": "system", "content": "You are a helpful assistant."},
+                        {"role": "user", "content": content},
+                    ],
+                    model="gemma2:2b",
+                    temperature=0.7,
+                    max_tokens=512,
+                ),
+            )
+        )
+    return items
+
+
+def write_stdlib(items: list[OpenAIBatch], path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for item in items:
+            f.write(json.dumps(item.model_dump(), ensure_ascii=False) + "\n")
+
+
+def write_codec(items: list[OpenAIBatch], path: str) -> None:
+    with open(path, "wb") as f:
+        for item in items:
+            f.write(codec.dump_model(item) + b"\n")
+
+
+def read_stdlib(path: str) -> int:
+    with open(path, "r", encoding="utf-8") as f:
+        return sum(1 for line in f if json.loads(line))
+
+
+def read_codec(path: str) -> int:
+    with open(path, "rb") as f:
+        return sum(1 for line in f if codec.loads(line))
+
+
+def timed(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--image-kb", type=int, default=200)
+    args = parser.parse_args()
+
+    items = make_batch(args.requests, args.image_kb)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "batch.jsonl")
+        results = {
+            "write stdlib": timed(write_stdlib, items, path),
+            "write codec": timed(write_codec, items, path),
+        }
+        size_mb = os.path.getsize(path) / 1e6
+        results["read stdlib"] = timed(read_stdlib, path)
+        results["read codec"] = timed(read_codec, path)
+
+    print(f"backend: {codec.BACKEND}, file: {size_mb:.1f} MB, lines: {args.requests}")
+    for name, elapsed in results.items():
+        print(f"{name:<13} {elapsed:7.3f} s  {size_mb / elapsed:8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Benchmark: end-to-end `create` -> `run` -> `parse` against the local mock server.
+
+Every command runs in its own process, so the reported peak RSS is that of the
+command alone; the `startup` row (`llm-batch --help`) is the cost of starting
+the CLI before a command's module is imported (see `bench_startup`). `run`
+latencies are measured by the mock server. Inputs are generated from a fixed
+seed, so runs with the same arguments are comparable; `--json` saves the results
+for comparison across commits.
+
+Usage:
+    python -m benchmarks.bench_e2e --questions 2000 --concurrency 16 --latency 0.05
+    python -m benchmarks.bench_e2e --questions 500 --images 20 --workers 4
+"""
+
+import argparse
+import glob
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.mock_server import MockServer
+from benchmarks.synthetic import write_config, write_images, write_questions
+
+CLI = [sys.executable, "-c", "from llmbatch.cli import cli; cli()"]
+
+
+def run_command(args: list[str]) -> tuple[float, float]:
+    """Run a CLI command; return its wall time in seconds and peak RSS in MB."""
+    with tempfile.TemporaryFile() as stderr:
+        start = time.perf_counter()
+        process = subprocess.Popen(CLI + args, stdout=subprocess.DEVNULL, stderr=stderr)
+        _, status, rusage = os.wait4(process.pid, 0)
+        elapsed = time.perf_counter() - start
+        process.returncode = os.waitstatus_to_exitcode(status)
+        if process.returncode:
+            stderr.seek(0)
+            message = stderr.read().decode("utf-8", "replace")
+            raise RuntimeError(f"Command failed: {args}\n{message}")
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return elapsed, rusage.ru_maxrss / divisor
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def bench_once(args: argparse.Namespace, workdir: str, server: MockServer) -> dict:
+    image_paths = None
+    if args.images:
+        image_paths = write_images(
+            os.path.join(workdir, "images"), args.images, tuple(args.image_size)
+        )
+    questions = write_questions(
+        os.path.join(workdir, "questions.csv"),
+        args.questions,
+        image_paths=image_paths,
+    )
+    config = write_config(
+        os.path.join(workdir, "config.yaml"),
+        max_tokens=args.max_tokens,
+        n_answers=args.n_answers,
+    )
+    requests = args.questions * args.n_answers
+    results: dict[str, dict] = {}
+
+    # Interpreter start-up and CLI import, included in every command below
+    seconds, rss = run_command(["--help"])
+    results["startup"] = {"seconds": seconds, "items_per_s": 0.0, "peak_rss_mb": rss}
+
+    batch = os.path.join(workdir, "batch.jsonl")
+    seconds, rss = run_command(
+        ["create", questions, config, batch, "--workers", str(args.workers)]
+    )
+    results["create"] = {"seconds": seconds, "items_per_s": requests / seconds}
+    results["create"]["peak_rss_mb"] = rss
+
+    output_dir = os.path.join(workdir, "output")
+    os.makedirs(output_dir)
+    server.durations.clear()
+    seconds, rss = run_command(
+        [
+            "run",
+            batch,
+            "--output-dir",
+            output_dir,
+            "--base-url",
+            server.url,
+            "--concurrency",
+            str(args.concurrency),
+            "--max-attempts",
+            "1",
+        ]
+    )
+    durations = list(server.durations)
+    results["run"] = {
+        "seconds": seconds,
+        "items_per_s": requests / seconds,
+        "peak_rss_mb": rss,
+        "latency_p50_ms": percentile(durations, 0.50) * 1000,
+        "latency_p95_ms": percentile(durations, 0.95) * 1000,
+        "latency_p99_ms": percentile(durations, 0.99) * 1000,
+    }
+
+    (output,) = glob.glob(os.path.join(output_dir, "*_output.jsonl"))
+    seconds, rss = run_command(
+        ["parse", output, os.path.join(workdir, "parsed"), "--format", args.format]
+    )
+    results["parse"] = {
+        "seconds": seconds,
+        "items_per_s": requests / seconds,
+        "peak_rss_mb": rss,
+    }
+    return results
+
+
+def median_results(runs: list[dict]) -> dict:
+    return {
+        command: {
+            metric: statistics.median(run[command][metric] for run in runs)
+            for metric in runs[0][command]
+        }
+        for command in runs[0]
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--questions", type=int, default=1000)
+    parser.add_argument("--n-answers", type=int, default=1)
+    parser.add_argument(
+        "--images", type=int, default=0, help="Distinct images (0: text only)"
+    )
+    parser.add_argument("--image-size", type=int, nargs=2, default=(1024, 768))
+    parser.add_argument("--workers", type=int, default=1, help="create --workers")
+    parser.add_argument("--concurrency", type=int, default=8, help="run --concurrency")
+    parser.add_argument("--format", default="csv", help="parse --format")
+    parser.add_argument("--max-tokens", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--token-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--repeat", type=int, default=1, help="Report the median")
+    parser.add_argument("--json", dest="json_path", help="Save the results here")
+    args = parser.parse_args()
+
+    runs = []
+    with MockServer(
+        latency=args.latency, token_rate=args.token_rate, error_rate=args.error_rate
+    ) as server:
+        for _ in range(args.repeat):
+            with tempfile.TemporaryDirectory() as workdir:
+                runs.append(bench_once(args, workdir, server))
+    results = median_results(runs)
+
+    requests = args.questions * args.n_answers
+    print(f"{requests} requests, median of {args.repeat} run(s)")
+    print(f"{'command':<8} {'seconds':>9} {'items/s':>10} {'peak RSS MB':>12}")
+    for command, metrics in results.items():
+        rate = f"{metrics['items_per_s']:.1f}" if metrics["items_per_s"] else "-"
+        print(
+            f"{command:<8} {metrics['seconds']:>9.2f} {rate:>10} "
+            f"{metrics['peak_rss_mb']:>12.1f}"
+        )
+    run = results["run"]
+    print(
+        f"run latency (server side) p50 {run['latency_p50_ms']:.1f} ms, "
+        f"p95 {run['latency_p95_ms']:.1f} ms, p99 {run['latency_p99_ms']:.1f} ms"
+    )
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"params": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: start-up time of `llm-batch` and of every command's `--help`.
+
+`llm-batch --help` imports only the CLI entry point; a command's module (and
+the SDKs it needs) is imported when the command is looked up. Each row is the
+median of `--repeat` fresh interpreters. With `--max-seconds`, the script exits
+with an error when `llm-batch --help` is slower, so it can guard start-up time
+in CI. It also fails when the entry point, `parse` or `estimate` import an SDK.
+
+Usage:
+    python -m benchmarks.bench_startup --repeat 5
+    python -m benchmarks.bench_startup --max-seconds 0.5
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+from llmbatch.cli import COMMANDS
+
+CLI = [sys.executable, "-c", "from llmbatch.cli import cli; cli()"]
+
+# Modules that must not be imported by the CLI entry point and by commands
+# that only read files
+HEAVY_MODULES = {
+    "llmbatch.cli": ("anthropic", "openai", "instructor", "PIL", "tqdm", "pydantic"),
+    "llmbatch.commands.parse": ("anthropic", "openai"),
+    "llmbatch.commands.estimate": ("anthropic", "openai"),
+}
+
+
+def timed_help(args: list[str]) -> float:
+    start = time.perf_counter()
+    subprocess.run(CLI + args + ["--help"], check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def heavy_imports(module: str) -> list[str]:
+    """Heavy modules loaded by importing `module` in a fresh interpreter."""
+    code = (
+        f"import sys, {module}; "
+        f"print(' '.join(m for m in {HEAVY_MODULES[module]!r} if m in sys.modules))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    )
+    return output.stdout.split()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--max-seconds", type=float, help="Fail if `llm-batch --help` is slower"
+    )
+    args = parser.parse_args()
+
+    results = {
+        "llm-batch": statistics.median(timed_help([]) for _ in range(args.repeat))
+    }
+    for name in COMMANDS:
+        results[name] = statistics.median(
+            timed_help([name]) for _ in range(args.repeat)
+        )
+
+    for name, elapsed in results.items():
+        print(f"{name:<17} --help {elapsed:7.3f} s")
+    heavy = {module: heavy_imports(module) for module in HEAVY_MODULES}
+    for module, imported in heavy.items():
+        print(f"heavy modules imported by {module}: {', '.join(imported) or 'none'}")
+
+    offenders = [
+        f"{module} imports {', '.join(imported)}"
+        for module, imported in heavy.items()
+        if imported
+    ]
+    if offenders:
+        sys.exit("; ".join(offenders))
+    if args.max_seconds is not None and results["llm-batch"] > args.max_seconds:
+        sys.exit(
+            f"llm-batch --help took {results['llm-batch']:.3f} s "
+            f"(limit {args.max_seconds} s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
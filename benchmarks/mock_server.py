@@ -0,0 +1,216 @@
+"""
+Minimal OpenAI-compatible chat completions server for local benchmarks.
+
+Each response takes `latency` seconds plus `max_tokens / token_rate` seconds of
+simulated generation, and a fraction `error_rate` of requests fails with
+`error_status`. Requests with `"stream": true` receive one server-sent event per
+token as it is generated. Request durations are recorded in
+`MockServer.durations`.
+
+Usage:
+    python -m benchmarks.mock_server --port 11434 --latency 0.05 --token-rate 200
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from uuid import uuid4
+
+
+def _completion(model: str, content: str, completion_tokens: int = 2) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content},
+            }
+        ],
+        "usage": {
+            "prompt_tokens": 8,
+            "completion_tokens": completion_tokens,
+            "total_tokens": 8 + completion_tokens,
+        },
+    }
+
+
+def _chunk(completion_id: str, model: str, delta: dict, finish_reason=None) -> dict:
+    return {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    wbufsize = 1 << 16
+    server: "MockServer"
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_event(self, payload: dict | str) -> None:
+        data = payload if isinstance(payload, str) else json.dumps(payload)
+        event = f"data: {data}\n\n".encode("utf-8")
+        self.wfile.write(f"{len(event):x}\r\n".encode("ascii") + event + b"\r\n")
+        self.wfile.flush()
+
+    def _stream(self, model: str, tokens: int) -> None:
+        server = self.server
+        completion_id = f"chatcmpl-{uuid4().hex}"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        if server.latency:
+            time.sleep(server.latency)
+        self._send_event(_chunk(completion_id, model, {"role": "assistant"}))
+        for i in range(tokens):
+            if server.token_rate:
+                time.sleep(1 / server.token_rate)
+            content = "ok" if i == 0 else " ok"
+            self._send_event(_chunk(completion_id, model, {"content": content}))
+        self._send_event(_chunk(completion_id, model, {}, "stop"))
+        usage = _completion(model, "", tokens)["usage"]
+        self._send_event(
+            {**_chunk(completion_id, model, {}), "choices": [], "usage": usage}
+        )
+        self._send_event("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(
+                200, {"object": "list", "data": [{"id": "mock", "object": "model"}]}
+            )
+        else:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self) -> None:
+        start = time.perf_counter()
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        self.server.connections.add(self.client_address)
+        server = self.server
+        if server.error_rate and server.random() < server.error_rate:
+            if server.latency:
+                time.sleep(server.latency)
+            self._send_json(
+                server.error_status,
+                {"error": {"message": "Injected error", "type": "server_error"}},
+            )
+            return
+        tokens = int(request.get("max_tokens") or 2)
+        model = request.get("model", "mock")
+        if request.get("stream"):
+            self._stream(model, tokens)
+            server.record(time.perf_counter() - start)
+            return
+        delay = server.latency + (
+            tokens / server.token_rate if server.token_rate else 0
+        )
+        if delay:
+            time.sleep(delay)
+        self._send_json(200, _completion(model, " ".join(["ok"] * tokens), tokens))
+        server.record(time.perf_counter() - start)
+
+
+class MockServer(ThreadingHTTPServer):
+    """Threaded mock server that can be used as a context manager."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        token_rate: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        seed: int = 0,
+    ):
+        super().__init__((host, port), MockHandler)
+        self.latency = latency
+        self.token_rate = token_rate
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.connections: set[tuple[str, int]] = set()
+        self.durations: list[float] = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def random(self) -> float:
+        with self._lock:
+            return self._random.random()
+
+    def record(self, duration: float) -> None:
+        with self._lock:
+            self.durations.append(duration)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1/"
+
+    def __enter__(self) -> "MockServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument(
+        "--token-rate",
+        type=float,
+        default=0.0,
+        help="Simulated generation speed in tokens per second (0: instant)",
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = MockServer(
+        args.host,
+        args.port,
+        latency=args.latency,
+        token_rate=args.token_rate,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=args.seed,
+    )
+    print(f"Serving mock chat completions on {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
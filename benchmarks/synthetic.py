@@ -0,0 +1,124 @@
+"""
+Synthetic inputs for benchmarks: question files, images and a matching config.
+
+Usage:
+    python -m benchmarks.synthetic OUTPUT_DIR --questions 1000 --images 20
+"""
+
+import argparse
+import csv
+import os
+import random
+
+import yaml
+from PIL import Image
+
+WORDS = (
+    "what which how why describe explain compare list the a of in on for with "
+    "model image object scene colour shape size effect cause result person "
+    "animal building road tree sky water light shadow text number"
+).split()
+
+
+def write_images(image_dir: str, count: int, size: tuple[int, int], seed: int = 0):
+    """Write `count` random-noise JPEGs, which compress about as badly as photos."""
+    os.makedirs(image_dir, exist_ok=True)
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        image = Image.frombytes("RGB", size, rng.randbytes(size[0] * size[1] * 3))
+        path = os.path.join(image_dir, f"image_{i:04d}.jpg")
+        image.save(path, quality=90)
+        paths.append(path)
+    return paths
+
+
+def write_questions(
+    path: str,
+    count: int,
+    words: int = 40,
+    image_paths: list[str] | None = None,
+    seed: int = 0,
+) -> str:
+    """Write a questions CSV; with `image_paths`, questions cycle through them."""
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        fieldnames = ["question_id", "question"]
+        if image_paths:
+            fieldnames.append("image_path")
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        for i in range(count):
+            row = {
+                "question_id": f"q{i}",
+                "question": " ".join(rng.choices(WORDS, k=words)) + "?",
+            }
+            if image_paths:
+                row["image_path"] = image_paths[i % len(image_paths)]
+            writer.writerow(row)
+    return path
+
+
+def write_config(
+    path: str,
+    format: str = "openai",
+    model: str = "mock",
+    max_tokens: int = 64,
+    n_answers: int = 1,
+    temperature: float = 0.7,
+) -> str:
+    config = {
+        "format": format,
+        "n_answers": n_answers,
+        "system_message": "You are a helpful assistant.",
+        "params": {
+            "model": model,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        },
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(config, f)
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("output_dir")
+    parser.add_argument("--questions", type=int, default=1000)
+    parser.add_argument("--words", type=int, default=40)
+    parser.add_argument(
+        "--images", type=int, default=0, help="Distinct images (0: text only)"
+    )
+    parser.add_argument("--image-size", type=int, nargs=2, default=(1024, 768))
+    parser.add_argument("--max-tokens", type=int, default=64)
+    parser.add_argument("--n-answers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    image_paths = None
+    if args.images:
+        image_paths = write_images(
+            os.path.join(args.output_dir, "images"),
+            args.images,
+            tuple(args.image_size),
+            args.seed,
+        )
+    questions = write_questions(
+        os.path.join(args.output_dir, "questions.csv"),
+        args.questions,
+        args.words,
+        image_paths,
+        args.seed,
+    )
+    config = write_config(
+        os.path.join(args.output_dir, "config.yaml"),
+        max_tokens=args.max_tokens,
+        n_answers=args.n_answers,
+    )
+    print(f"Wrote {questions} and {config}")
+
+
+if __name__ == "__main__":
+    main()
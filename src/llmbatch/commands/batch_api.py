@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import os
+
+import click
+from anthropic import Anthropic
+from anthropic.types.messages.batch_create_params import Request
+
+from llmbatch.commands.options import configure_logging, verbose_option
+from llmbatch.pipelines.batch_api import run_anthropic_batches, run_openai_batches
+from llmbatch.pipelines.shard import (
+    PROVIDER_LIMITS,
+    iter_line_chunks,
+    iter_request_chunks,
+    resolve_batch_files,
+)
+from llmbatch.services.anthropic_service import AsyncAnthropicBatchService
+from llmbatch.services.openai_service import AsyncOpenAIBatchService
+
+logger = logging.getLogger(__name__)
+
+
+def _echo_submitted(batch_id: str, num_requests: int) -> None:
+    # Printed rather than logged: the ID is needed to look up or cancel the batch
+    click.echo(f"Submitted batch {batch_id} with {num_requests} requests")
+
+
+@click.command(
+    name="run-anthropic",
+    short_help="Run a batch through the Anthropic Message Batches API.",
+)
+@click.argument("file_path", type=click.Path(exists=True))
+@click.option(
+    "--wait",
+    is_flag=True,
+    default=False,
+    help="Wait for the batches to end and download their results",
+)
+@click.option(
+    "--output-dir",
+    type=click.Path(file_okay=False),
+    default=".",
+    help="Directory for the results file (with --wait)",
+)
+@click.option(
+    "--poll-interval",
+    type=click.FloatRange(min=0, min_open=True),
+    default=10.0,
+    help="Initial seconds between status checks; grows up to 5 minutes",
+)
+@click.option(
+    "--base-url",
+    default=None,
+    help="Base URL of the Anthropic API (default: the official endpoint)",
+)
+@verbose_option
+def run_anthropic(
+    file_path: str,
+    wait: bool,
+    output_dir: str,
+    poll_interval: float,
+    base_url: str | None,
+    verbose: bool,
+) -> None:
+    """
+    Run a batch of Anthropic requests from a JSONL file or a shard manifest.
+    Inputs above the Message Batches limits are submitted as several batches.
+    """
+    configure_logging(verbose)
+    max_requests, max_bytes = PROVIDER_LIMITS["anthropic"]
+    chunks = iter_request_chunks(
+        resolve_batch_files(file_path), max_requests, max_bytes
+    )
+
+    if not wait:
+        anthropic_client = Anthropic(
+            api_key=os.getenv("ANTHROPIC_API_KEY"), base_url=base_url
+        )
+        for chunk in chunks:
+            requests = [Request(**item) for item in chunk]
+            message_batch = anthropic_client.messages.batches.create(requests=requests)
+            _echo_submitted(message_batch.id, len(requests))
+        return
+
+    os.makedirs(output_dir, exist_ok=True)
+    input_stem = os.path.splitext(os.path.basename(file_path))[0]
+    output_path = os.path.join(
+        output_dir, f"{input_stem.removesuffix('_manifest')}_output.jsonl"
+    )
+
+    async def execute() -> None:
+        service = AsyncAnthropicBatchService(
+            base_url=base_url, poll_interval=poll_interval
+        )
+        try:
+            batches = await run_anthropic_batches(
+                chunks, output_path, service, on_submit=_echo_submitted
+            )
+        finally:
+            await service.close()
+        succeeded = sum(batch.request_counts.succeeded for batch in batches)
+        total = sum(
+            sum(batch.request_counts.model_dump().values()) for batch in batches
+        )
+        click.echo(f"{succeeded} of {total} requests succeeded")
+
+    asyncio.run(execute())
+    click.echo(f"Results saved to {output_path}")
+
+
+@click.command(
+    name="run-openai-batch",
+    short_help="Run a batch through the OpenAI Batch API.",
+)
+@click.argument("file_path", type=click.Path(exists=True))
+@click.option(
+    "--output-dir",
+    type=click.Path(file_okay=False),
+    default=".",
+    help="Directory for the results file",
+)
+@click.option(
+    "--poll-interval",
+    type=click.FloatRange(min=0, min_open=True),
+    default=10.0,
+    help="Initial seconds between status checks; grows up to 5 minutes",
+)
+@click.option(
+    "--base-url",
+    default=None,
+    help="Base URL of the OpenAI API (default: the official endpoint)",
+)
+@verbose_option
+def run_openai_batch(
+    file_path: str,
+    output_dir: str,
+    poll_interval: float,
+    base_url: str | None,
+    verbose: bool,
+) -> None:
+    """
+    Run a batch of OpenAI requests from a JSONL file or a shard manifest through the Batch API.
+    Waits for the batches to finish and saves the results in the same layout as `run`.
+    Requires an OPENAI_API_KEY environment variable.
+    """
+    configure_logging(verbose)
+    max_requests, max_bytes = PROVIDER_LIMITS["openai"]
+    chunks = iter_line_chunks(resolve_batch_files(file_path), max_requests, max_bytes)
+
+    os.makedirs(output_dir, exist_ok=True)
+    input_stem = os.path.splitext(os.path.basename(file_path))[0]
+    input_stem = input_stem.removesuffix("_manifest")
+    output_path = os.path.join(output_dir, f"{input_stem}_output.jsonl")
+
+    async def execute() -> None:
+        service = AsyncOpenAIBatchService(
+            base_url=base_url, poll_interval=poll_interval
+        )
+        try:
+            batches = await run_openai_batches(
+                chunks,
+                output_path,
+                service,
+                filename=f"{input_stem}.jsonl",
+                on_submit=_echo_submitted,
+            )
+        finally:
+            await service.close()
+        completed = sum(
+            batch.request_counts.completed for batch in batches if batch.request_counts
+        )
+        total = sum(
+            batch.request_counts.total for batch in batches if batch.request_counts
+        )
+        click.echo(f"{completed} of {total} requests completed")
+
+    asyncio.run(execute())
+    click.echo(f"Results saved to {output_path}")
@@ -0,0 +1,165 @@
+import logging
+import os
+from uuid import uuid4
+
+import click
+
+from llmbatch.pipelines.estimate import estimate_batch, format_report, project
+from llmbatch.pipelines.pre import create_batch_generator, create_batch_parallel
+from llmbatch.pipelines.shard import (
+    manifest_path_for,
+    resolve_batch_files,
+    write_sharded_jsonl,
+)
+from llmbatch.utils.general import (
+    load_config,
+    load_questions_generator,
+    write_jsonl,
+)
+from llmbatch.utils.images import configure_image_cache
+
+logger = logging.getLogger(__name__)
+
+
+@click.command(
+    name="create",
+    short_help="Create a batch of requests from a CSV, JSON or JSONL file.",
+)
+@click.argument("input_path", type=click.Path(exists=True))
+@click.argument("config_file", type=click.Path(exists=True))
+@click.argument("output_path", type=click.Path(exists=False))
+@click.option(
+    "--image-cache-dir",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="Directory for encoded images, reused across runs",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of processes building request bodies (useful for image inputs)",
+)
+@click.option(
+    "--shard",
+    is_flag=True,
+    default=False,
+    help="Split the output into shards within the provider's batch limits and "
+    "write a manifest listing them",
+)
+@click.option(
+    "--max-requests-per-shard",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Maximum requests per shard (implies --shard)",
+)
+@click.option(
+    "--max-shard-bytes",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Maximum size of a shard in bytes (implies --shard)",
+)
+@click.option(
+    "--estimate",
+    "show_estimate",
+    is_flag=True,
+    default=False,
+    help="Print token estimates of the created batch (see `llm-batch estimate`)",
+)
+def create(
+    input_path: str,
+    config_file: str,
+    output_path: str,
+    image_cache_dir: str | None,
+    workers: int,
+    shard: bool,
+    max_requests_per_shard: int | None,
+    max_shard_bytes: int | None,
+    show_estimate: bool,
+) -> str:
+    """
+    Create a batch of requests from a CSV file with question_id and question columns and save the results as a JSONL file.
+    JSON (array) and JSONL inputs with the same fields are also accepted; all of them are streamed.
+    The config file must be in .csv format.
+    """
+    config = load_config(config_file)
+    image_cache = configure_image_cache(cache_dir=image_cache_dir)
+    used_kwargs = config.params.model_dump()
+    # Handle response_model unpacking if present in config
+    if config.json_schema:
+        if config.format == "openai":
+            used_kwargs["response_format"] = {
+                "type": "json_schema",
+                "json_schema": config.json_schema,
+            }
+        elif config.format == "anthropic":
+            used_kwargs["tools"] = [
+                {
+                    "name": config.json_schema.get("name", "response_model"),
+                    "description": "Respond with a JSON object describing an action with its positive and negative effects.",
+                    "input_schema": config.json_schema.get("schema", {}),
+                }
+            ]
+            used_kwargs["tool_choice"] = {
+                "type": "tool",
+                "name": config.json_schema.get("name", "response_model"),
+            }
+
+    questions = load_questions_generator(input_path)
+    if workers > 1:
+        batch_content = create_batch_parallel(
+            questions=questions,
+            format=config.format,
+            n_answers=config.n_answers,
+            system_message=getattr(config, "system_message", None),
+            image_first=config.image_first,
+            workers=workers,
+            image_cache_dir=image_cache_dir,
+            **used_kwargs,
+        )
+    else:
+        batch_content = create_batch_generator(
+            questions=questions,
+            format=config.format,
+            n_answers=config.n_answers,
+            system_message=getattr(config, "system_message", None),
+            image_first=config.image_first,
+            **used_kwargs,
+        )
+
+    if os.path.isdir(output_path):
+        os.makedirs(output_path, exist_ok=True)
+        batch_id = str(uuid4().hex)
+        output_file = os.path.join(output_path, f"batch_{batch_id}.jsonl")
+    else:
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        output_file = output_path
+
+    if shard or max_requests_per_shard or max_shard_bytes:
+        manifest = write_sharded_jsonl(
+            batch_content,
+            output_file,
+            config.format,
+            max_requests_per_shard,
+            max_shard_bytes,
+        )
+        count = manifest.total_requests
+        output_file = manifest_path_for(output_file)
+        logger.info("Split batch into %d shards", len(manifest.shards))
+    else:
+        count = write_jsonl(batch_content, output_file)
+
+    logger.info("Created batch with %d items", count)
+    if workers == 1:
+        logger.info(
+            "Image cache: %d hits, %d misses", image_cache.hits, image_cache.misses
+        )
+    logger.info("Batch saved to %s", output_file)
+    if show_estimate:
+        batch_estimate = estimate_batch(resolve_batch_files(output_file))
+        for line in format_report(batch_estimate, project(batch_estimate)):
+            click.echo(line)
+
+    return f"Batch file saved to {output_file}"
@@ -0,0 +1,98 @@
+import json
+
+import click
+
+from llmbatch.pipelines.estimate import (
+    estimate_batch,
+    format_report,
+    project,
+    throughput_from_metrics,
+)
+from llmbatch.pipelines.shard import resolve_batch_files
+from llmbatch.utils.tokens import Provider
+
+
+@click.command(
+    name="estimate",
+    short_help="Estimate the tokens, cost and runtime of a batch.",
+)
+@click.argument("file_path", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--provider",
+    type=click.Choice(["openai", "anthropic"]),
+    default=None,
+    help="Provider whose image token rules apply (default: from the batch format)",
+)
+@click.option(
+    "--context-window",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Context window of the model in tokens (default: looked up by model name)",
+)
+@click.option(
+    "--input-price",
+    type=click.FloatRange(min=0),
+    default=None,
+    help="Price in USD per million prompt tokens",
+)
+@click.option(
+    "--output-price",
+    type=click.FloatRange(min=0),
+    default=None,
+    help="Price in USD per million completion tokens",
+)
+@click.option(
+    "--tokens-per-s",
+    type=click.FloatRange(min=0, min_open=True),
+    default=None,
+    help="Completion tokens per second of the whole server, to project the runtime",
+)
+@click.option(
+    "--metrics-file",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="JSON metrics of an earlier `run --metrics-file`; its measured throughput "
+    "and completion length project the runtime and cost",
+)
+@click.option(
+    "--json", "as_json", is_flag=True, default=False, help="Print the report as JSON"
+)
+def estimate(
+    file_path: str,
+    provider: Provider | None,
+    context_window: int | None,
+    input_price: float | None,
+    output_price: float | None,
+    tokens_per_s: float | None,
+    metrics_file: str | None,
+    as_json: bool,
+) -> None:
+    """
+    Estimate the tokens, cost and runtime of a batch JSONL file (or shard manifest) before running it.
+    Requests that do not fit into the model's context window are flagged.
+    """
+    completion_tokens_per_request = None
+    if metrics_file:
+        try:
+            measured_rate, completion_tokens_per_request = throughput_from_metrics(
+                metrics_file
+            )
+        except (KeyError, ValueError) as e:
+            raise click.BadParameter(str(e), param_hint="--metrics-file")
+        tokens_per_s = tokens_per_s or measured_rate
+
+    batch_estimate = estimate_batch(
+        resolve_batch_files(file_path), provider, context_window
+    )
+    projection = project(
+        batch_estimate,
+        input_price,
+        output_price,
+        tokens_per_s,
+        completion_tokens_per_request,
+    )
+    if as_json:
+        click.echo(json.dumps({**batch_estimate.summary(), **projection}, indent=2))
+    else:
+        for line in format_report(batch_estimate, projection):
+            click.echo(line)
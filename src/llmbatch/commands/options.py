@@ -0,0 +1,15 @@
+import logging
+
+import click
+
+verbose_option = click.option(
+    "--verbose", "-v", is_flag=True, default=False, help="Enable verbose logging"
+)
+
+
+def configure_logging(verbose: bool) -> None:
+    logging.basicConfig(
+        level=logging.INFO if verbose else logging.WARNING,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        handlers=[logging.StreamHandler()],
+    )
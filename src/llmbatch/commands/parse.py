@@ -0,0 +1,59 @@
+import logging
+import os
+
+import click
+
+from llmbatch.pipelines.export import (
+    DEFAULT_CHUNK_SIZE,
+    FILE_EXTENSIONS,
+    OUTPUT_FORMATS,
+    OutputFormat,
+    export_results,
+)
+from llmbatch.pipelines.post import iter_batch_jsonl
+
+logger = logging.getLogger(__name__)
+
+
+@click.command(
+    name="parse",
+    short_help="Parse batch responses into CSV, Parquet or Arrow.",
+)
+@click.argument("input_path", type=click.Path(exists=True))
+@click.argument(
+    "output_dir", type=click.Path(file_okay=False, exists=False), default="."
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(OUTPUT_FORMATS),
+    default="csv",
+    show_default=True,
+    help="Output format; parquet and arrow require pyarrow",
+)
+@click.option(
+    "--chunk-size",
+    type=click.IntRange(min=1),
+    default=DEFAULT_CHUNK_SIZE,
+    show_default=True,
+    help="Rows per Parquet row group / Arrow record batch",
+)
+def parse(
+    input_path: str, output_dir: str, output_format: OutputFormat, chunk_size: int
+) -> str:
+    """
+    Parse a batch of responses from a JSONL file and save the results as a CSV, Parquet or Arrow file.
+    """
+    models = iter_batch_jsonl(input_path)
+    input_filename = os.path.splitext(os.path.basename(input_path))[0]
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(
+        output_dir, f"{input_filename}{FILE_EXTENSIONS[output_format]}"
+    )
+
+    try:
+        export_results(models, output_path, output_format, chunk_size)
+    except ImportError as e:
+        raise click.ClickException(str(e)) from e
+
+    return f"File saved to {output_path}"
@@ -0,0 +1,629 @@
+import asyncio
+import contextlib
+import logging
+import os
+from typing import Any, AsyncIterator, Callable
+from uuid import uuid4
+
+import click
+from tqdm import tqdm
+
+from llmbatch.commands.options import configure_logging, verbose_option
+from llmbatch.models.responses import BatchResponse
+from llmbatch.models.schemas import FailedRequest
+from llmbatch.pipelines.inference import load_resume_state, run_batch
+from llmbatch.pipelines.metrics import MetricsCollector
+from llmbatch.pipelines.retry import DEFAULT_MAX_ATTEMPTS, RetryPolicy
+from llmbatch.pipelines.schedule import (
+    SCHEDULE_POLICIES,
+    Schedule,
+    SchedulePolicy,
+    plan_schedule,
+    prefix_stats,
+)
+from llmbatch.pipelines.work_queue import WorkQueue, run_worker
+from llmbatch.services.endpoint_pool import (
+    BASE_URLS_ENV,
+    AsyncEndpointPool,
+    base_urls_from_env,
+)
+from llmbatch.services.openai_service import DEFAULT_BASE_URL, AsyncOpenAIService
+from llmbatch.services.rate_limiter import RateLimiter
+from llmbatch.utils.response_cache import ResponseCache
+from llmbatch.utils.writer import FSYNC_POLICIES, JsonlWriter, forward_sigterm
+
+logger = logging.getLogger(__name__)
+
+
+def _create_service(
+    base_urls: tuple[str, ...],
+    concurrency: int,
+    max_connections: int | None,
+    timeout: float,
+    http2: bool = False,
+) -> AsyncOpenAIService | AsyncEndpointPool:
+    urls = list(base_urls) or base_urls_from_env() or [DEFAULT_BASE_URL]
+    service_kwargs = dict(
+        max_connections=max_connections or concurrency,
+        timeout=timeout,
+        http2=http2,
+        # Retries are handled by the retry policy and the rate limiter
+        max_retries=0,
+    )
+    if len(urls) > 1:
+        return AsyncEndpointPool(urls, **service_kwargs)
+    return AsyncOpenAIService(base_url=urls[0], **service_kwargs)
+
+
+def _retry_policy(max_attempts: int | None, retry_base_delay: float) -> RetryPolicy:
+    retry_policy = RetryPolicy(base_delay=retry_base_delay)
+    if max_attempts is not None:
+        retry_policy.max_attempts = dict.fromkeys(DEFAULT_MAX_ATTEMPTS, max_attempts)
+    return retry_policy
+
+
+_WORKER_OPTIONS = [
+    click.option(
+        "--concurrency",
+        type=click.IntRange(min=1),
+        default=1,
+        help="Maximum number of requests in flight at once",
+    ),
+    click.option(
+        "--base-url",
+        "base_urls",
+        multiple=True,
+        help="Base URL of an OpenAI-compatible server; repeat to balance requests "
+        f"over several servers (default: ${BASE_URLS_ENV} or {DEFAULT_BASE_URL})",
+    ),
+    click.option(
+        "--max-connections",
+        type=click.IntRange(min=1),
+        default=None,
+        help="Size of the keep-alive connection pool (default: --concurrency)",
+    ),
+    click.option(
+        "--timeout", type=float, default=600.0, help="Request timeout in seconds"
+    ),
+    click.option(
+        "--http2",
+        is_flag=True,
+        default=False,
+        help="Use HTTP/2 for remote endpoints (requires the 'h2' package)",
+    ),
+    click.option(
+        "--stream",
+        is_flag=True,
+        default=False,
+        help="Stream completions to record time to first token and between tokens",
+    ),
+    click.option(
+        "--stall-timeout",
+        type=click.FloatRange(min=0, min_open=True),
+        default=None,
+        help="With --stream, abort a request after this many seconds without a chunk",
+    ),
+    click.option(
+        "--first-token-timeout",
+        type=click.FloatRange(min=0, min_open=True),
+        default=None,
+        help="With --stream, abort a request whose first token takes longer than this",
+    ),
+    click.option(
+        "--rpm",
+        type=click.FloatRange(min=0, min_open=True),
+        default=None,
+        help="Requests-per-minute limit of the provider",
+    ),
+    click.option(
+        "--tpm",
+        type=click.FloatRange(min=0, min_open=True),
+        default=None,
+        help="Tokens-per-minute limit of the provider (prompt estimate + max_tokens)",
+    ),
+    click.option(
+        "--max-attempts",
+        type=click.IntRange(min=1),
+        default=None,
+        help="Attempts per request for retryable errors (timeouts, connection and "
+        "server errors, 429s); 1 disables retries",
+    ),
+    click.option(
+        "--retry-base-delay",
+        type=click.FloatRange(min=0),
+        default=1.0,
+        show_default=True,
+        help="Base delay in seconds of the jittered exponential backoff",
+    ),
+    click.option(
+        "--dead-letter",
+        "dead_letter_path",
+        type=click.Path(dir_okay=False),
+        default=None,
+        help="File collecting requests that failed permanently "
+        "(default for `run`: next to the output file)",
+    ),
+    click.option(
+        "--cache",
+        "cache_path",
+        type=click.Path(dir_okay=False),
+        default=None,
+        help="SQLite file caching responses to deterministic (temperature 0) requests",
+    ),
+    click.option(
+        "--cache-max-mb",
+        type=click.FloatRange(min=0, min_open=True),
+        default=1024.0,
+        show_default=True,
+        help="Size of the response cache before least recently used entries are evicted",
+    ),
+    click.option(
+        "--cache-all",
+        is_flag=True,
+        default=False,
+        help="Also cache sampled (temperature > 0) requests; repetitions then share "
+        "one answer",
+    ),
+]
+
+
+def _worker_options(func: Callable[..., None]) -> Callable[..., None]:
+    """Add the options shared by `run` and `work`: servers, limits, retries, cache."""
+    for option in reversed(_WORKER_OPTIONS):
+        func = option(func)
+    return func
+
+
+def _check_worker_options(
+    stream: bool,
+    stall_timeout: float | None,
+    first_token_timeout: float | None,
+    cache_path: str | None,
+    cache_all: bool,
+) -> None:
+    if cache_all and not cache_path:
+        raise click.UsageError("--cache-all can only be used with --cache")
+    if (stall_timeout or first_token_timeout) and not stream:
+        raise click.UsageError(
+            "--stall-timeout and --first-token-timeout require --stream"
+        )
+
+
+@contextlib.asynccontextmanager
+async def _worker_kwargs(
+    concurrency: int,
+    base_urls: tuple[str, ...],
+    max_connections: int | None,
+    timeout: float,
+    http2: bool,
+    stream: bool,
+    stall_timeout: float | None,
+    first_token_timeout: float | None,
+    rpm: float | None,
+    tpm: float | None,
+    max_attempts: int | None,
+    retry_base_delay: float,
+    cache_path: str | None,
+    cache_max_mb: float,
+    cache_all: bool,
+    on_failure: Callable[[FailedRequest], None] | None,
+) -> AsyncIterator[dict[str, Any]]:
+    """
+    Yield the `run_batch` arguments for the shared options, then close them.
+
+    The cache and rate limiter statistics are logged when the run completes.
+    """
+    rate_limiter = None
+    if rpm or tpm:
+        rate_limiter = RateLimiter(rpm=rpm, tpm=tpm, max_concurrency=concurrency)
+    service = _create_service(base_urls, concurrency, max_connections, timeout, http2)
+    cache = None
+    if cache_path:
+        cache = ResponseCache(
+            cache_path,
+            max_bytes=int(cache_max_mb * 1024 * 1024),
+            cache_all=cache_all,
+        )
+    try:
+        yield dict(
+            concurrency=concurrency,
+            service=service,
+            rate_limiter=rate_limiter,
+            retry_policy=_retry_policy(max_attempts, retry_base_delay),
+            on_failure=on_failure,
+            cache=cache,
+            stream=stream,
+            stall_timeout=stall_timeout,
+            first_token_timeout=first_token_timeout,
+        )
+    finally:
+        await service.close()
+        if cache is not None:
+            cache.close()
+    if cache is not None:
+        logger.info(
+            "Response cache: %d hits, %d misses, %d evictions",
+            cache.hits,
+            cache.misses,
+            cache.evictions,
+        )
+    if rate_limiter and rate_limiter.throttled:
+        logger.info("Provider rate limited %d requests", rate_limiter.throttled)
+
+
+@click.command(
+    name="run",
+    short_help="Run a batch through OpenAI-compatible servers.",
+)
+@click.argument("file_path", type=click.Path(exists=True))
+@click.option(
+    "--interval",
+    type=click.IntRange(min=1),
+    default=100,
+    help="Flush the output file at least every this many responses",
+)
+@click.option(
+    "--flush-seconds",
+    type=click.FloatRange(min=0, min_open=True),
+    default=5.0,
+    show_default=True,
+    help="Flush the output file at least this often",
+)
+@click.option(
+    "--flush-bytes",
+    type=click.IntRange(min=1),
+    default=1 << 20,
+    show_default=True,
+    help="Flush the output file once this many bytes are buffered",
+)
+@click.option(
+    "--fsync",
+    type=click.Choice(FSYNC_POLICIES),
+    default="flush",
+    show_default=True,
+    help="When to fsync the output file: on every flush, when closing it, or never",
+)
+@_worker_options
+@click.option(
+    "--output-dir", type=click.Path(file_okay=False, exists=True), default="."
+)
+@click.option(
+    "--resume",
+    "resume_path",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="Output file of an interrupted run; only missing requests are sent",
+)
+@click.option(
+    "--retry-failed",
+    is_flag=True,
+    default=False,
+    help="With --resume, also resend requests whose recorded response failed",
+)
+@click.option(
+    "--queue",
+    "queue_path",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="SQLite work queue to load the batch into; more workers can join "
+    "with `llm-batch work`",
+)
+@click.option(
+    "--lease-seconds",
+    type=click.FloatRange(min=1),
+    default=300.0,
+    show_default=True,
+    help="With --queue, how long a worker may hold a request without a heartbeat",
+)
+@click.option(
+    "--schedule",
+    type=click.Choice(SCHEDULE_POLICIES),
+    default="fifo",
+    show_default=True,
+    help="Dispatch order: file order, most or least expensive requests first "
+    "(estimated from the prompt size and max_tokens), or grouped by shared "
+    "prompt prefix",
+)
+@click.option(
+    "--metrics-file",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Write latency/token percentiles here: JSON for .json files, "
+    "else a Prometheus textfile",
+)
+@verbose_option
+def run(
+    file_path: str,
+    interval: int,
+    flush_seconds: float,
+    flush_bytes: int,
+    fsync: str,
+    concurrency: int,
+    base_urls: tuple[str, ...],
+    max_connections: int | None,
+    timeout: float,
+    http2: bool,
+    stream: bool,
+    stall_timeout: float | None,
+    first_token_timeout: float | None,
+    rpm: float | None,
+    tpm: float | None,
+    max_attempts: int | None,
+    retry_base_delay: float,
+    dead_letter_path: str | None,
+    output_dir: str,
+    resume_path: str | None,
+    retry_failed: bool,
+    queue_path: str | None,
+    lease_seconds: float,
+    schedule: SchedulePolicy,
+    cache_path: str | None,
+    cache_max_mb: float,
+    cache_all: bool,
+    metrics_file: str | None,
+    verbose: bool,
+) -> None:
+    """
+    Run a batch of requests from a JSONL file against one or more OpenAI-compatible servers.
+    Responses are appended to a JSONL file as they arrive; an interrupted run can be resumed.
+    """
+    configure_logging(verbose)
+
+    if retry_failed and not resume_path:
+        raise click.UsageError("--retry-failed can only be used with --resume")
+    _check_worker_options(
+        stream, stall_timeout, first_token_timeout, cache_path, cache_all
+    )
+    if queue_path and resume_path:
+        raise click.UsageError(
+            "--resume cannot be used with --queue; run the same command again instead"
+        )
+
+    done: set[str] = set()
+    work_queue: WorkQueue | None = None
+    if queue_path:
+        work_queue = WorkQueue(queue_path)
+        added = work_queue.load(file_path, schedule=schedule)
+        batch_id: str = work_queue.batch_id
+        output_path: str = os.path.join(output_dir, f"batch_{batch_id}_output.jsonl")
+        logger.info("Loaded %d new requests into %s", added, queue_path)
+    elif resume_path:
+        resumed_id, done = load_resume_state(resume_path, retry_failed=retry_failed)
+        batch_id = resumed_id or str(uuid4().hex)
+        output_path = resume_path
+        logger.info("Resuming batch %s, skipping %d requests", batch_id, len(done))
+    else:
+        batch_id = str(uuid4().hex)
+        output_path = os.path.join(output_dir, f"batch_{batch_id}_output.jsonl")
+    if dead_letter_path is None:
+        output_stem = os.path.splitext(output_path)[0].removesuffix("_output")
+        dead_letter_path = f"{output_stem}_dead_letter.jsonl"
+    count: int = 0
+    failed: int = 0
+
+    pending: Schedule | None = None
+    if work_queue is not None:
+        counts = work_queue.counts()
+        total_items: int = counts["pending"] + counts["leased"]
+    else:
+        pending = plan_schedule(file_path, schedule, skip=done)
+        total_items = len(pending)
+        logger.debug(
+            "Scheduled %d requests %s, estimated cost %.0f tokens",
+            total_items,
+            schedule,
+            pending.total_cost,
+        )
+        if schedule == "prefix" and verbose:
+            # Reads the batch again, so only when the stats are logged
+            stats = prefix_stats(pending)
+            logger.info(
+                "Grouped %d requests into %d system prompts, %d image groups and "
+                "%d distinct prompts; ~%.0f%% of prompt tokens are a shared prefix",
+                stats["requests"],
+                stats["system_prompts"],
+                stats["image_groups"],
+                stats["prompts"],
+                100 * stats["reusable_tokens"] / max(stats["prompt_tokens"], 1),
+            )
+
+    logger.info("Starting batch %s", batch_id)
+
+    pbar = tqdm(total=total_items, desc="Processing batch", unit="requests")
+    metrics = MetricsCollector()
+    writer_kwargs = dict(
+        flush_bytes=flush_bytes,
+        flush_interval=flush_seconds,
+        flush_every=interval,
+        fsync=fsync,
+    )
+    writer = JsonlWriter(output_path, **writer_kwargs) if work_queue is None else None
+    dead_letter_writer = JsonlWriter(dead_letter_path, **writer_kwargs)
+
+    def on_result(response: BatchResponse) -> None:
+        nonlocal count
+        metrics.observe(response)
+        writer.write(response)
+        count += 1
+        pbar.update(1)
+
+        if count % interval == 0:
+            pbar.set_description(f"Processing batch (saved {writer.flushed} responses)")
+
+    def on_queued_result(response: BatchResponse) -> None:
+        # With --queue, responses are committed to the queue by the worker
+        metrics.observe(response)
+        pbar.update(1)
+
+    def on_failure(request: FailedRequest) -> None:
+        nonlocal failed
+        failed += 1
+        dead_letter_writer.write(request)
+
+    async def execute() -> None:
+        async with _worker_kwargs(
+            concurrency=concurrency,
+            base_urls=base_urls,
+            max_connections=max_connections,
+            timeout=timeout,
+            http2=http2,
+            stream=stream,
+            stall_timeout=stall_timeout,
+            first_token_timeout=first_token_timeout,
+            rpm=rpm,
+            tpm=tpm,
+            max_attempts=max_attempts,
+            retry_base_delay=retry_base_delay,
+            cache_path=cache_path,
+            cache_max_mb=cache_max_mb,
+            cache_all=cache_all,
+            on_failure=on_failure,
+        ) as run_kwargs:
+            if work_queue is not None:
+                await run_worker(
+                    work_queue,
+                    lease_seconds=lease_seconds,
+                    on_result=on_queued_result,
+                    **run_kwargs,
+                )
+            else:
+                await run_batch(pending, batch_id, on_result, **run_kwargs)
+
+    try:
+        with forward_sigterm():
+            asyncio.run(execute())
+    except KeyboardInterrupt:
+        pbar.close()
+        if work_queue is not None:
+            logger.warning("Interrupted; run the same command again to finish")
+        else:
+            logger.warning(
+                "Interrupted after %d responses; continue with --resume %s",
+                count,
+                output_path,
+            )
+        raise click.Abort()
+    finally:
+        # Drain the writers, so that every completed response is on disk
+        if writer is not None:
+            writer.close()
+        dead_letter_writer.close()
+
+    pbar.close()
+    for line in metrics.format_summary():
+        logger.info(line)
+    if metrics_file:
+        metrics.write(metrics_file)
+        logger.info("Metrics saved to %s", metrics_file)
+    if work_queue is not None:
+        counts = work_queue.counts()
+        if counts["pending"] or counts["leased"]:
+            work_queue.close()
+            raise click.ClickException(
+                f"{counts['pending'] + counts['leased']} requests are not finished; "
+                "run the same command again to finish them"
+            )
+        work_queue.export(output_path)
+        work_queue.close()
+    logger.info("Results saved to %s", output_path)
+    if failed:
+        logger.warning(
+            "%d requests failed permanently, saved to %s", failed, dead_letter_path
+        )
+
+
+@click.command(
+    name="work",
+    short_help="Process requests from a `run --queue` work queue.",
+)
+@click.argument("queue_path", type=click.Path(exists=True, dir_okay=False))
+@_worker_options
+@click.option(
+    "--lease-seconds",
+    type=click.FloatRange(min=1),
+    default=300.0,
+    show_default=True,
+    help="How long the worker may hold a request without a heartbeat",
+)
+@click.option("--worker-id", default=None, help="Name of the worker in the queue")
+@verbose_option
+def work(
+    queue_path: str,
+    concurrency: int,
+    base_urls: tuple[str, ...],
+    max_connections: int | None,
+    timeout: float,
+    http2: bool,
+    stream: bool,
+    stall_timeout: float | None,
+    first_token_timeout: float | None,
+    rpm: float | None,
+    tpm: float | None,
+    max_attempts: int | None,
+    retry_base_delay: float,
+    dead_letter_path: str | None,
+    cache_path: str | None,
+    cache_max_mb: float,
+    cache_all: bool,
+    lease_seconds: float,
+    worker_id: str | None,
+    verbose: bool,
+) -> None:
+    """
+    Process requests from a work queue created with `run --queue`.
+    Any number of workers, on this or other machines sharing the file, can work on the same queue.
+    """
+    configure_logging(verbose)
+    _check_worker_options(
+        stream, stall_timeout, first_token_timeout, cache_path, cache_all
+    )
+    work_queue = WorkQueue(queue_path)
+    # Failed requests are always recorded in the queue; the file is optional
+    dead_letter_writer = JsonlWriter(dead_letter_path) if dead_letter_path else None
+    dead_letters: int = 0
+
+    def on_failure(request: FailedRequest) -> None:
+        nonlocal dead_letters
+        dead_letters += 1
+        dead_letter_writer.write(request)
+
+    async def execute() -> tuple[int, int]:
+        async with _worker_kwargs(
+            concurrency=concurrency,
+            base_urls=base_urls,
+            max_connections=max_connections,
+            timeout=timeout,
+            http2=http2,
+            stream=stream,
+            stall_timeout=stall_timeout,
+            first_token_timeout=first_token_timeout,
+            rpm=rpm,
+            tpm=tpm,
+            max_attempts=max_attempts,
+            retry_base_delay=retry_base_delay,
+            cache_path=cache_path,
+            cache_max_mb=cache_max_mb,
+            cache_all=cache_all,
+            on_failure=on_failure if dead_letter_writer else None,
+        ) as run_kwargs:
+            return await run_worker(
+                work_queue,
+                worker_id=worker_id,
+                lease_seconds=lease_seconds,
+                **run_kwargs,
+            )
+
+    try:
+        with forward_sigterm():
+            processed, failed = asyncio.run(execute())
+    finally:
+        work_queue.close()
+        if dead_letter_writer is not None:
+            dead_letter_writer.close()
+    logger.info("Processed %d requests, %d failed", processed, failed)
+    if dead_letters:
+        logger.warning(
+            "%d requests failed permanently, saved to %s",
+            dead_letters,
+            dead_letter_path,
+        )
@@ -0,0 +1,20 @@
+from typing import Any, Optional
+
+from openai.types.chat.chat_completion import ChatCompletion
+from pydantic import BaseModel, Field
+
+from llmbatch.models.schemas import RequestMetrics
+
+
+class Response(BaseModel):
+    status_code: int
+    request_id: str = Field(description="ID of the request, generated by the server")
+    body: Optional[ChatCompletion] = None
+
+
+class BatchResponse(BaseModel):
+    id: str = Field(description="The ID of the batch request")
+    custom_id: str
+    response: Optional[Response] = None
+    error: Optional[Any] = None
+    metrics: Optional[RequestMetrics] = None
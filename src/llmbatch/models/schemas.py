@@ -1,22 +1,31 @@
 from typing import Any, Dict, List, Literal, Optional
 
-from openai.types.chat.chat_completion import ChatCompletion
 from pydantic import BaseModel, Field
 
 type OptionalParams = Dict[str, Any]
 
 
-class Response(BaseModel):
-    status_code: int
-    request_id: str = Field(description="ID of the request, generated by the server")
-    body: Optional[ChatCompletion] = None
-
-
-class BatchResponse(BaseModel):
-    id: str = Field(description="The ID of the batch request")
-    custom_id: str
-    response: Optional[Response] = None
-    error: Optional[Any] = None
+class RequestMetrics(BaseModel):
+    queue_wait_s: float = Field(
+        default=0.0, description="Time spent waiting for a free worker slot"
+    )
+    latency_s: float = Field(
+        description="Duration of the last attempt, including rate limiter waits"
+    )
+    total_s: float = Field(description="Duration of all attempts and backoffs")
+    ttft_s: Optional[float] = Field(
+        default=None, description="Time to first token of the last attempt"
+    )
+    inter_token_s: Optional[float] = Field(
+        default=None, description="Mean time between streamed tokens"
+    )
+    attempts: int = 1
+    cached: bool = False
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    tokens_per_s: Optional[float] = Field(
+        default=None, description="Completion tokens per second of the last attempt"
+    )
 
 
 class Body(BaseModel):
@@ -36,6 +45,11 @@ class OpenAIBatch(BaseModel):
     body: Body
 
 
+class FailedRequest(OpenAIBatch):
+    status_code: int = Field(description="Status code of the last failed attempt")
+    error: Optional[str] = None
+
+
 class AnthropicBatch(BaseModel):
     custom_id: str
     params: Body
@@ -76,9 +90,27 @@ class Config(BaseModel):
     params: Parameters
     n_answers: int = 1
     system_message: Optional[str] = None
+    image_first: bool = Field(
+        default=False,
+        description="Place images before the question, so questions about the "
+        "same image share a cacheable prompt prefix",
+    )
     json_schema: Optional[dict] = None
 
 
+class Shard(BaseModel):
+    path: str = Field(description="Path of the shard, relative to the manifest")
+    requests: int
+    bytes: int
+
+
+class ShardManifest(BaseModel):
+    format: Literal["openai", "anthropic"]
+    total_requests: int
+    total_bytes: int
+    shards: List[Shard]
+
+
 class Question(BaseModel):
     question_id: str
     question: str
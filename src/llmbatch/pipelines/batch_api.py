@@ -0,0 +1,144 @@
+import asyncio
+import itertools
+import logging
+from typing import IO, Awaitable, Callable, Iterable, List, TypeVar
+
+from anthropic.types.messages import MessageBatch
+from openai.types import Batch
+
+from llmbatch.services.anthropic_service import AsyncAnthropicBatchService
+from llmbatch.services.openai_service import AsyncOpenAIBatchService
+from llmbatch.utils import codec
+
+logger = logging.getLogger(__name__)
+
+C = TypeVar("C")
+B = TypeVar("B")
+
+_END = object()
+
+
+async def _run_batches(
+    chunks: Iterable[C],
+    output_path: str,
+    submit: Callable[[C, int], Awaitable[str]],
+    finish: Callable[[str, IO[bytes]], Awaitable[B]],
+    max_concurrent_submits: int,
+) -> List[B]:
+    """
+    Submit chunks concurrently, then wait for and download each batch on its own.
+
+    At most `max_concurrent_submits` uploads (and so chunks held in memory) run
+    at a time. `finish` appends the results of a batch to the shared output file.
+    """
+    submit_slots = asyncio.Semaphore(max_concurrent_submits)
+
+    async def process(chunk: C, index: int, output_file: IO[bytes]) -> B:
+        try:
+            batch_id = await submit(chunk, index)
+        finally:
+            submit_slots.release()
+        # Drop the request bodies while the batch is processed, which can take hours
+        del chunk
+        return await finish(batch_id, output_file)
+
+    with open(output_path, "wb") as output_file:
+        tasks: List[asyncio.Task[B]] = []
+        try:
+            remaining = iter(chunks)
+            for index in itertools.count():
+                # Wait for a slot before reading the next chunk into memory
+                await submit_slots.acquire()
+                chunk = next(remaining, _END)
+                if chunk is _END:
+                    submit_slots.release()
+                    break
+                tasks.append(asyncio.create_task(process(chunk, index, output_file)))
+                del chunk
+            return list(await asyncio.gather(*tasks))
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+
+async def run_anthropic_batches(
+    chunks: Iterable[List[dict]],
+    output_path: str,
+    service: AsyncAnthropicBatchService,
+    max_concurrent_submits: int = 4,
+    on_submit: Callable[[str, int], None] | None = None,
+) -> List[MessageBatch]:
+    """
+    Submit request chunks as message batches, wait for them and download results.
+
+    Results are appended to `output_path` record by record as soon as a batch
+    ends, in the layout `parse_anthropic_jsonl` reads. `on_submit` is called
+    with the ID and request count of each batch as soon as it is created.
+    """
+
+    async def submit(chunk: List[dict], index: int) -> str:
+        batch = await service.submit(chunk)
+        logger.info("Submitted batch %s with %d requests", batch.id, len(chunk))
+        if on_submit:
+            on_submit(batch.id, len(chunk))
+        return batch.id
+
+    async def finish(batch_id: str, output_file: IO[bytes]) -> MessageBatch:
+        batch = await service.wait(batch_id)
+        logger.info("Batch %s ended: %s", batch.id, batch.request_counts)
+        async for result in service.results(batch.id):
+            output_file.write(codec.dump_model(result) + b"\n")
+        return batch
+
+    return await _run_batches(
+        chunks, output_path, submit, finish, max_concurrent_submits
+    )
+
+
+async def run_openai_batches(
+    chunks: Iterable[List[bytes]],
+    output_path: str,
+    service: AsyncOpenAIBatchService,
+    max_concurrent_submits: int = 4,
+    filename: str = "batch.jsonl",
+    on_submit: Callable[[str, int], None] | None = None,
+) -> List[Batch]:
+    """
+    Upload chunks of JSONL lines as OpenAI batches, wait for them and download results.
+
+    The output and error files of each batch are streamed into `output_path`.
+    Both already use the `BatchResponse` layout that `parse_openai_jsonl` reads.
+    `on_submit` is called with the ID and request count of each batch as soon
+    as it is created.
+    """
+    stem = filename.removesuffix(".jsonl")
+
+    async def submit(chunk: List[bytes], index: int) -> str:
+        batch = await service.submit(b"".join(chunk), f"{stem}_{index:03d}.jsonl")
+        logger.info("Submitted batch %s with %d requests", batch.id, len(chunk))
+        if on_submit:
+            on_submit(batch.id, len(chunk))
+        return batch.id
+
+    async def finish(batch_id: str, output_file: IO[bytes]) -> Batch:
+        batch = await service.wait(batch_id)
+        logger.log(
+            logging.INFO if batch.status == "completed" else logging.WARNING,
+            "Batch %s %s: %s",
+            batch.id,
+            batch.status,
+            batch.request_counts,
+        )
+        if batch.errors and batch.errors.data:
+            for error in batch.errors.data:
+                logger.error("Batch %s: %s", batch.id, error.message)
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                async for line in service.file_lines(file_id):
+                    output_file.write(line)
+        return batch
+
+    return await _run_batches(
+        chunks, output_path, submit, finish, max_concurrent_submits
+    )
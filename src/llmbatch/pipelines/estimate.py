@@ -0,0 +1,208 @@
+import json
+from collections import Counter
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from llmbatch.utils import codec
+from llmbatch.utils.tokens import Provider, estimate_messages_tokens
+
+# Context windows in tokens by model name prefix; the longest matching prefix wins
+CONTEXT_WINDOWS: Dict[str, int] = {
+    "gpt-3.5-turbo": 16_385,
+    "gpt-4": 8_192,
+    "gpt-4-turbo": 128_000,
+    "gpt-4o": 128_000,
+    "gpt-4.1": 1_047_576,
+    "o1": 200_000,
+    "o3": 200_000,
+    "o4-mini": 200_000,
+    "claude": 200_000,
+    "gemma2": 8_192,
+    "gemma3": 128_000,
+    "llama3.1": 128_000,
+    "llama3.2": 128_000,
+    "qwen2.5": 32_768,
+    "mistral": 32_768,
+}
+
+# Number of offending custom IDs kept for the report
+MAX_EXAMPLES = 10
+
+
+def context_window(model: str) -> Optional[int]:
+    """Context window of `model` from `CONTEXT_WINDOWS`, or None if unknown."""
+    matches = [prefix for prefix in CONTEXT_WINDOWS if model.startswith(prefix)]
+    return CONTEXT_WINDOWS[max(matches, key=len)] if matches else None
+
+
+class BatchEstimate:
+    """
+    Token totals of a batch, accumulated one request at a time.
+
+    Prompt tokens are estimated per `provider` (text at about four characters
+    per token, images by their size); completion tokens are bounded by
+    `max_tokens`. Requests whose prompt plus `max_tokens` exceed the model's
+    context window (`context_window`, or looked up by model name) are counted
+    as over the context.
+    """
+
+    def __init__(
+        self, provider: Optional[Provider] = None, context_window: Optional[int] = None
+    ):
+        self.provider: Optional[Provider] = provider
+        self.context_window: Optional[int] = context_window
+        self.requests: int = 0
+        self.prompt_tokens: int = 0
+        self.max_completion_tokens: int = 0
+        self.max_request_tokens: int = 0
+        self.images: int = 0
+        self.over_context: int = 0
+        self.over_context_ids: List[str] = []
+        self.models: Counter[str] = Counter()
+        self._windows: Dict[str, Optional[int]] = {}
+
+    def window_for(self, model: str) -> Optional[int]:
+        if self.context_window is not None:
+            return self.context_window
+        if model not in self._windows:
+            self._windows[model] = context_window(model)
+        return self._windows[model]
+
+    def add(self, custom_id: str, body: Dict[str, Any]) -> None:
+        """Add a request body as found in a batch file (`body` or `params`)."""
+        messages = body["messages"]
+        max_tokens = body["max_tokens"]
+        prompt_tokens = estimate_messages_tokens(
+            messages, body.get("system"), self.provider
+        )
+        request_tokens = prompt_tokens + max_tokens
+        self.requests += 1
+        self.prompt_tokens += prompt_tokens
+        self.max_completion_tokens += max_tokens
+        self.max_request_tokens = max(self.max_request_tokens, request_tokens)
+        self.models[body["model"]] += 1
+        for message in messages:
+            content = message.get("content")
+            if isinstance(content, list):
+                self.images += sum(
+                    part.get("type") in ("image_url", "image") for part in content
+                )
+        window = self.window_for(body["model"])
+        if window is not None and request_tokens > window:
+            self.over_context += 1
+            if len(self.over_context_ids) < MAX_EXAMPLES:
+                self.over_context_ids.append(custom_id)
+
+    def summary(self) -> dict:
+        return {
+            "provider": self.provider,
+            "requests": self.requests,
+            "images": self.images,
+            "prompt_tokens": self.prompt_tokens,
+            "max_completion_tokens": self.max_completion_tokens,
+            "max_request_tokens": self.max_request_tokens,
+            "over_context": self.over_context,
+            "over_context_ids": self.over_context_ids,
+            "models": dict(self.models),
+        }
+
+
+def estimate_batch(
+    file_paths: Iterable[str],
+    provider: Optional[Provider] = None,
+    context_window: Optional[int] = None,
+) -> BatchEstimate:
+    """
+    Stream batch JSONL files into a `BatchEstimate`.
+
+    Both formats are accepted; without a `provider`, the one matching the file
+    format is assumed.
+    """
+    estimate = BatchEstimate(provider, context_window)
+    for file_path in file_paths:
+        with open(file_path, "rb") as f:
+            for line in f:
+                item = codec.loads(line)
+                if estimate.provider is None:
+                    estimate.provider = "anthropic" if "params" in item else "openai"
+                estimate.add(item["custom_id"], item.get("body") or item["params"])
+    return estimate
+
+
+def throughput_from_metrics(metrics_path: str) -> tuple[float, float]:
+    """
+    Completion tokens per second and per request measured by `run --metrics-file`.
+
+    Cache hits and failed requests are left out of the per-request average.
+    """
+    with open(metrics_path, "r", encoding="utf-8") as f:
+        metrics = json.load(f)
+    completion_tokens = metrics["completion_tokens"]
+    served = metrics["requests"] - metrics.get("cached", 0) - metrics.get("failed", 0)
+    elapsed = metrics.get("elapsed_s")
+    if not elapsed or not served:
+        raise ValueError(f"{metrics_path} has no measured requests")
+    return completion_tokens / elapsed, completion_tokens / served
+
+
+def project(
+    estimate: BatchEstimate,
+    input_price: Optional[float] = None,
+    output_price: Optional[float] = None,
+    tokens_per_s: Optional[float] = None,
+    completion_tokens_per_request: Optional[float] = None,
+) -> dict:
+    """
+    Project the cost and runtime of a batch.
+
+    Prices are in USD per million tokens and `tokens_per_s` is the completion
+    throughput of the whole server (or provider account). Completions are
+    assumed to use their full `max_tokens` unless a measured
+    `completion_tokens_per_request` is given, so the projections are upper
+    bounds by default.
+    """
+    completion_tokens = float(estimate.max_completion_tokens)
+    if completion_tokens_per_request is not None:
+        completion_tokens = min(
+            completion_tokens, completion_tokens_per_request * estimate.requests
+        )
+    projection: dict = {"completion_tokens": round(completion_tokens)}
+    if input_price is not None or output_price is not None:
+        projection["cost_usd"] = (
+            estimate.prompt_tokens * (input_price or 0.0)
+            + completion_tokens * (output_price or 0.0)
+        ) / 1e6
+    if tokens_per_s:
+        projection["runtime_s"] = completion_tokens / tokens_per_s
+    return projection
+
+
+def format_report(estimate: BatchEstimate, projection: dict) -> List[str]:
+    """Human-readable lines summarising an estimate and its projection."""
+    lines = [
+        f"Requests: {estimate.requests} ({estimate.images} images), "
+        f"provider: {estimate.provider}",
+        f"Prompt tokens: ~{estimate.prompt_tokens:,}",
+        f"Completion tokens: <= {estimate.max_completion_tokens:,} (max_tokens)",
+        f"Largest request: ~{estimate.max_request_tokens:,} tokens",
+    ]
+    if estimate.over_context:
+        lines.append(
+            f"Over the context window: {estimate.over_context} requests, e.g. "
+            + ", ".join(estimate.over_context_ids)
+        )
+    unknown = [model for model in estimate.models if estimate.window_for(model) is None]
+    if unknown:
+        lines.append(
+            "Unknown context window (use --context-window): " + ", ".join(unknown)
+        )
+    if projection["completion_tokens"] != estimate.max_completion_tokens:
+        lines.append(
+            f"Expected completion tokens: ~{projection['completion_tokens']:,}"
+        )
+    if "cost_usd" in projection:
+        lines.append(f"Projected cost: ${projection['cost_usd']:,.2f}")
+    if "runtime_s" in projection:
+        runtime = timedelta(seconds=round(projection["runtime_s"]))
+        lines.append(f"Projected runtime: {runtime}")
+    return lines
@@ -0,0 +1,115 @@
+import csv
+from typing import Any, Iterable, Iterator, Literal
+
+from llmbatch.models.schemas import OutputModel
+
+type OutputFormat = Literal["csv", "parquet", "arrow"]
+
+OUTPUT_FORMATS: tuple[OutputFormat, ...] = ("csv", "parquet", "arrow")
+FILE_EXTENSIONS: dict[OutputFormat, str] = {
+    "csv": ".csv",
+    "parquet": ".parquet",
+    "arrow": ".arrow",
+}
+DEFAULT_CHUNK_SIZE = 65_536
+
+
+def _import_pyarrow() -> Any:
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError(
+            "Parquet and Arrow output require pyarrow: pip install pyarrow"
+        ) from e
+    return pyarrow
+
+
+def _arrow_schema(pa: Any, dictionary: bool) -> Any:
+    # Arrow IPC files cannot change a dictionary between batches, so repeated
+    # labels are only dictionary-encoded for Parquet (per row group)
+    label = pa.dictionary(pa.int32(), pa.string()) if dictionary else pa.string()
+    return pa.schema(
+        [
+            ("custom_id", pa.string()),
+            ("type", label),
+            ("model", label),
+            ("response", pa.large_string()),
+            ("input_tokens", pa.int64()),
+            ("output_tokens", pa.int64()),
+        ]
+    )
+
+
+def _record_batches(
+    models: Iterable[OutputModel], schema: Any, chunk_size: int
+) -> Iterator[Any]:
+    pa = _import_pyarrow()
+    columns: dict[str, list] = {name: [] for name in schema.names}
+    for model in models:
+        for name, value in model.model_dump().items():
+            columns[name].append(value)
+        if len(columns["custom_id"]) >= chunk_size:
+            yield pa.record_batch(columns, schema=schema)
+            columns = {name: [] for name in schema.names}
+    if columns["custom_id"]:
+        yield pa.record_batch(columns, schema=schema)
+
+
+def write_csv(models: Iterable[OutputModel], path: str) -> int:
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(
+            f, fieldnames=list(OutputModel.model_fields), delimiter=";"
+        )
+        writer.writeheader()
+        for model in models:
+            writer.writerow(model.model_dump())
+            count += 1
+    return count
+
+
+def write_parquet(
+    models: Iterable[OutputModel], path: str, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> int:
+    """Write results to Parquet, one zstd-compressed row group per `chunk_size` rows."""
+    pa = _import_pyarrow()
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(pa, dictionary=True)
+    count = 0
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for batch in _record_batches(models, schema, chunk_size):
+            writer.write_batch(batch, row_group_size=chunk_size)
+            count += batch.num_rows
+    return count
+
+
+def write_arrow(
+    models: Iterable[OutputModel], path: str, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> int:
+    """Write results to an Arrow IPC file, one record batch per `chunk_size` rows."""
+    pa = _import_pyarrow()
+
+    schema = _arrow_schema(pa, dictionary=False)
+    count = 0
+    options = pa.ipc.IpcWriteOptions(compression="zstd")
+    with pa.ipc.new_file(path, schema, options=options) as writer:
+        for batch in _record_batches(models, schema, chunk_size):
+            writer.write_batch(batch)
+            count += batch.num_rows
+    return count
+
+
+def export_results(
+    models: Iterable[OutputModel],
+    path: str,
+    format: OutputFormat = "csv",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> int:
+    if format == "csv":
+        return write_csv(models, path)
+    if format == "parquet":
+        return write_parquet(models, path, chunk_size)
+    if format == "arrow":
+        return write_arrow(models, path, chunk_size)
+    raise ValueError(f"Invalid output format: {format}")
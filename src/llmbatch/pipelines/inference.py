@@ -1,34 +1,366 @@
+import asyncio
+import os
+import time
+from typing import AsyncIterable, Awaitable, Callable, Iterable
 from uuid import uuid4
 
-from llmbatch.models.schemas import BatchResponse, OpenAIBatch, Response
-from llmbatch.services.openai_service import OpenAIService
+from openai import RateLimitError
+from openai.types.chat.chat_completion import ChatCompletion
 
+from llmbatch.models.responses import BatchResponse, Response
+from llmbatch.models.schemas import FailedRequest, OpenAIBatch, RequestMetrics
+from llmbatch.pipelines.retry import (
+    RetryPolicy,
+    error_status_code,
+    finish_reason_status_code,
+)
+from llmbatch.services.openai_service import AsyncOpenAIService, OpenAIService
+from llmbatch.services.rate_limiter import RateLimiter, retry_after_seconds
+from llmbatch.services.streaming import StreamedCompletion
+from llmbatch.utils import codec
+from llmbatch.utils.response_cache import ResponseCache
+from llmbatch.utils.tokens import estimate_request_tokens
 
-def process_request(input: OpenAIBatch, batch_id: str, **kwargs) -> BatchResponse:
-    openai_service = OpenAIService()
+
+def _completion_response(api_response: ChatCompletion) -> tuple[Response, str | None]:
+    finish_reason = api_response.choices[0].finish_reason
+    status_code = finish_reason_status_code(finish_reason)
+    error = None if status_code == 200 else f"finish_reason: {finish_reason}"
+    response = Response(
+        status_code=status_code,
+        request_id=str(uuid4().hex),
+        body=api_response,
+    )
+    return response, error
+
+
+def _request_metrics(
+    start: float,
+    attempt_start: float,
+    attempts: int,
+    response: Response,
+    streamed: StreamedCompletion | None = None,
+) -> RequestMetrics:
+    end = time.perf_counter()
+    latency = end - attempt_start
+    usage = response.body.usage if response.body is not None else None
+    completion_tokens = usage.completion_tokens if usage else None
+    return RequestMetrics(
+        latency_s=latency,
+        total_s=end - start,
+        ttft_s=streamed.ttft if streamed is not None else None,
+        inter_token_s=streamed.inter_token if streamed is not None else None,
+        attempts=attempts,
+        prompt_tokens=usage.prompt_tokens if usage else None,
+        completion_tokens=completion_tokens,
+        tokens_per_s=completion_tokens / latency
+        if completion_tokens and latency > 0
+        else None,
+    )
+
+
+def _error_response(error: Exception) -> Response:
+    return Response(
+        status_code=error_status_code(error),
+        request_id=str(uuid4().hex),
+        body=None,
+    )
+
+
+def process_request(
+    input: OpenAIBatch,
+    batch_id: str,
+    service: OpenAIService | None = None,
+    retry_policy: RetryPolicy | None = None,
+    cache: ResponseCache | None = None,
+    **kwargs,
+) -> BatchResponse:
     response: Response | None = None
     error: str | None = None
     if "model" in kwargs:
         input.body.model = kwargs["model"]
-    try:
-        api_response = openai_service.create_completion(**input.body.model_dump())
-        status_code = 200 if api_response.choices[0].finish_reason == "stop" else 500
-        response = Response(
-            status_code=status_code,
-            request_id=str(uuid4().hex),
-            body=api_response,
+    if cache is not None and (response := cache.get(input.body)) is not None:
+        return BatchResponse(
+            id=batch_id,
+            custom_id=input.custom_id,
+            response=response,
+            metrics=RequestMetrics(latency_s=0.0, total_s=0.0, cached=True),
         )
-    except Exception as e:
-        error = str(e)
-        response = Response(
-            status_code=500,
-            request_id=str(uuid4().hex),
-            body=None,
+    openai_service = service if service is not None else OpenAIService()
+    start = time.perf_counter()
+    attempt = 0
+    while True:
+        attempt += 1
+        attempt_start = time.perf_counter()
+        try:
+            api_response = openai_service.create_completion(**input.body.model_dump())
+            response, error = _completion_response(api_response)
+        except Exception as e:
+            if retry_policy is not None and retry_policy.should_retry(e, attempt):
+                time.sleep(retry_policy.delay(e, attempt))
+                continue
+            error = str(e)
+            response = _error_response(e)
+        break
+    metrics = _request_metrics(start, attempt_start, attempt, response)
+    if cache is not None:
+        cache.put(input.body, response)
+
+    return BatchResponse(
+        id=batch_id,
+        custom_id=input.custom_id,
+        response=response,
+        error=error,
+        metrics=metrics,
+    )
+
+
+async def _create_completion_limited[T](
+    input: OpenAIBatch, call: Callable[[], Awaitable[T]], rate_limiter: RateLimiter
+) -> T:
+    """
+    Make one call within the limiter's budget.
+
+    A 429 pauses and throttles the limiter and is re-raised; whether and when the
+    request is retried is left to the `RetryPolicy`, so 429s are retried once.
+    """
+    async with rate_limiter.limit(estimate_request_tokens(input.body)):
+        try:
+            api_response = await call()
+        except RateLimitError as e:
+            rate_limiter.on_rate_limited(retry_after_seconds(e.response.headers))
+            raise
+    rate_limiter.on_success()
+    return api_response
+
+
+async def process_request_async(
+    input: OpenAIBatch,
+    batch_id: str,
+    service: AsyncOpenAIService,
+    rate_limiter: RateLimiter | None = None,
+    retry_policy: RetryPolicy | None = None,
+    cache: ResponseCache | None = None,
+    stream: bool = False,
+    stall_timeout: float | None = None,
+    first_token_timeout: float | None = None,
+    **kwargs,
+) -> BatchResponse:
+    """
+    Process a single request, retrying it according to `retry_policy`.
+
+    With `stream`, the completion is streamed and assembled into the same
+    response body, and its metrics include the time to first token and between
+    tokens. A stream that receives nothing for `stall_timeout` seconds (or no
+    first token within `first_token_timeout`) is aborted and counts as a timeout.
+    """
+    response: Response | None = None
+    error: str | None = None
+    streamed: StreamedCompletion | None = None
+    if "model" in kwargs:
+        input.body.model = kwargs["model"]
+    if cache is not None and (response := cache.get(input.body)) is not None:
+        return BatchResponse(
+            id=batch_id,
+            custom_id=input.custom_id,
+            response=response,
+            metrics=RequestMetrics(latency_s=0.0, total_s=0.0, cached=True),
         )
 
+    async def call() -> ChatCompletion | StreamedCompletion:
+        if stream:
+            return await service.stream_completion(
+                stall_timeout=stall_timeout,
+                first_token_timeout=first_token_timeout,
+                **input.body.model_dump(),
+            )
+        return await service.create_completion(**input.body.model_dump())
+
+    start = time.perf_counter()
+    attempt = 0
+    while True:
+        attempt += 1
+        attempt_start = time.perf_counter()
+        try:
+            if rate_limiter is not None:
+                api_response = await _create_completion_limited(
+                    input, call, rate_limiter
+                )
+            else:
+                api_response = await call()
+            if isinstance(api_response, StreamedCompletion):
+                streamed, api_response = api_response, api_response.completion
+            response, error = _completion_response(api_response)
+        except Exception as e:
+            if retry_policy is not None and retry_policy.should_retry(e, attempt):
+                await asyncio.sleep(retry_policy.delay(e, attempt))
+                continue
+            error = str(e)
+            response = _error_response(e)
+        break
+    metrics = _request_metrics(start, attempt_start, attempt, response, streamed)
+    if cache is not None:
+        cache.put(input.body, response)
+
     return BatchResponse(
         id=batch_id,
         custom_id=input.custom_id,
         response=response,
         error=error,
+        metrics=metrics,
     )
+
+
+async def run_batch(
+    requests: Iterable[OpenAIBatch] | AsyncIterable[OpenAIBatch],
+    batch_id: str,
+    on_result: Callable[[BatchResponse], None],
+    concurrency: int = 1,
+    service: AsyncOpenAIService | None = None,
+    rate_limiter: RateLimiter | None = None,
+    retry_policy: RetryPolicy | None = None,
+    on_failure: Callable[[FailedRequest], None] | None = None,
+    cache: ResponseCache | None = None,
+    **kwargs,
+) -> None:
+    """
+    Process requests with at most `concurrency` of them in flight at once.
+
+    Requests are pulled lazily from `requests` (an iterable or async iterable)
+    through a bounded queue, so memory stays proportional to `concurrency` rather
+    than to the batch size. `on_result` is called for every response as soon as
+    it completes, i.e. not in input order.
+    With a `rate_limiter`, requests additionally wait for RPM/TPM budget and the
+    number in flight adapts to 429 responses, never exceeding `concurrency`.
+    Requests that still fail after the `retry_policy` gave up are also passed to
+    `on_failure`, in a form that can be written to a dead-letter file and re-run.
+    Responses found in `cache` are returned without contacting the server.
+    Every response carries `metrics` with its queue wait, latency and tokens.
+    Further keyword arguments (e.g. `stream`) go to `process_request_async`.
+    """
+    if concurrency < 1:
+        raise ValueError(f"Concurrency must be at least 1, got {concurrency}")
+
+    owns_service = service is None
+    if service is None:
+        service = AsyncOpenAIService()
+
+    queue: asyncio.Queue[tuple[OpenAIBatch, float] | None] = asyncio.Queue(
+        maxsize=concurrency * 2
+    )
+
+    async def produce() -> None:
+        if isinstance(requests, AsyncIterable):
+            async for request in requests:
+                await queue.put((request, time.perf_counter()))
+        else:
+            for request in requests:
+                await queue.put((request, time.perf_counter()))
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def work() -> None:
+        while (item := await queue.get()) is not None:
+            request, queued_at = item
+            queue_wait = time.perf_counter() - queued_at
+            result = await process_request_async(
+                request,
+                batch_id,
+                service,
+                rate_limiter=rate_limiter,
+                retry_policy=retry_policy,
+                cache=cache,
+                **kwargs,
+            )
+            if result.metrics is not None:
+                result.metrics.queue_wait_s = queue_wait
+            on_result(result)
+            if on_failure is not None and result.response.status_code != 200:
+                on_failure(
+                    FailedRequest(
+                        **request.model_dump(),
+                        status_code=result.response.status_code,
+                        error=result.error,
+                    )
+                )
+
+    try:
+        workers = [asyncio.create_task(work()) for _ in range(concurrency)]
+        await asyncio.gather(produce(), *workers)
+    finally:
+        if owns_service:
+            await service.close()
+
+
+def _is_success(record: dict) -> bool:
+    response = record.get("response") or {}
+    return response.get("status_code") == 200 and not record.get("error")
+
+
+def _truncate_partial_line(output_path: str, block_size: int = 1 << 16) -> None:
+    """Drop a trailing line left half-written by a crash so appends stay valid."""
+    with open(output_path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        if end == 0:
+            return
+        f.seek(end - 1)
+        if f.read(1) == b"\n":
+            return
+        # Read backwards in blocks until the last complete line ends
+        position = end
+        while position > 0:
+            size = min(block_size, position)
+            position -= size
+            f.seek(position)
+            newline = f.read(size).rfind(b"\n")
+            if newline != -1:
+                f.truncate(position + newline + 1)
+                return
+        f.truncate(0)
+
+
+def _parse_output_line(line: bytes) -> dict | None:
+    try:
+        return codec.loads(line)
+    except ValueError:
+        return None
+
+
+def load_resume_state(
+    output_path: str, retry_failed: bool = False
+) -> tuple[str | None, set[str]]:
+    """
+    Scan an existing output file of an interrupted run.
+
+    Returns the batch ID recorded in the file and the set of custom IDs that do not
+    need to be dispatched again. Successful responses are always skipped; failed
+    ones are skipped too unless `retry_failed` is set, in which case they are
+    removed from the file so that the retried responses replace them.
+    """
+    _truncate_partial_line(output_path)
+
+    batch_id: str | None = None
+    done: set[str] = set()
+    needs_rewrite = False
+    with open(output_path, "rb") as f:
+        for line in f:
+            record = _parse_output_line(line)
+            if record is None:
+                needs_rewrite = True
+                continue
+            batch_id = batch_id or record.get("id")
+            if retry_failed and not _is_success(record):
+                needs_rewrite = True
+                continue
+            done.add(record["custom_id"])
+
+    if needs_rewrite:
+        tmp_path = f"{output_path}.tmp"
+        with open(output_path, "rb") as src, open(tmp_path, "wb") as dst:
+            for line in src:
+                record = _parse_output_line(line)
+                if record is not None and (not retry_failed or _is_success(record)):
+                    dst.write(line)
+        os.replace(tmp_path, output_path)
+
+    return batch_id, done
@@ -0,0 +1,145 @@
+import json
+import math
+import os
+import time
+from array import array
+from typing import Dict, List
+
+from llmbatch.models.responses import BatchResponse
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Metric name -> (RequestMetrics field, Prometheus unit suffix, help text)
+_SERIES: Dict[str, tuple[str, str, str]] = {
+    "queue_wait": ("queue_wait_s", "seconds", "Time waiting for a worker slot"),
+    "latency": ("latency_s", "seconds", "Duration of the last attempt"),
+    "total": ("total_s", "seconds", "Duration including retries and backoff"),
+    "ttft": ("ttft_s", "seconds", "Time to first token (streaming only)"),
+    "inter_token": ("inter_token_s", "seconds", "Time between tokens (streaming only)"),
+    "tokens_per_s": ("tokens_per_s", "", "Completion tokens per second"),
+}
+
+
+def percentiles(
+    values: List[float] | array, quantiles: tuple[float, ...] = QUANTILES
+) -> Dict[float, float]:
+    """Nearest-rank percentiles of `values`; empty if there are none."""
+    if not values:
+        return {}
+    ordered = sorted(values)
+    n = len(ordered)
+    return {q: ordered[min(n - 1, max(0, math.ceil(q * n) - 1))] for q in quantiles}
+
+
+class MetricsCollector:
+    """
+    Aggregates the `metrics` of responses into percentiles and totals.
+
+    Values are kept in compact arrays (8 bytes per request and series), so exact
+    percentiles stay affordable for batches of millions of requests. Cache hits
+    are counted but excluded from the timing series. The summary's `elapsed_s`
+    is measured from the creation of the collector.
+    """
+
+    def __init__(self):
+        self.started: float = time.monotonic()
+        self.series: Dict[str, array] = {name: array("d") for name in _SERIES}
+        self.requests: int = 0
+        self.failed: int = 0
+        self.cached: int = 0
+        self.prompt_tokens: int = 0
+        self.completion_tokens: int = 0
+
+    def observe(self, response: BatchResponse) -> None:
+        self.requests += 1
+        if response.response is None or response.response.status_code != 200:
+            self.failed += 1
+        metrics = response.metrics
+        if metrics is None:
+            return
+        if metrics.cached:
+            self.cached += 1
+            return
+        self.prompt_tokens += metrics.prompt_tokens or 0
+        self.completion_tokens += metrics.completion_tokens or 0
+        for name, (field, _, _) in _SERIES.items():
+            value = getattr(metrics, field)
+            if value is not None:
+                self.series[name].append(value)
+
+    def summary(self) -> dict:
+        return {
+            "requests": self.requests,
+            "failed": self.failed,
+            "cached": self.cached,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "elapsed_s": time.monotonic() - self.started,
+            **{
+                name: {
+                    "count": len(values),
+                    "sum": sum(values),
+                    **{
+                        f"p{round(q * 100)}": value
+                        for q, value in percentiles(values).items()
+                    },
+                }
+                for name, values in self.series.items()
+            },
+        }
+
+    def format_summary(self) -> List[str]:
+        """Human-readable summary lines, one per non-empty series."""
+        lines = [
+            f"{self.requests} requests ({self.failed} failed, {self.cached} cached), "
+            f"{self.prompt_tokens} prompt / {self.completion_tokens} completion tokens"
+        ]
+        for name, values in self.series.items():
+            if not values:
+                continue
+            unit = "s" if _SERIES[name][1] == "seconds" else ""
+            quantiles = ", ".join(
+                f"p{round(q * 100)} {value:.3f}{unit}"
+                for q, value in percentiles(values).items()
+            )
+            lines.append(f"{name}: {quantiles}")
+        return lines
+
+    def to_prometheus(self, prefix: str = "llmbatch") -> str:
+        """Render the summary in the Prometheus text exposition format."""
+        lines = []
+        for name, values in self.series.items():
+            _, unit, help_text = _SERIES[name]
+            metric = f"{prefix}_request_{name}" + (f"_{unit}" if unit else "")
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} summary")
+            for q, value in percentiles(values).items():
+                lines.append(f'{metric}{{quantile="{q}"}} {value:.6g}')
+            lines.append(f"{metric}_sum {sum(values):.6g}")
+            lines.append(f"{metric}_count {len(values)}")
+        for name in (
+            "requests",
+            "failed",
+            "cached",
+            "prompt_tokens",
+            "completion_tokens",
+        ):
+            metric = f"{prefix}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {getattr(self, name)}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """
+        Write a JSON summary for `.json` paths, else a Prometheus textfile.
+
+        The file is replaced atomically, so a collector never reads half of it.
+        """
+        if path.endswith(".json"):
+            content = json.dumps(self.summary(), indent=2)
+        else:
+            content = self.to_prometheus()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
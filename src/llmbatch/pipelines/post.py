@@ -1,82 +1,92 @@
+from itertools import chain
+from typing import Callable, Iterator
+
 from llmbatch.models.schemas import OutputModel
-from llmbatch.utils.general import load_jsonl
+from llmbatch.utils.general import load_jsonl_generator
+
+
+def _base_custom_id(custom_id: str) -> str:
+    if "_" in custom_id:
+        return custom_id.split("_")[0]
+    return custom_id
+
+
+def parse_anthropic_record(line: dict) -> OutputModel:
+    custom_id: str = _base_custom_id(line.get("custom_id", ""))
+
+    result_data = line.get("result") or {}
+    message = result_data.get("message") or {}
+    model = message.get("model", "")
+    content_list = message.get("content", [{}])
+    content = (content_list[0].get("text") or "") if content_list else ""
+    usage = message.get("usage") or {}
+
+    return OutputModel(
+        custom_id=custom_id,
+        type=result_data.get("type"),
+        model=model,
+        response=content,
+        input_tokens=usage.get("input_tokens") or 0,
+        output_tokens=usage.get("output_tokens") or 0,
+    )
+
+
+def parse_openai_record(line: dict) -> OutputModel:
+    custom_id = _base_custom_id(line.get("custom_id", ""))
+    response = line.get("response") or {}
+    status_code = response.get("status_code")
+    result_type = "succeeded" if status_code == 200 else "failed"
+    body = response.get("body") or {}
+    choices = body.get("choices") or [{}]
+    content = (choices[0].get("message") or {}).get("content") or ""
+    usage = body.get("usage") or {}
+
+    return OutputModel(
+        custom_id=custom_id,
+        type=result_type,
+        model=body.get("model", ""),
+        response=content,
+        input_tokens=usage.get("prompt_tokens") or 0,
+        output_tokens=usage.get("completion_tokens") or 0,
+    )
 
 
 def parse_anthropic_jsonl(file_path: str) -> list[OutputModel]:
-    results: list[OutputModel] = []
-    for line in load_jsonl(file_path):
-        custom_id: str = line.get("custom_id", "")
-        if "_" in custom_id:
-            custom_id = custom_id.split("_")[0]
-
-        result_data = line.get("result", {})
-        model = result_data.get("message", {}).get("model", "")
-        content_list = result_data.get("message", {}).get("content", [{}])
-        content = content_list[0].get("text", "") if content_list else ""
-        usage = result_data.get("message", {}).get("usage", {})
-
-        result = OutputModel(
-            custom_id=custom_id,
-            type=result_data.get("type"),
-            model=model,
-            response=content,
-            input_tokens=usage.get("input_tokens"),
-            output_tokens=usage.get("output_tokens"),
-        )
-        results.append(result)
-    return results
+    return [parse_anthropic_record(line) for line in load_jsonl_generator(file_path)]
 
 
 def parse_openai_jsonl(file_path: str) -> list[OutputModel]:
-    results: list[OutputModel] = []
-    for line in load_jsonl(file_path):
-        custom_id = line.get("custom_id", "")
-        if "_" in custom_id:
-            custom_id = custom_id.split("_")[0]
-        status_code = line.get("response", {}).get("status_code")
-        result_type = "succeeded" if status_code == 200 else "failed"
-        model = line.get("response", {}).get("body", {}).get("model", "")
-        content = (
-            line.get("response", {})
-            .get("body", {})
-            .get("choices", [{}])[0]
-            .get("message", {})
-            .get("content", "")
-        )
-        input_tokens = (
-            line.get("response", {})
-            .get("body", {})
-            .get("usage", {})
-            .get("prompt_tokens")
-        )
-        output_tokens = (
-            line.get("response", {})
-            .get("body", {})
-            .get("usage", {})
-            .get("completion_tokens")
-        )
-        result = OutputModel(
-            custom_id=custom_id,
-            type=result_type,
-            model=model,
-            response=content,
-            input_tokens=input_tokens,
-            output_tokens=output_tokens,
-        )
-        results.append(result)
-    return results
+    return [parse_openai_record(line) for line in load_jsonl_generator(file_path)]
 
 
-def parse_batch_jsonl(path: str) -> list[OutputModel]:
-    lines = list(load_jsonl(path))
-    if not lines:
-        raise ValueError(f"Empty or invalid JSONL file: {path}")
-
-    first = lines[0]
+def _detect_parser(first: dict, path: str) -> Callable[[dict], OutputModel]:
     # Anthropic: has "result" key with "message" or "type"
     if "result" in first:
-        return parse_anthropic_jsonl(path)
-    # OpenAI: has "response" key with "body"
-    if "response" in first and "body" in first["response"]:
-        return parse_openai_jsonl(path)
+        return parse_anthropic_record
+    # OpenAI: has a "response" object, or "response": null with an "error" (e.g.
+    # expired requests in a Batch API error file)
+    if isinstance(first.get("response"), dict) or (
+        "response" in first and "error" in first
+    ):
+        return parse_openai_record
     raise ValueError(f"Failed to determine provider for {path}")
+
+
+def iter_batch_jsonl(path: str) -> Iterator[OutputModel]:
+    """
+    Parse a response file in a single streaming pass.
+
+    The provider is detected from the first record, which is read eagerly so that
+    empty or unrecognised files fail before any output is written.
+    """
+    lines = load_jsonl_generator(path)
+    first = next(lines, None)
+    if first is None:
+        raise ValueError(f"Empty or invalid JSONL file: {path}")
+
+    parser = _detect_parser(first, path)
+    return map(parser, chain([first], lines))
+
+
+def parse_batch_jsonl(path: str) -> list[OutputModel]:
+    return list(iter_batch_jsonl(path))
@@ -1,20 +1,33 @@
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import batched
 from pathlib import Path
-from typing import List, Optional, Union
+from tempfile import TemporaryDirectory
+from typing import Iterable, Iterator, List, Optional, Union
 
 from llmbatch.models.schemas import AnthropicBatch, OpenAIBatch, Question
+from llmbatch.utils.images import configure_image_cache
 from llmbatch.utils.messages import create_anthropic_body, create_openai_body
 
 BatchFile = List[Union[OpenAIBatch, AnthropicBatch]]
 
 
-def create_batch(
-    questions: List[Question],
+def create_batch_generator(
+    questions: Iterable[Question],
     format: str,
     n_answers: int = 1,
     system_message: Optional[str] = None,
+    image_first: bool = False,
     **kwargs,
-) -> BatchFile:
-    batch: BatchFile = []
+) -> Iterator[Union[OpenAIBatch, AnthropicBatch]]:
+    """
+    Lazily build batch items, one question at a time.
+
+    Memory use is independent of the number of questions, so the result can be
+    piped straight into a JSONL writer. With `image_first`, images are placed
+    before the question, so that questions about the same image share a prompt
+    prefix that servers with prefix caching can reuse.
+    """
     if format == "openai":
         message_func = create_openai_body
     elif format == "anthropic":
@@ -22,13 +35,93 @@ def create_batch(
     else:
         raise ValueError(f"Invalid format: {format}")
 
-    for question in questions:
-        for i in range(n_answers):
-            custom_id = f"{question.question_id}_rep{i:02d}"
-            image_path = Path(question.image_path) if question.image_path else None
-            body = message_func(question.question, image_path, system_message, **kwargs)
-            if format == "openai":
-                batch.append(OpenAIBatch(custom_id=custom_id, body=body))
-            else:
-                batch.append(AnthropicBatch(custom_id=custom_id, params=body))
-    return batch
+    def generate() -> Iterator[Union[OpenAIBatch, AnthropicBatch]]:
+        for question in questions:
+            for i in range(n_answers):
+                custom_id = f"{question.question_id}_rep{i:02d}"
+                image_path = Path(question.image_path) if question.image_path else None
+                body = message_func(
+                    question.question,
+                    image_path,
+                    system_message,
+                    image_first=image_first,
+                    **kwargs,
+                )
+                if format == "openai":
+                    yield OpenAIBatch(custom_id=custom_id, body=body)
+                else:
+                    yield AnthropicBatch(custom_id=custom_id, params=body)
+
+    return generate()
+
+
+def _create_batch_chunk(
+    questions: tuple[Question, ...],
+    format: str,
+    n_answers: int,
+    system_message: Optional[str],
+    kwargs: dict,
+) -> BatchFile:
+    return create_batch(list(questions), format, n_answers, system_message, **kwargs)
+
+
+def create_batch_parallel(
+    questions: Iterable[Question],
+    format: str,
+    n_answers: int = 1,
+    system_message: Optional[str] = None,
+    workers: int = 2,
+    chunk_size: int = 16,
+    image_cache_dir: Optional[str] = None,
+    **kwargs,
+) -> Iterator[Union[OpenAIBatch, AnthropicBatch]]:
+    """
+    Like `create_batch_generator`, but builds bodies in a pool of processes.
+
+    Questions are sent to the workers in chunks of `chunk_size`, all repetitions
+    of a question staying in one chunk. Results are yielded in input order, with
+    at most `2 * workers` chunks in flight so memory stays bounded. Workers share
+    encoded images through `image_cache_dir`, or a temporary directory if unset.
+    """
+    if format not in ("openai", "anthropic"):
+        raise ValueError(f"Invalid format: {format}")
+
+    def generate() -> Iterator[Union[OpenAIBatch, AnthropicBatch]]:
+        with (
+            TemporaryDirectory(prefix="llmbatch-images-") as tmp_cache_dir,
+            ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=configure_image_cache,
+                initargs=(256, image_cache_dir or tmp_cache_dir),
+            ) as executor,
+        ):
+            pending: deque[Future[BatchFile]] = deque()
+            for chunk in batched(questions, chunk_size):
+                pending.append(
+                    executor.submit(
+                        _create_batch_chunk,
+                        chunk,
+                        format,
+                        n_answers,
+                        system_message,
+                        kwargs,
+                    )
+                )
+                if len(pending) >= 2 * workers:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+
+    return generate()
+
+
+def create_batch(
+    questions: List[Question],
+    format: str,
+    n_answers: int = 1,
+    system_message: Optional[str] = None,
+    **kwargs,
+) -> BatchFile:
+    return list(
+        create_batch_generator(questions, format, n_answers, system_message, **kwargs)
+    )
@@ -0,0 +1,98 @@
+import random
+from typing import Dict, Literal
+
+from openai import (
+    APIConnectionError,
+    APIStatusError,
+    APITimeoutError,
+    RateLimitError,
+)
+
+from llmbatch.services.rate_limiter import retry_after_seconds
+
+type ErrorClass = Literal[
+    "rate_limit", "timeout", "connection", "server", "client", "length", "unknown"
+]
+
+# Maximum number of attempts per error class; classes not listed are not retried.
+DEFAULT_MAX_ATTEMPTS: Dict[ErrorClass, int] = {
+    "rate_limit": 6,
+    "timeout": 3,
+    "connection": 3,
+    "server": 3,
+}
+
+_STATUS_CODES: Dict[ErrorClass, int] = {
+    "rate_limit": 429,
+    "timeout": 408,
+    "connection": 503,
+    # Truncated at `max_tokens`, so it is told apart from unknown errors (500)
+    "length": 422,
+}
+
+
+def classify_error(error: Exception) -> ErrorClass:
+    if isinstance(error, RateLimitError):
+        return "rate_limit"
+    if isinstance(error, APITimeoutError):
+        return "timeout"
+    if isinstance(error, APIConnectionError):
+        return "connection"
+    if isinstance(error, APIStatusError):
+        if error.status_code == 408:
+            return "timeout"
+        if error.status_code >= 500:
+            return "server"
+        return "client"
+    return "unknown"
+
+
+def error_status_code(error: Exception) -> int:
+    """Status code recorded for a failed request; 500 when nothing better is known."""
+    if isinstance(error, APIStatusError):
+        return error.status_code
+    return _STATUS_CODES.get(classify_error(error), 500)
+
+
+def finish_reason_status_code(finish_reason: str | None) -> int:
+    """Status code recorded for a completion; 200 only if it stopped by itself."""
+    if finish_reason == "stop":
+        return 200
+    if finish_reason == "length":
+        return _STATUS_CODES["length"]
+    return 500
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter and per-error-class attempt limits.
+
+    The delay before retry `n` is drawn uniformly from
+    `[0, min(max_delay, base_delay * 2 ** (n - 1))]`; a provider `retry-after`
+    header is used as a lower bound.
+    """
+
+    def __init__(
+        self,
+        max_attempts: Dict[ErrorClass, int] | None = None,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+    ):
+        self.max_attempts: Dict[ErrorClass, int] = (
+            DEFAULT_MAX_ATTEMPTS if max_attempts is None else max_attempts
+        )
+        self.base_delay: float = base_delay
+        self.max_delay: float = max_delay
+
+    def should_retry(self, error: Exception, attempt: int) -> bool:
+        return attempt < self.max_attempts.get(classify_error(error), 1)
+
+    def delay(self, error: Exception, attempt: int) -> float:
+        backoff = random.uniform(
+            0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        )
+        response = getattr(error, "response", None)
+        retry_after = retry_after_seconds(getattr(response, "headers", None))
+        if retry_after is not None:
+            return max(backoff, min(retry_after, self.max_delay))
+        return backoff
@@ -0,0 +1,187 @@
+import hashlib
+import json
+from array import array
+from typing import Any, Collection, Dict, Iterator, List, Literal
+
+from llmbatch.models.schemas import Body, OpenAIBatch
+from llmbatch.utils import codec
+from llmbatch.utils.tokens import (
+    MESSAGE_OVERHEAD_TOKENS,
+    estimate_content_tokens,
+    estimate_prompt_tokens,
+)
+
+type SchedulePolicy = Literal["fifo", "longest-first", "shortest-first", "prefix"]
+
+SCHEDULE_POLICIES: tuple[SchedulePolicy, ...] = (
+    "fifo",
+    "longest-first",
+    "shortest-first",
+    "prefix",
+)
+
+_IMAGE_PART_TYPES = ("image_url", "image")
+
+# Prefill processes the prompt in parallel, so a prompt token costs a small
+# fraction of a generated token
+PREFILL_TOKEN_COST = 0.1
+
+
+def estimate_cost(body: Body) -> float:
+    """Relative processing time of a request, in generated-token equivalents."""
+    return estimate_prompt_tokens(body) * PREFILL_TOKEN_COST + body.max_tokens
+
+
+def _digest(value: Any) -> bytes:
+    canonical = json.dumps(value, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=8).digest()
+
+
+def _prompt_parts(body: Body) -> List[tuple[Any, int]]:
+    """The prompt as `(part, estimated tokens)` units, in the order it is tokenized."""
+    parts: List[tuple[Any, int]] = []
+    system = getattr(body, "system", None)
+    if system:
+        parts.append((system, estimate_content_tokens(system)))
+    if not body.messages:
+        return parts
+    *history, last = body.messages
+    for message in history:
+        content = message.get("content", "")
+        parts.append(
+            (message, MESSAGE_OVERHEAD_TOKENS + estimate_content_tokens(content))
+        )
+    content = last.get("content", "")
+    if isinstance(content, str):
+        parts.append((last, MESSAGE_OVERHEAD_TOKENS + estimate_content_tokens(content)))
+    else:
+        parts.append((last.get("role"), MESSAGE_OVERHEAD_TOKENS))
+        parts.extend((part, estimate_content_tokens([part])) for part in content)
+    return parts
+
+
+def prefix_key(body: Body) -> bytes:
+    """
+    Sort key grouping requests by system prompt, then image, then question.
+
+    Every component is a 64-bit digest, so requests with equal keys have the
+    same prompt; the repetitions of a question end up next to each other.
+    """
+    system = getattr(body, "system", None)
+    # A request without messages is grouped by its system prompt alone
+    *history, last = body.messages or [{}]
+    content = last.get("content", "")
+    parts = [{"type": "text", "text": content}] if isinstance(content, str) else content
+    images = [part for part in parts if part.get("type") in _IMAGE_PART_TYPES]
+    rest = [part for part in parts if part.get("type") not in _IMAGE_PART_TYPES]
+    return (
+        _digest([system, history]) + _digest(images) + _digest([last.get("role"), rest])
+    )
+
+
+class Schedule:
+    """
+    Requests of a batch file in the order they should be dispatched.
+
+    Only the file offset of every request is kept (8 bytes each); the requests
+    themselves are read back from the file one at a time while iterating.
+    """
+
+    def __init__(self, file_path: str, offsets: array, total_cost: float = 0.0):
+        self.file_path: str = file_path
+        self.offsets: array = offsets
+        self.total_cost: float = total_cost
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def iter_lines(self) -> Iterator[bytes]:
+        with open(self.file_path, "rb") as f:
+            for offset in self.offsets:
+                f.seek(offset)
+                yield f.readline()
+
+    def __iter__(self) -> Iterator[OpenAIBatch]:
+        for line in self.iter_lines():
+            yield OpenAIBatch(**codec.loads(line))
+
+
+def plan_schedule(
+    file_path: str,
+    policy: SchedulePolicy = "fifo",
+    skip: Collection[str] = frozenset(),
+) -> Schedule:
+    """
+    Order the requests of a batch file by `policy`, leaving out the `skip` IDs.
+
+    `longest-first` dispatches the most expensive requests (by `estimate_cost`)
+    first, so that under concurrency a few long requests do not start last and
+    stretch the end of the batch; `shortest-first` gets many results early.
+    `prefix` groups requests by `prefix_key`, so that consecutive requests share
+    the longest possible prompt prefix and hit the server's prefix (KV) cache.
+    Sorting is stable: requests of equal cost or prefix keep the file order.
+    """
+    if policy not in SCHEDULE_POLICIES:
+        raise ValueError(f"Unknown schedule policy: {policy}")
+    costs = array("d")
+    offsets = array("q")
+    prefixes: List[bytes] = []
+    offset = 0
+    with open(file_path, "rb") as f:
+        for line in f:
+            item = codec.loads(line)
+            if item["custom_id"] not in skip:
+                body = Body.model_construct(**item["body"])
+                costs.append(estimate_cost(body))
+                if policy == "prefix":
+                    prefixes.append(prefix_key(body))
+                offsets.append(offset)
+            offset += len(line)
+    total_cost = sum(costs)
+
+    if policy == "longest-first":
+        order = sorted(range(len(offsets)), key=lambda i: -costs[i])
+    elif policy == "shortest-first":
+        order = sorted(range(len(offsets)), key=costs.__getitem__)
+    elif policy == "prefix":
+        order = sorted(range(len(offsets)), key=prefixes.__getitem__)
+    else:
+        return Schedule(file_path, offsets, total_cost)
+    return Schedule(file_path, array("q", (offsets[i] for i in order)), total_cost)
+
+
+def prefix_stats(schedule: Schedule) -> Dict[str, int]:
+    """
+    Count the prompt groups of a schedule and the prompt tokens it could reuse.
+
+    `reusable_tokens` is the estimated number of prompt tokens that a request
+    shares as a prefix with the one dispatched before it, i.e. the tokens a
+    server with prefix caching does not need to prefill again, assuming it keeps
+    the previous prompt cached. Group counts are exact for `prefix` schedules.
+    """
+    stats = dict(
+        requests=0,
+        system_prompts=0,
+        image_groups=0,
+        prompts=0,
+        prompt_tokens=0,
+        reusable_tokens=0,
+    )
+    previous_key = b""
+    previous_parts: List[bytes] = []
+    for line in schedule.iter_lines():
+        body = Body.model_construct(**codec.loads(line)["body"])
+        key = prefix_key(body)
+        parts = _prompt_parts(body)
+        digests = [_digest(part) for part, _ in parts]
+        stats["requests"] += 1
+        stats["system_prompts"] += key[:8] != previous_key[:8]
+        stats["image_groups"] += key[:16] != previous_key[:16]
+        stats["prompts"] += key != previous_key
+        stats["prompt_tokens"] += sum(tokens for _, tokens in parts)
+        for digest, previous, (_, tokens) in zip(digests, previous_parts, parts):
+            if digest != previous:
+                break
+            stats["reusable_tokens"] += tokens
+        previous_key, previous_parts = key, digests
+    return stats
@@ -0,0 +1,154 @@
+import os
+from typing import IO, Iterable, Iterator, Literal
+
+from pydantic import BaseModel
+
+from llmbatch.models.schemas import Shard, ShardManifest
+from llmbatch.utils import codec
+
+# Per-batch limits of the providers' batch APIs: (max requests, max bytes)
+PROVIDER_LIMITS: dict[str, tuple[int, int]] = {
+    "anthropic": (100_000, 256_000_000),
+    "openai": (50_000, 200_000_000),
+}
+
+
+def manifest_path_for(output_path: str) -> str:
+    return f"{os.path.splitext(output_path)[0]}_manifest.json"
+
+
+class ShardWriter:
+    """
+    Write JSONL lines into shards bounded by request count and byte size.
+
+    Shards are named after `output_path` with a `_NNN` suffix; a new shard is
+    started whenever the next line would exceed either limit.
+    """
+
+    def __init__(self, output_path: str, max_requests: int, max_bytes: int):
+        self.stem, self.ext = os.path.splitext(output_path)
+        self.ext = self.ext or ".jsonl"
+        self.max_requests: int = max_requests
+        self.max_bytes: int = max_bytes
+        self.shards: list[Shard] = []
+        self._file: IO[bytes] | None = None
+
+    def _open_next(self) -> None:
+        self.close()
+        path = f"{self.stem}_{len(self.shards):03d}{self.ext}"
+        self._file = open(path, "wb")
+        self.shards.append(Shard(path=path, requests=0, bytes=0))
+
+    def write_line(self, line: bytes) -> None:
+        if len(line) > self.max_bytes:
+            raise ValueError(
+                f"A single request of {len(line)} bytes exceeds the shard limit "
+                f"of {self.max_bytes} bytes"
+            )
+        shard = self.shards[-1] if self.shards else None
+        if (
+            shard is None
+            or shard.requests >= self.max_requests
+            or shard.bytes + len(line) > self.max_bytes
+        ):
+            self._open_next()
+            shard = self.shards[-1]
+        assert self._file is not None
+        self._file.write(line)
+        shard.requests += 1
+        shard.bytes += len(line)
+
+    def write(self, item: BaseModel) -> None:
+        self.write_line(codec.dump_model(item) + b"\n")
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def write_sharded_jsonl(
+    items: Iterable[BaseModel],
+    output_path: str,
+    format: Literal["openai", "anthropic"],
+    max_requests: int | None = None,
+    max_bytes: int | None = None,
+) -> ShardManifest:
+    """
+    Write items into size-bounded shards and a manifest next to `output_path`.
+
+    Limits default to the batch API limits of `format`.
+    """
+    default_requests, default_bytes = PROVIDER_LIMITS[format]
+    writer = ShardWriter(
+        output_path, max_requests or default_requests, max_bytes or default_bytes
+    )
+    try:
+        for item in items:
+            writer.write(item)
+    finally:
+        writer.close()
+
+    manifest_path = manifest_path_for(output_path)
+    manifest_dir = os.path.dirname(manifest_path)
+    shards = [
+        shard.model_copy(
+            update={"path": os.path.relpath(shard.path, manifest_dir or ".")}
+        )
+        for shard in writer.shards
+    ]
+    manifest = ShardManifest(
+        format=format,
+        total_requests=sum(shard.requests for shard in shards),
+        total_bytes=sum(shard.bytes for shard in shards),
+        shards=shards,
+    )
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        f.write(manifest.model_dump_json(indent=2))
+    return manifest
+
+
+def load_manifest(manifest_path: str) -> ShardManifest:
+    with open(manifest_path, "rb") as f:
+        return ShardManifest(**codec.loads(f.read()))
+
+
+def resolve_batch_files(file_path: str) -> list[str]:
+    """Return the shard files of a manifest, or the file itself for a JSONL file."""
+    if not file_path.endswith(".json"):
+        return [file_path]
+    manifest_dir = os.path.dirname(file_path)
+    return [
+        os.path.join(manifest_dir, shard.path)
+        for shard in load_manifest(file_path).shards
+    ]
+
+
+def iter_line_chunks(
+    file_paths: Iterable[str], max_requests: int, max_bytes: int
+) -> Iterator[list[bytes]]:
+    """Read raw JSONL lines from files in chunks that respect both limits."""
+    chunk: list[bytes] = []
+    chunk_bytes = 0
+    for file_path in file_paths:
+        with open(file_path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    line += b"\n"
+                if chunk and (
+                    len(chunk) >= max_requests or chunk_bytes + len(line) > max_bytes
+                ):
+                    yield chunk
+                    chunk, chunk_bytes = [], 0
+                chunk.append(line)
+                chunk_bytes += len(line)
+    if chunk:
+        yield chunk
+
+
+def iter_request_chunks(
+    file_paths: Iterable[str], max_requests: int, max_bytes: int
+) -> Iterator[list[dict]]:
+    """Like `iter_line_chunks`, but with each line decoded."""
+    for chunk in iter_line_chunks(file_paths, max_requests, max_bytes):
+        yield [codec.loads(line) for line in chunk]
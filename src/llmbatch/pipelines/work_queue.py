@@ -0,0 +1,322 @@
+import asyncio
+import logging
+import os
+import socket
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from typing import Any, AsyncIterator, Callable, Iterator, List, Tuple
+from uuid import uuid4
+
+from llmbatch.models.responses import BatchResponse
+from llmbatch.models.schemas import OpenAIBatch
+from llmbatch.pipelines.inference import run_batch
+from llmbatch.pipelines.schedule import SchedulePolicy, plan_schedule
+from llmbatch.utils import codec
+
+logger = logging.getLogger(__name__)
+
+# Attempts at a queue operation that fails with `sqlite3.OperationalError`, e.g.
+# because other workers kept the database locked for the whole `timeout`; the
+# delay between attempts doubles from `DB_RETRY_DELAY` seconds
+DB_ATTEMPTS = 5
+DB_RETRY_DELAY = 2.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS requests (
+    custom_id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    request BLOB NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    lease_owner TEXT,
+    lease_expires REAL,
+    leases INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS requests_status ON requests (status, position);
+CREATE TABLE IF NOT EXISTS results (
+    custom_id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    response BLOB NOT NULL
+);
+"""
+
+
+class WorkQueue:
+    """
+    Batch requests in an SQLite file that several worker processes draw from.
+
+    Workers lease requests for `lease_seconds` and must renew the lease with
+    `heartbeat` while they work on them. Leases that expire, e.g. because the
+    worker crashed, are handed out again. Results are committed with `complete`;
+    the first result committed for a request wins.
+
+    The database uses a rollback journal rather than WAL, so it can also be
+    shared by machines mounting the same filesystem. The connection may be used
+    from any thread, but from one at a time; `run_worker` makes all its calls
+    from a dedicated thread, so that waiting for the lock never blocks the event
+    loop.
+    """
+
+    def __init__(self, path: str, timeout: float = 60.0):
+        self.path: str = path
+        self._conn = sqlite3.connect(
+            path, timeout=timeout, isolation_level=None, check_same_thread=False
+        )
+        self._conn.executescript(_SCHEMA)
+
+    def _transaction(self) -> "_Transaction":
+        return _Transaction(self._conn)
+
+    @property
+    def batch_id(self) -> str | None:
+        row = self._conn.execute(
+            "SELECT value FROM meta WHERE key = 'batch_id'"
+        ).fetchone()
+        return row[0] if row else None
+
+    def load(
+        self,
+        file_path: str,
+        batch_id: str | None = None,
+        schedule: SchedulePolicy = "fifo",
+    ) -> int:
+        """
+        Add the requests of a batch JSONL file and return how many were new.
+
+        Requests are leased, and exported, in the order of the `schedule` policy.
+        Loading the same file again is a no-op, so an interrupted load can simply
+        be repeated.
+        """
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO meta VALUES ('batch_id', ?)",
+                (batch_id or str(uuid4().hex),),
+            )
+            before = conn.execute("SELECT COUNT(*) FROM requests").fetchone()[0]
+            lines = plan_schedule(file_path, schedule).iter_lines()
+            conn.executemany(
+                "INSERT OR IGNORE INTO requests (custom_id, position, request) "
+                "VALUES (?, ?, ?)",
+                (
+                    (codec.loads(line)["custom_id"], position, line)
+                    for position, line in enumerate(lines)
+                ),
+            )
+            after = conn.execute("SELECT COUNT(*) FROM requests").fetchone()[0]
+        return after - before
+
+    def lease(
+        self, worker_id: str, count: int, lease_seconds: float
+    ) -> List[OpenAIBatch]:
+        """Lease up to `count` pending requests, requeueing expired leases first."""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE requests SET status = 'pending', lease_owner = NULL "
+                "WHERE status = 'leased' AND lease_expires < ?",
+                (now,),
+            )
+            rows = conn.execute(
+                "SELECT custom_id, request FROM requests WHERE status = 'pending' "
+                "ORDER BY position LIMIT ?",
+                (count,),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE requests SET status = 'leased', lease_owner = ?, "
+                "lease_expires = ?, leases = leases + 1 WHERE custom_id = ?",
+                ((worker_id, now + lease_seconds, row[0]) for row in rows),
+            )
+        return [OpenAIBatch(**codec.loads(row[1])) for row in rows]
+
+    def heartbeat(self, worker_id: str, lease_seconds: float) -> int:
+        """Extend every lease held by `worker_id` and return how many."""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE requests SET lease_expires = ? "
+                "WHERE status = 'leased' AND lease_owner = ?",
+                (time.time() + lease_seconds, worker_id),
+            )
+        return cursor.rowcount
+
+    def complete(self, responses: List[BatchResponse]) -> None:
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO results (custom_id, position, response) "
+                "SELECT custom_id, position, ? FROM requests WHERE custom_id = ?",
+                (
+                    (codec.dump_model(response), response.custom_id)
+                    for response in responses
+                ),
+            )
+            conn.executemany(
+                "UPDATE requests SET status = 'done', lease_owner = NULL "
+                "WHERE custom_id = ?",
+                ((response.custom_id,) for response in responses),
+            )
+
+    def counts(self) -> dict[str, int]:
+        rows = self._conn.execute(
+            "SELECT status, COUNT(*) FROM requests GROUP BY status"
+        ).fetchall()
+        return {"pending": 0, "leased": 0, "done": 0, **dict(rows)}
+
+    def iter_results(self) -> Iterator[bytes]:
+        """Committed responses as JSON, in the order the requests were loaded."""
+        for (response,) in self._conn.execute(
+            "SELECT response FROM results ORDER BY position"
+        ):
+            yield response
+
+    def export(self, output_path: str) -> int:
+        count = 0
+        with open(output_path, "wb") as f:
+            for response in self.iter_results():
+                f.write(response + b"\n")
+                count += 1
+        return count
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class _Transaction:
+    """`BEGIN IMMEDIATE` transaction, so concurrent writers queue up on the lock."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, *args: Any) -> None:
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+async def run_worker(
+    queue: WorkQueue,
+    worker_id: str | None = None,
+    concurrency: int = 1,
+    lease_seconds: float = 300.0,
+    commit_every: int | None = None,
+    wait_for_others: bool = True,
+    on_result: Callable[[BatchResponse], None] | None = None,
+    **run_batch_kwargs,
+) -> Tuple[int, int]:
+    """
+    Process leased requests with `run_batch` until the queue is drained.
+
+    Requests are leased `concurrency` at a time as `run_batch` pulls them, and
+    results are committed every `commit_every` responses (default:
+    `concurrency`). A background task renews the leases every
+    `lease_seconds / 3`. With `wait_for_others`, the worker keeps polling while
+    other workers hold leases, so that it picks up their requests if they die.
+    `on_result` is called for every response, e.g. to report progress.
+    Queue operations run in a dedicated thread and are retried `DB_ATTEMPTS`
+    times when the database stays locked.
+    Returns the number of processed and failed requests.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid4().hex[:8]}"
+    commit_every = commit_every or concurrency
+    batch_id = queue.batch_id or str(uuid4().hex)
+    responses: List[BatchResponse] = []
+    commits: set[asyncio.Task[None]] = set()
+    processed = failed = 0
+    loop = asyncio.get_running_loop()
+    db = ThreadPoolExecutor(max_workers=1, thread_name_prefix="work-queue")
+
+    async def call_db[T](func: Callable[..., T], *args: Any) -> T:
+        attempt = 1
+        while True:
+            try:
+                return await loop.run_in_executor(db, func, *args)
+            except sqlite3.OperationalError as e:
+                if attempt >= DB_ATTEMPTS:
+                    raise
+                logger.warning(
+                    "Work queue %s: %s (attempt %d/%d)",
+                    queue.path,
+                    e,
+                    attempt,
+                    DB_ATTEMPTS,
+                )
+                await asyncio.sleep(min(DB_RETRY_DELAY * 2 ** (attempt - 1), 30.0))
+                attempt += 1
+
+    async def leased_requests() -> AsyncIterator[OpenAIBatch]:
+        while requests := await call_db(
+            queue.lease, worker_id, concurrency, lease_seconds
+        ):
+            for request in requests:
+                yield request
+
+    async def commit(batch: List[BatchResponse]) -> None:
+        await call_db(queue.complete, batch)
+        logger.info("Worker %s committed %d responses", worker_id, len(batch))
+
+    def start_commit() -> None:
+        nonlocal responses
+        # The single database thread commits batches in the order they started
+        task = asyncio.create_task(commit(responses))
+        commits.add(task)
+        task.add_done_callback(commits.discard)
+        responses = []
+
+    def collect(response: BatchResponse) -> None:
+        nonlocal processed, failed
+        if on_result is not None:
+            on_result(response)
+        responses.append(response)
+        processed += 1
+        failed += response.response.status_code != 200
+        if len(responses) >= commit_every:
+            start_commit()
+
+    async def heartbeat() -> None:
+        while True:
+            await asyncio.sleep(lease_seconds / 3)
+            try:
+                await call_db(queue.heartbeat, worker_id, lease_seconds)
+            except sqlite3.OperationalError as e:
+                logger.error("Worker %s could not renew its leases: %s", worker_id, e)
+
+    heartbeat_task = asyncio.create_task(heartbeat())
+    try:
+        while True:
+            await run_batch(
+                leased_requests(),
+                batch_id,
+                collect,
+                concurrency=concurrency,
+                **run_batch_kwargs,
+            )
+            if responses:
+                start_commit()
+            await asyncio.gather(*commits)
+            if not wait_for_others or not (await call_db(queue.counts))["leased"]:
+                break
+            await asyncio.sleep(min(lease_seconds / 3, 5.0))
+    finally:
+        heartbeat_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await heartbeat_task
+        # Let commits that already started finish before the thread goes away
+        await asyncio.gather(*commits, return_exceptions=True)
+        if responses:
+            # Interrupted (e.g. Ctrl-C or SIGTERM): keep the responses collected so
+            # far, so that they are not leased and paid for again
+            try:
+                await commit(responses)
+            except Exception:
+                logger.exception(
+                    "Worker %s could not commit %d responses",
+                    worker_id,
+                    len(responses),
+                )
+        db.shutdown()
+    return processed, failed
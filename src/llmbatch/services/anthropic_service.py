@@ -0,0 +1,55 @@
+import asyncio
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from anthropic import AsyncAnthropic
+from anthropic.types.messages import MessageBatch, MessageBatchIndividualResponse
+
+
+class AsyncAnthropicBatchService:
+    """
+    Drives the Message Batches API: submit, poll until ended, stream results.
+
+    Pass `client` to point the service at another endpoint, e.g. a local
+    stand-in for the batches API in tests.
+    """
+
+    def __init__(
+        self,
+        client: Optional[AsyncAnthropic] = None,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        poll_interval: float = 10.0,
+        max_poll_interval: float = 300.0,
+        poll_backoff: float = 1.5,
+    ):
+        self.poll_interval: float = poll_interval
+        self.max_poll_interval: float = max_poll_interval
+        self.poll_backoff: float = poll_backoff
+        self.client: AsyncAnthropic = client or AsyncAnthropic(
+            api_key=api_key or os.getenv("ANTHROPIC_API_KEY"), base_url=base_url
+        )
+
+    async def submit(self, requests: List[Dict[str, Any]]) -> MessageBatch:
+        return await self.client.messages.batches.create(requests=requests)
+
+    async def wait(self, batch_id: str) -> MessageBatch:
+        """Poll a batch until it has ended, backing off between polls."""
+        interval = self.poll_interval
+        while True:
+            batch = await self.client.messages.batches.retrieve(batch_id)
+            if batch.processing_status == "ended":
+                return batch
+            await asyncio.sleep(interval)
+            interval = min(interval * self.poll_backoff, self.max_poll_interval)
+
+    async def results(
+        self, batch_id: str
+    ) -> AsyncIterator[MessageBatchIndividualResponse]:
+        """Stream the results of an ended batch one record at a time."""
+        decoder = await self.client.messages.batches.results(batch_id)
+        async for result in decoder:
+            yield result
+
+    async def close(self) -> None:
+        await self.client.close()
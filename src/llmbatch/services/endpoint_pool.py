@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from openai import APIConnectionError, APIStatusError
+from openai.types.chat.chat_completion import ChatCompletion
+
+from llmbatch.services.openai_service import AsyncOpenAIService
+from llmbatch.services.streaming import StreamedCompletion
+
+logger = logging.getLogger(__name__)
+
+BASE_URLS_ENV = "LLMBATCH_BASE_URLS"
+
+
+def base_urls_from_env() -> List[str]:
+    """Base URLs listed in `LLMBATCH_BASE_URLS`, separated by commas or whitespace."""
+    value = os.getenv(BASE_URLS_ENV, "")
+    return [url for url in value.replace(",", " ").split() if url]
+
+
+def _is_endpoint_failure(error: Exception) -> bool:
+    # Timeouts, refused connections and 5xx say something about the endpoint;
+    # 4xx (including 429) are about the request or the account
+    if isinstance(error, APIConnectionError):
+        return True
+    return isinstance(error, APIStatusError) and error.status_code >= 500
+
+
+class Endpoint:
+    def __init__(self, base_url: str, service: AsyncOpenAIService):
+        self.base_url: str = base_url
+        self.service: AsyncOpenAIService = service
+        self.outstanding: int = 0
+        self.failures: int = 0
+        self.ejections: int = 0
+        self.ejected_until: float = 0.0
+        self.checking: bool = False
+
+    def healthy(self, now: float) -> bool:
+        return self.ejected_until <= now and not self.checking
+
+
+class AsyncEndpointPool:
+    """
+    Spreads requests over several OpenAI-compatible servers.
+
+    Each request goes to the healthy endpoint with the fewest requests in flight.
+    After `max_failures` consecutive endpoint failures (connection errors,
+    timeouts, 5xx) an endpoint is ejected for `cooldown` seconds, doubling on
+    every further ejection up to `max_cooldown`. Once the cooldown is over, the
+    endpoint is readmitted only after a health check (`GET /models`) succeeds.
+    If every endpoint is ejected, requests go to the least loaded one anyway so
+    that the retry policy decides what happens to them.
+
+    Exposes the same `create_completion` / `stream_completion` / `close` interface
+    as `AsyncOpenAIService`, so it can be passed wherever a service is expected.
+    """
+
+    def __init__(
+        self,
+        base_urls: Sequence[str],
+        max_failures: int = 3,
+        cooldown: float = 10.0,
+        max_cooldown: float = 300.0,
+        health_timeout: float = 5.0,
+        services: Optional[Sequence[AsyncOpenAIService]] = None,
+        **service_kwargs,
+    ):
+        if not base_urls:
+            raise ValueError("At least one base URL is required")
+        if services is None:
+            services = [
+                AsyncOpenAIService(base_url=url, **service_kwargs) for url in base_urls
+            ]
+        self.endpoints: List[Endpoint] = [
+            Endpoint(url, service) for url, service in zip(base_urls, services)
+        ]
+        self.max_failures: int = max_failures
+        self.cooldown: float = cooldown
+        self.max_cooldown: float = max_cooldown
+        self.health_timeout: float = health_timeout
+        self._next: int = 0
+        self._checks: set[asyncio.Task] = set()
+
+    def _pick(self) -> Endpoint:
+        now = time.monotonic()
+        for endpoint in self.endpoints:
+            if endpoint.ejected_until and endpoint.ejected_until <= now:
+                self._start_health_check(endpoint)
+        candidates = [e for e in self.endpoints if e.healthy(now)] or self.endpoints
+        # Rotate the starting point so ties are spread evenly
+        self._next += 1
+        start = self._next % len(candidates)
+        rotated = candidates[start:] + candidates[:start]
+        return min(rotated, key=lambda e: e.outstanding)
+
+    def _eject(self, endpoint: Endpoint) -> None:
+        duration = min(self.cooldown * 2**endpoint.ejections, self.max_cooldown)
+        endpoint.ejections += 1
+        endpoint.ejected_until = time.monotonic() + duration
+        logger.warning("Ejected %s for %.0f s", endpoint.base_url, duration)
+
+    def _start_health_check(self, endpoint: Endpoint) -> None:
+        if endpoint.checking:
+            return
+        endpoint.checking = True
+        task = asyncio.create_task(self._health_check(endpoint))
+        self._checks.add(task)
+        task.add_done_callback(self._checks.discard)
+
+    async def _health_check(self, endpoint: Endpoint) -> None:
+        client = getattr(endpoint.service.client, "client", endpoint.service.client)
+        try:
+            await client.with_options(
+                timeout=self.health_timeout, max_retries=0
+            ).models.list()
+        except Exception as e:
+            logger.warning("Health check of %s failed: %s", endpoint.base_url, e)
+            self._eject(endpoint)
+        else:
+            logger.info("Readmitted %s", endpoint.base_url)
+            endpoint.ejected_until = 0.0
+            endpoint.ejections = 0
+            endpoint.failures = 0
+        finally:
+            endpoint.checking = False
+
+    async def create_completion(
+        self, messages: List[Dict[str, Any]], **kwargs
+    ) -> ChatCompletion:
+        return await self._call("create_completion", messages, **kwargs)
+
+    async def stream_completion(
+        self, messages: List[Dict[str, Any]], **kwargs
+    ) -> StreamedCompletion:
+        return await self._call("stream_completion", messages, **kwargs)
+
+    async def _call(self, method: str, messages: List[Dict[str, Any]], **kwargs):
+        endpoint = self._pick()
+        endpoint.outstanding += 1
+        try:
+            response = await getattr(endpoint.service, method)(messages, **kwargs)
+        except Exception as e:
+            if _is_endpoint_failure(e):
+                endpoint.failures += 1
+                if (
+                    endpoint.failures >= self.max_failures
+                    and not endpoint.ejected_until
+                ):
+                    self._eject(endpoint)
+            raise
+        finally:
+            endpoint.outstanding -= 1
+        endpoint.failures = 0
+        return response
+
+    async def close(self) -> None:
+        for task in self._checks:
+            task.cancel()
+        for endpoint in self.endpoints:
+            await endpoint.service.close()
@@ -1,26 +1,86 @@
-from typing import Any, Dict, List
+import asyncio
+import os
+import time
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional
 
-import instructor
+import httpx
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+from openai.types import Batch
 from openai.types.chat.chat_completion import ChatCompletion
 
+from llmbatch.services.streaming import (
+    StreamedCompletion,
+    StreamStalledError,
+    consume_stream,
+)
+
+if TYPE_CHECKING:
+    # instructor takes longer to import than openai itself; it is only imported
+    # when a patched client is created
+    import instructor
+
 load_dotenv()
 
 type LLMClient = OpenAI | instructor.Instructor
+type AsyncLLMClient = AsyncOpenAI | instructor.AsyncInstructor
+
+DEFAULT_BASE_URL = "http://localhost:11434/v1/"
+DEFAULT_API_KEY = "ollama"
+BATCH_TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def _pool_limits(max_connections: int, keepalive_expiry: float) -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_connections,
+        keepalive_expiry=keepalive_expiry,
+    )
 
 
 class OpenAIService:
-    def __init__(self, patched: bool = False):
+    """
+    Wraps a single OpenAI-compatible client and its keep-alive connection pool.
+
+    Create one instance per run and share it across requests so that client
+    construction and TCP/TLS setup are paid once instead of per request.
+    """
+
+    def __init__(
+        self,
+        patched: bool = False,
+        base_url: str = DEFAULT_BASE_URL,
+        api_key: str = DEFAULT_API_KEY,
+        max_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 600.0,
+        http2: bool = False,
+        max_retries: int = 2,
+    ):
         self.patched: bool = patched
+        self.base_url: str = base_url
+        self.api_key: str = api_key
+        self.max_connections: int = max_connections
+        self.keepalive_expiry: float = keepalive_expiry
+        self.timeout: float = timeout
+        self.http2: bool = http2
+        self.max_retries: int = max_retries
         self.client: LLMClient = self._get_client()
 
     def _get_client(self) -> LLMClient:
         client: OpenAI = OpenAI(
-            base_url="http://localhost:11434/v1/",
-            api_key="ollama",
+            base_url=self.base_url,
+            api_key=self.api_key,
+            timeout=self.timeout,
+            max_retries=self.max_retries,
+            http_client=DefaultHttpxClient(
+                limits=_pool_limits(self.max_connections, self.keepalive_expiry),
+                http2=self.http2,
+            ),
         )
         if self.patched:
+            import instructor
+
             return instructor.from_openai(client)
         return client
 
@@ -33,6 +93,169 @@ class OpenAIService:
         }
         return self.client.chat.completions.create(**completion_params)
 
+    def close(self) -> None:
+        client = getattr(self.client, "client", self.client)
+        client.close()
+
+
+class AsyncOpenAIService:
+    """Asyncio counterpart of `OpenAIService` used by the concurrent run engine."""
+
+    def __init__(
+        self,
+        patched: bool = False,
+        base_url: str = DEFAULT_BASE_URL,
+        api_key: str = DEFAULT_API_KEY,
+        max_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 600.0,
+        http2: bool = False,
+        max_retries: int = 2,
+    ):
+        self.patched: bool = patched
+        self.base_url: str = base_url
+        self.api_key: str = api_key
+        self.max_connections: int = max_connections
+        self.keepalive_expiry: float = keepalive_expiry
+        self.timeout: float = timeout
+        self.http2: bool = http2
+        self.max_retries: int = max_retries
+        self.client: AsyncLLMClient = self._get_client()
+
+    def _get_client(self) -> AsyncLLMClient:
+        client: AsyncOpenAI = AsyncOpenAI(
+            base_url=self.base_url,
+            api_key=self.api_key,
+            timeout=self.timeout,
+            max_retries=self.max_retries,
+            http_client=DefaultAsyncHttpxClient(
+                limits=_pool_limits(self.max_connections, self.keepalive_expiry),
+                http2=self.http2,
+            ),
+        )
+        if self.patched:
+            import instructor
+
+            return instructor.from_openai(client)
+        return client
+
+    async def create_completion(
+        self, messages: List[Dict[str, Any]], **kwargs
+    ) -> ChatCompletion:
+        completion_params = {
+            "messages": messages,
+            **kwargs,
+        }
+        return await self.client.chat.completions.create(**completion_params)
+
+    async def stream_completion(
+        self,
+        messages: List[Dict[str, Any]],
+        stall_timeout: Optional[float] = None,
+        first_token_timeout: Optional[float] = None,
+        **kwargs,
+    ) -> StreamedCompletion:
+        """
+        Like `create_completion`, but streams the tokens to measure their timing.
+
+        A stream that stalls for longer than `stall_timeout` after a chunk, or has
+        no first token `first_token_timeout` seconds after the request started
+        (including the wait for the response headers), is closed and raises
+        `StreamStalledError`, so its connection is freed at once.
+        """
+        client = getattr(self.client, "client", self.client)
+        start = time.perf_counter()
+        try:
+            stream = await asyncio.wait_for(
+                client.chat.completions.create(
+                    messages=messages,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    **kwargs,
+                ),
+                first_token_timeout,
+            )
+        except asyncio.TimeoutError:
+            request = httpx.Request("POST", client.base_url.join("chat/completions"))
+            raise StreamStalledError(
+                request, time.perf_counter() - start, first_token=True
+            ) from None
+        try:
+            return await consume_stream(
+                stream,
+                stream.response.request,
+                stall_timeout,
+                first_token_timeout,
+                start,
+            )
+        finally:
+            await stream.close()
+
+    async def close(self) -> None:
+        client = getattr(self.client, "client", self.client)
+        await client.close()
+
+
+class AsyncOpenAIBatchService:
+    """
+    Drives the OpenAI Batch API: upload and create, poll, stream result files.
+
+    Pass `client` to point the service at another endpoint, e.g. a local mock
+    server in tests.
+    """
+
+    def __init__(
+        self,
+        client: Optional[AsyncOpenAI] = None,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        poll_interval: float = 10.0,
+        max_poll_interval: float = 300.0,
+        poll_backoff: float = 1.5,
+        completion_window: str = "24h",
+    ):
+        self.poll_interval: float = poll_interval
+        self.max_poll_interval: float = max_poll_interval
+        self.poll_backoff: float = poll_backoff
+        self.completion_window: str = completion_window
+        self.client: AsyncOpenAI = client or AsyncOpenAI(
+            api_key=api_key or os.getenv("OPENAI_API_KEY"), base_url=base_url
+        )
+
+    async def submit(
+        self, content: bytes, filename: str, endpoint: str = "/v1/chat/completions"
+    ) -> Batch:
+        input_file = await self.client.files.create(
+            file=(filename, content, "application/jsonl"), purpose="batch"
+        )
+        return await self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=endpoint,
+            completion_window=self.completion_window,
+        )
+
+    async def wait(self, batch_id: str) -> Batch:
+        """Poll a batch until it has ended, backing off between polls."""
+        interval = self.poll_interval
+        while True:
+            batch = await self.client.batches.retrieve(batch_id)
+            if batch.status in BATCH_TERMINAL_STATUSES:
+                return batch
+            await asyncio.sleep(interval)
+            interval = min(interval * self.poll_backoff, self.max_poll_interval)
+
+    async def file_lines(self, file_id: str) -> AsyncIterator[bytes]:
+        """Stream a result file line by line without downloading it in full."""
+        async with self.client.files.with_streaming_response.content(
+            file_id
+        ) as response:
+            async for line in response.iter_lines():
+                if line:
+                    yield line.encode("utf-8") + b"\n"
+
+    async def close(self) -> None:
+        await self.client.close()
+
 
 if __name__ == "__main__":
     openai_service = OpenAIService()
@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Mapping
+
+logger = logging.getLogger(__name__)
+
+
+def retry_after_seconds(headers: Mapping[str, str] | None) -> float | None:
+    """Parse `retry-after-ms` / `retry-after` response headers into seconds."""
+    if not headers:
+        return None
+    if value := headers.get("retry-after-ms"):
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    if value := headers.get("retry-after"):
+        try:
+            return float(value)
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `rate_per_minute`.
+
+    The bucket holds at most `burst_seconds` worth of budget. A single acquisition
+    larger than the capacity is allowed once the bucket is full and leaves it in
+    debt, so oversized requests are delayed instead of blocked forever.
+    """
+
+    def __init__(self, rate_per_minute: float, burst_seconds: float = 10.0):
+        if rate_per_minute <= 0:
+            raise ValueError(f"Rate must be positive, got {rate_per_minute}")
+        self.rate: float = rate_per_minute / 60.0
+        self.capacity: float = max(1.0, self.rate * burst_seconds)
+        self.level: float = self.capacity
+        self.updated: float = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        async with self._lock:
+            needed = min(amount, self.capacity)
+            self._refill()
+            while self.level < needed:
+                await asyncio.sleep((needed - self.level) / self.rate)
+                self._refill()
+            self.level -= amount
+
+    def drain(self) -> None:
+        """Empty the bucket, e.g. after the provider reported a rate limit."""
+        self._refill()
+        self.level = min(self.level, 0.0)
+
+
+class AdaptiveConcurrency:
+    """
+    Concurrency limit adjusted AIMD-style.
+
+    Every success raises the limit by `1 / limit` (about +1 per window of
+    requests), every throttle halves it. Throttles arriving within `cooldown`
+    seconds of the last decrease are treated as the same congestion event.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, cooldown: float = 1.0):
+        self.max_limit: int = max_limit
+        self.min_limit: int = min(min_limit, max_limit)
+        self.cooldown: float = cooldown
+        self.limit: float = float(max_limit)
+        self.in_flight: int = 0
+        self._last_decrease: float = float("-inf")
+        self._condition = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self) -> None:
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self) -> None:
+        self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+
+    def on_throttle(self) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.min_limit), self.limit / 2)
+        logger.info("Rate limited, reducing concurrency to %d", int(self.limit))
+
+
+class RateLimiter:
+    """
+    Client-side budget for requests-per-minute and tokens-per-minute limits.
+
+    Each request waits for an RPM token, its estimated token count from the TPM
+    bucket and a slot from the adaptive concurrency limit. When the provider still
+    answers with 429, `on_rate_limited` pauses all requests for `retry-after`
+    seconds and halves the concurrency.
+    """
+
+    def __init__(
+        self,
+        rpm: float | None = None,
+        tpm: float | None = None,
+        max_concurrency: int = 1,
+        min_concurrency: int = 1,
+        default_backoff: float = 1.0,
+    ):
+        self.requests: TokenBucket | None = TokenBucket(rpm) if rpm else None
+        self.tokens: TokenBucket | None = TokenBucket(tpm) if tpm else None
+        self.concurrency = AdaptiveConcurrency(max_concurrency, min_concurrency)
+        self.default_backoff: float = default_backoff
+        self.paused_until: float = 0.0
+        self.throttled: int = 0
+
+    @asynccontextmanager
+    async def limit(self, tokens: int) -> AsyncIterator[None]:
+        await self.concurrency.acquire()
+        try:
+            while (delay := self.paused_until - time.monotonic()) > 0:
+                await asyncio.sleep(delay)
+            if self.requests:
+                await self.requests.acquire()
+            if self.tokens:
+                await self.tokens.acquire(tokens)
+            yield
+        finally:
+            await self.concurrency.release()
+
+    def on_success(self) -> None:
+        self.concurrency.on_success()
+
+    def on_rate_limited(self, retry_after: float | None = None) -> None:
+        self.throttled += 1
+        delay = retry_after if retry_after is not None else self.default_backoff
+        self.paused_until = max(self.paused_until, time.monotonic() + delay)
+        for bucket in (self.requests, self.tokens):
+            if bucket:
+                bucket.drain()
+        self.concurrency.on_throttle()
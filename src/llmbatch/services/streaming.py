@@ -0,0 +1,194 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+from openai import APIConnectionError, APITimeoutError
+from openai.types.chat.chat_completion import ChatCompletion, Choice
+from openai.types.chat.chat_completion_chunk import ChatCompletionChunk
+from openai.types.chat.chat_completion_message import ChatCompletionMessage
+
+
+class StreamStalledError(APITimeoutError):
+    """No chunk or first token arrived in time; retried like any other timeout."""
+
+    def __init__(
+        self, request: httpx.Request, waited: float, first_token: bool = False
+    ):
+        super().__init__(request)
+        self.message = (
+            f"No first token after {waited:.1f} s"
+            if first_token
+            else f"Token stream stalled for {waited:.1f} s"
+        )
+        self.args = (self.message,)
+
+
+def _remaining(timeout: Optional[float], start: float) -> Optional[float]:
+    """Seconds left of `timeout` counted from the `time.perf_counter()` `start`."""
+    if timeout is None:
+        return None
+    return max(0.0, timeout - (time.perf_counter() - start))
+
+
+def _has_token(chunk: ChatCompletionChunk) -> bool:
+    """Whether a chunk carries output: text, a refusal, tool calls or reasoning."""
+    return any(
+        choice.delta.content
+        or choice.delta.refusal
+        or choice.delta.tool_calls
+        or getattr(choice.delta, "reasoning_content", None)
+        or getattr(choice.delta, "reasoning", None)
+        for choice in chunk.choices
+    )
+
+
+class StreamedCompletion:
+    """A streamed completion assembled into a `ChatCompletion`, with its timing."""
+
+    def __init__(
+        self,
+        completion: ChatCompletion,
+        ttft: Optional[float],
+        inter_token: Optional[float],
+    ):
+        self.completion: ChatCompletion = completion
+        self.ttft: Optional[float] = ttft
+        self.inter_token: Optional[float] = inter_token
+
+
+class _ChoiceBuilder:
+    def __init__(self) -> None:
+        self.role: str = "assistant"
+        self.content: List[str] = []
+        self.refusal: List[str] = []
+        self.tool_calls: Dict[int, Dict[str, Any]] = {}
+        self.finish_reason: Optional[str] = None
+
+    def add(self, choice: Any) -> None:
+        delta = choice.delta
+        if delta.role:
+            self.role = delta.role
+        if delta.content:
+            self.content.append(delta.content)
+        if delta.refusal:
+            self.refusal.append(delta.refusal)
+        for call in delta.tool_calls or []:
+            entry = self.tool_calls.setdefault(
+                call.index,
+                {
+                    "id": None,
+                    "type": "function",
+                    "function": {"name": "", "arguments": ""},
+                },
+            )
+            if call.id:
+                entry["id"] = call.id
+            if call.function is not None:
+                entry["function"]["name"] += call.function.name or ""
+                entry["function"]["arguments"] += call.function.arguments or ""
+        if choice.finish_reason:
+            self.finish_reason = choice.finish_reason
+
+    def build(self, index: int) -> Choice:
+        message = ChatCompletionMessage(
+            role=self.role,
+            content="".join(self.content) if self.content else None,
+            refusal="".join(self.refusal) if self.refusal else None,
+            tool_calls=[self.tool_calls[i] for i in sorted(self.tool_calls)] or None,
+        )
+        return Choice(index=index, finish_reason=self.finish_reason, message=message)
+
+
+class _CompletionBuilder:
+    def __init__(self) -> None:
+        self.first: Optional[ChatCompletionChunk] = None
+        self.choices: Dict[int, _ChoiceBuilder] = {}
+        self.usage: Any = None
+
+    def add(self, chunk: ChatCompletionChunk) -> None:
+        if self.first is None:
+            self.first = chunk
+        for choice in chunk.choices:
+            self.choices.setdefault(choice.index, _ChoiceBuilder()).add(choice)
+        if chunk.usage is not None:
+            self.usage = chunk.usage
+
+    @property
+    def finished(self) -> bool:
+        return bool(self.choices) and all(
+            choice.finish_reason is not None for choice in self.choices.values()
+        )
+
+    def build(self) -> ChatCompletion:
+        return ChatCompletion(
+            id=self.first.id,
+            object="chat.completion",
+            created=self.first.created,
+            model=self.first.model,
+            system_fingerprint=self.first.system_fingerprint,
+            choices=[self.choices[i].build(i) for i in sorted(self.choices)],
+            usage=self.usage,
+        )
+
+
+def assemble_chunks(chunks: List[ChatCompletionChunk]) -> ChatCompletion:
+    """Merge stream chunks into the `ChatCompletion` a non-streaming call returns."""
+    builder = _CompletionBuilder()
+    for chunk in chunks:
+        builder.add(chunk)
+    return builder.build()
+
+
+async def consume_stream(
+    stream: AsyncIterator[ChatCompletionChunk],
+    request: httpx.Request,
+    stall_timeout: Optional[float] = None,
+    first_token_timeout: Optional[float] = None,
+    start: Optional[float] = None,
+) -> StreamedCompletion:
+    """
+    Read a chat completion stream to the end, measuring its token timing.
+
+    Raises `StreamStalledError` when no token (text, tool call or reasoning)
+    arrived `first_token_timeout` seconds after `start`, or the gap after any
+    chunk exceeds `stall_timeout`, and `APIConnectionError` when the stream ends
+    without a finish reason. The caller closes the stream, freeing the
+    connection. Timing is measured from `start` (a `time.perf_counter()` value),
+    by default from the call.
+    """
+    start = time.perf_counter() if start is None else start
+    builder = _CompletionBuilder()
+    token_times: List[float] = []
+    received = False
+    iterator = stream.__aiter__()
+    while True:
+        stall = stall_timeout if received else None
+        deadline = None if token_times else _remaining(first_token_timeout, start)
+        timeout = min((t for t in (stall, deadline) if t is not None), default=None)
+        try:
+            chunk = await asyncio.wait_for(anext(iterator), timeout)
+        except StopAsyncIteration:
+            break
+        except asyncio.TimeoutError:
+            if timeout == deadline:
+                raise StreamStalledError(
+                    request, time.perf_counter() - start, first_token=True
+                ) from None
+            raise StreamStalledError(request, timeout) from None
+        received = True
+        builder.add(chunk)
+        if _has_token(chunk):
+            token_times.append(time.perf_counter())
+
+    if not builder.finished:
+        raise APIConnectionError(
+            message="Stream ended before the completion finished", request=request
+        )
+    ttft = token_times[0] - start if token_times else None
+    inter_token = (
+        (token_times[-1] - token_times[0]) / (len(token_times) - 1)
+        if len(token_times) > 1
+        else None
+    )
+    return StreamedCompletion(builder.build(), ttft, inter_token)
@@ -0,0 +1,30 @@
+"""JSON codec for JSONL files: orjson when installed, else the standard library."""
+
+import json
+from typing import Any
+
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+BACKEND: str = "orjson" if orjson is not None else "json"
+
+
+def loads(data: bytes | str) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dump_model(model: BaseModel) -> bytes:
+    """Serialise a model without building an intermediate dict."""
+    return model.model_dump_json().encode("utf-8")
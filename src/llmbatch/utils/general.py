@@ -1,28 +1,100 @@
+import csv
 import json
-from typing import List
+from typing import IO, Any, Iterable, Iterator, List
 
 import yaml
 from pydantic import BaseModel
 
-from llmbatch.models.schemas import Config
+from llmbatch.models.schemas import Config, Question
+from llmbatch.utils import codec
 
 
 def load_jsonl(file_path: str) -> list[dict]:
-    with open(file_path, "r", encoding="utf-8") as f:
-        return [json.loads(line) for line in f]
+    with open(file_path, "rb") as f:
+        return [codec.loads(line) for line in f]
 
 
 def load_jsonl_generator(file_path: str):
-    with open(file_path, "r", encoding="utf-8") as f:
+    with open(file_path, "rb") as f:
         for line in f:
-            yield json.loads(line)
+            yield codec.loads(line)
+
+
+def iter_json_array(f: IO[str], chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """Yield the elements of a top-level JSON array without loading the whole file."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    while not buffer and (chunk := f.read(chunk_size)):
+        buffer = chunk.lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("Expected a JSON array")
+    buffer = buffer[1:]
+    eof = False
+    while True:
+        buffer = buffer.lstrip().removeprefix(",").lstrip()
+        if buffer.startswith("]"):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+        # A number at the end of the buffer may still continue in the next chunk
+        if end == len(buffer) and not eof:
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+        yield item
+        buffer = buffer[end:]
+
+
+def _iter_csv_questions(input_path: str) -> Iterator[Question]:
+    with open(input_path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            yield Question(**row)
+
+
+def _iter_json_questions(input_path: str) -> Iterator[Question]:
+    with open(input_path, "r", encoding="utf-8") as f:
+        for item in iter_json_array(f):
+            yield Question(**item)
+
+
+def _iter_jsonl_questions(input_path: str) -> Iterator[Question]:
+    for item in load_jsonl_generator(input_path):
+        yield Question(**item)
+
+
+def load_questions_generator(input_path: str) -> Iterator[Question]:
+    """Stream questions from a .csv, .json (array) or .jsonl file."""
+    if input_path.endswith(".csv"):
+        return _iter_csv_questions(input_path)
+    if input_path.endswith(".json"):
+        return _iter_json_questions(input_path)
+    if input_path.endswith(".jsonl"):
+        return _iter_jsonl_questions(input_path)
+    raise ValueError("Input file must be a .csv, .json or .jsonl file.")
+
+
+def write_jsonl(items: Iterable[BaseModel], output_path: str) -> int:
+    """Write models to a new JSONL file one at a time and return how many."""
+    count = 0
+    with open(output_path, "wb") as f:
+        for item in items:
+            f.write(codec.dump_model(item) + b"\n")
+            count += 1
+    return count
 
 
 def append_to_jsonl(responses: List[BaseModel], output_path: str) -> None:
-    with open(output_path, "a", encoding="utf-8") as f:
+    with open(output_path, "ab") as f:
         for response in responses:
-            response_dict = response.model_dump()
-            f.write(json.dumps(response_dict) + "\n")
+            f.write(codec.dump_model(response) + b"\n")
 
 
 def load_config(config_file: str) -> Config:
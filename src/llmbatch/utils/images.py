@@ -1,11 +1,89 @@
 import base64
+import hashlib
+import os
+from collections import OrderedDict
 from io import BytesIO
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from PIL import Image
+if TYPE_CHECKING:
+    from PIL import Image
 
 
-def get_base64_image(image: Image.Image) -> str:
+class ImageCache:
+    """
+    Cache of encoded images keyed by file content hash and encoding parameters.
+
+    Entries live in an in-memory LRU and, when `cache_dir` is given, in one file
+    per entry on disk so that later runs can reuse them. Content hashes are
+    memoised per path, size and modification time to avoid re-reading files.
+    """
+
+    def __init__(self, max_entries: int = 256, cache_dir: str | Path | None = None):
+        self.max_entries: int = max_entries
+        self.cache_dir: Path | None = Path(cache_dir) if cache_dir else None
+        self.hits: int = 0
+        self.misses: int = 0
+        self._entries: OrderedDict[str, tuple[str, str]] = OrderedDict()
+        self._digests: dict[tuple[str, int, int], str] = {}
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def key(self, image_path: Path, max_size: tuple[int, int], quality: int) -> str:
+        stat = image_path.stat()
+        file_id = (str(image_path.resolve()), stat.st_size, stat.st_mtime_ns)
+        if (digest := self._digests.get(file_id)) is None:
+            with open(image_path, "rb") as f:
+                digest = hashlib.file_digest(f, "sha256").hexdigest()
+            self._digests[file_id] = digest
+        fmt = image_path.suffix.lower().lstrip(".")
+        return f"{digest}-{fmt}-{max_size[0]}x{max_size[1]}-q{quality}"
+
+    def get(self, key: str) -> tuple[str, str] | None:
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        if self.cache_dir and (path := self.cache_dir / key).exists():
+            media_type, base64_image = path.read_text(encoding="utf-8").split("\n", 1)
+            self._remember(key, (media_type, base64_image))
+            self.hits += 1
+            return media_type, base64_image
+        self.misses += 1
+        return None
+
+    def put(self, key: str, value: tuple[str, str]) -> None:
+        self._remember(key, value)
+        if self.cache_dir:
+            path = self.cache_dir / key
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text("\n".join(value), encoding="utf-8")
+            os.replace(tmp_path, path)
+
+    def _remember(self, key: str, value: tuple[str, str]) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+_image_cache = ImageCache()
+
+
+def configure_image_cache(
+    max_entries: int = 256, cache_dir: str | Path | None = None
+) -> ImageCache:
+    """Replace the cache used by `encode_image` and return it."""
+    global _image_cache
+    _image_cache = ImageCache(max_entries=max_entries, cache_dir=cache_dir)
+    return _image_cache
+
+
+def get_image_cache() -> ImageCache:
+    return _image_cache
+
+
+def get_base64_image(image: "Image.Image") -> str:
     buffer = BytesIO()
     image.save(buffer, format="PNG")
     img_bytes = buffer.getvalue()
@@ -23,6 +101,13 @@ def encode_image(
     else:
         raise ValueError(f"Unsupported image format: {image_path.suffix}")
 
+    key = _image_cache.key(image_path, max_size, quality)
+    if (cached := _image_cache.get(key)) is not None:
+        return cached
+
+    # Imported here so that commands that never encode an image skip loading PIL
+    from PIL import Image
+
     img = Image.open(image_path)
 
     if media_type == "image/jpeg" and img.mode != "RGB":
@@ -34,4 +119,5 @@ def encode_image(
     img.save(buffer, format=fmt, quality=quality, optimize=True)
     base64_image = base64.b64encode(buffer.getvalue()).decode("utf-8")
 
+    _image_cache.put(key, (media_type, base64_image))
     return media_type, base64_image
@@ -9,6 +9,7 @@ def create_openai_body(
     text: str,
     image_path: Optional[Path] = None,
     system_message: Optional[str] = None,
+    image_first: bool = False,
     **kwargs,
 ) -> Body:
     messages = []
@@ -17,20 +18,16 @@ def create_openai_body(
 
     if image_path:
         media_type, base64_image = encode_image(image_path)
-        messages.append(
+        content = [
+            {"type": "text", "text": text},
             {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": text},
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:{media_type};base64,{base64_image}"
-                        },
-                    },
-                ],
-            }
-        )
+                "type": "image_url",
+                "image_url": {"url": f"data:{media_type};base64,{base64_image}"},
+            },
+        ]
+        if image_first:
+            content.reverse()
+        messages.append({"role": "user", "content": content})
     else:
         messages.append({"role": "user", "content": text})
 
@@ -44,26 +41,25 @@ def create_anthropic_body(
     text: str,
     image_path: Optional[Path] = None,
     system_message: Optional[str] = None,
+    image_first: bool = False,
     **kwargs,
 ) -> Body:
     if image_path:
         media_type, base64_image = encode_image(image_path)
-        messages = [
+        content = [
+            {"type": "text", "text": text},
             {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": text},
-                    {
-                        "type": "image",
-                        "source": {
-                            "type": "base64",
-                            "media_type": media_type,
-                            "data": base64_image,
-                        },
-                    },
-                ],
-            }
+                "type": "image",
+                "source": {
+                    "type": "base64",
+                    "media_type": media_type,
+                    "data": base64_image,
+                },
+            },
         ]
+        if image_first:
+            content.reverse()
+        messages = [{"role": "user", "content": content}]
     else:
         messages = [{"role": "user", "content": text}]
 
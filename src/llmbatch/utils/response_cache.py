@@ -0,0 +1,120 @@
+import hashlib
+import json
+import sqlite3
+from typing import Optional
+
+from llmbatch.models.responses import Response
+from llmbatch.models.schemas import Body
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_used INTEGER NOT NULL
+)
+"""
+
+
+def request_key(body: Body) -> str:
+    """Hash a request body canonically, so equal requests share a key."""
+    canonical = json.dumps(
+        body.model_dump(mode="json"),
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    SQLite-backed cache of successful responses, keyed by `request_key`.
+
+    Only deterministic requests (temperature 0) are cached unless `cache_all` is
+    set: sampled repetitions of a question share the same body, so caching them
+    would return one answer for every repetition. When the stored responses
+    exceed `max_bytes`, the least recently used ones are evicted.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 1 << 30, cache_all: bool = False):
+        self.path: str = path
+        self.max_bytes: int = max_bytes
+        self.cache_all: bool = cache_all
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)"
+        )
+        # `last_used` is a use counter rather than a timestamp, so the LRU order
+        # does not depend on clock resolution
+        self._size, self._clock = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0), COALESCE(MAX(last_used), 0) FROM responses"
+        ).fetchone()
+
+    def _tick(self) -> int:
+        self._clock += 1
+        return self._clock
+
+    def cacheable(self, body: Body) -> bool:
+        return self.cache_all or body.temperature == 0
+
+    def get(self, body: Body) -> Optional[Response]:
+        if not self.cacheable(body):
+            return None
+        key = request_key(body)
+        row = self._conn.execute(
+            "SELECT value FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        with self._conn:
+            self._conn.execute(
+                "UPDATE responses SET last_used = ? WHERE key = ?", (self._tick(), key)
+            )
+        return Response.model_validate_json(row[0])
+
+    def put(self, body: Body, response: Response) -> None:
+        if not self.cacheable(body) or response.status_code != 200:
+            return
+        key = request_key(body)
+        value = response.model_dump_json().encode("utf-8")
+        with self._conn:
+            previous = self._conn.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, value, len(value), self._tick()),
+            )
+        self._size += len(value) - (previous[0] if previous else 0)
+        if self._size > self.max_bytes:
+            self._evict()
+
+    def _evict(self) -> None:
+        with self._conn:
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_used"
+            )
+            evicted: list[tuple[str]] = []
+            for key, size in rows:
+                if self._size <= self.max_bytes:
+                    break
+                evicted.append((key,))
+                self._size -= size
+            rows.close()
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        self.evictions += len(evicted)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def close(self) -> None:
+        self._conn.close()
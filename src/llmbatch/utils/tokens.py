@@ -0,0 +1,175 @@
+import base64
+import binascii
+import math
+import struct
+from typing import TYPE_CHECKING, Any, Dict, List, Literal, Optional
+
+if TYPE_CHECKING:
+    from llmbatch.models.schemas import Body
+
+type Provider = Literal["openai", "anthropic"]
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+IMAGE_TOKENS = 765
+
+# OpenAI vision: images are fit into 2048x2048, scaled so the short side is at
+# most 768 px and billed per 512 px tile
+OPENAI_IMAGE_BASE_TOKENS = 85
+OPENAI_IMAGE_TILE_TOKENS = 170
+# Anthropic: images are scaled to a long edge of at most 1568 px and cost about
+# one token per 750 pixels
+ANTHROPIC_MAX_EDGE = 1568
+ANTHROPIC_PIXELS_PER_TOKEN = 750
+
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# Base64 characters of a JPEG decoded at first when looking for its size; doubled
+# until the frame header is found
+_JPEG_SCAN_CHARS = 1 << 12
+
+
+def _jpeg_size(data: bytes) -> Optional[tuple[int, int]]:
+    i = 2
+    while i + 9 <= len(data):
+        if data[i] != 0xFF:
+            i += 1
+            continue
+        marker = data[i + 1]
+        if marker in _JPEG_SOF_MARKERS:
+            height, width = struct.unpack(">HH", data[i + 5 : i + 9])
+            return width, height
+        if marker == 0xFF or marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            i += 2 if marker != 0xFF else 1
+            continue
+        (length,) = struct.unpack(">H", data[i + 2 : i + 4])
+        i += 2 + length
+    return None
+
+
+def image_size(data: bytes) -> Optional[tuple[int, int]]:
+    """Width and height from the header of a PNG, JPEG, GIF or WebP image."""
+    if data.startswith(b"\x89PNG\r\n\x1a\n") and len(data) >= 24:
+        return struct.unpack(">II", data[16:24])
+    if data[:6] in (b"GIF87a", b"GIF89a") and len(data) >= 10:
+        return struct.unpack("<HH", data[6:10])
+    if data.startswith(b"RIFF") and data[8:12] == b"WEBP" and len(data) >= 30:
+        chunk = data[12:16]
+        if chunk == b"VP8X":
+            width = int.from_bytes(data[24:27], "little") + 1
+            height = int.from_bytes(data[27:30], "little") + 1
+            return width, height
+        if chunk == b"VP8L":
+            bits = int.from_bytes(data[21:25], "little")
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b"VP8 ":
+            width, height = struct.unpack("<HH", data[26:30])
+            return width & 0x3FFF, height & 0x3FFF
+    if data.startswith(b"\xff\xd8"):
+        return _jpeg_size(data)
+    return None
+
+
+def _base64_image_size(encoded: str) -> Optional[tuple[int, int]]:
+    # Most formats keep their size in the first bytes. JPEG needs a scan over
+    # the segments before its frame header (e.g. EXIF or ICC profiles), so a
+    # growing prefix is decoded rather than the whole image
+    encoded = encoded.partition(";base64,")[2] or encoded
+    try:
+        size = image_size(base64.b64decode(encoded[:64]))
+        length = _JPEG_SCAN_CHARS
+        while size is None and encoded.startswith("/9j/"):
+            size = _jpeg_size(base64.b64decode(encoded[:length]))
+            if length >= len(encoded):
+                break
+            length *= 2
+    except (binascii.Error, ValueError, struct.error):
+        return None
+    return size
+
+
+def _image_part_size(part: Dict[str, Any]) -> Optional[tuple[int, int]]:
+    if part.get("type") == "image_url":
+        url = (part.get("image_url") or {}).get("url", "")
+        return _base64_image_size(url) if url.startswith("data:") else None
+    source = part.get("source") or {}
+    if source.get("type") == "base64" and source.get("data"):
+        return _base64_image_size(source["data"])
+    return None
+
+
+def estimate_image_tokens(
+    part: Dict[str, Any], provider: Optional[Provider] = None
+) -> int:
+    """
+    Tokens a provider bills for an image content part.
+
+    Without a `provider`, or when the image size cannot be read (e.g. remote
+    URLs), a fixed `IMAGE_TOKENS` is returned.
+    """
+    if provider == "openai" and (part.get("image_url") or {}).get("detail") == "low":
+        return OPENAI_IMAGE_BASE_TOKENS
+    size = _image_part_size(part) if provider is not None else None
+    if size is None:
+        return IMAGE_TOKENS
+    width, height = size
+    if provider == "openai":
+        if max(width, height) > 2048:
+            scale = 2048 / max(width, height)
+            width, height = width * scale, height * scale
+        if min(width, height) > 768:
+            scale = 768 / min(width, height)
+            width, height = width * scale, height * scale
+        tiles = math.ceil(width / 512) * math.ceil(height / 512)
+        return OPENAI_IMAGE_BASE_TOKENS + OPENAI_IMAGE_TILE_TOKENS * tiles
+    scale = min(1.0, ANTHROPIC_MAX_EDGE / max(width, height))
+    return math.ceil(width * scale * height * scale / ANTHROPIC_PIXELS_PER_TOKEN)
+
+
+def estimate_content_tokens(
+    content: str | List[Dict[str, Any]], provider: Optional[Provider] = None
+) -> int:
+    if isinstance(content, str):
+        return len(content) // CHARS_PER_TOKEN + 1
+
+    tokens = 0
+    for part in content:
+        if part.get("type") == "text":
+            tokens += len(part.get("text", "")) // CHARS_PER_TOKEN + 1
+        elif part.get("type") in ("image_url", "image"):
+            tokens += estimate_image_tokens(part, provider)
+    return tokens
+
+
+def estimate_messages_tokens(
+    messages: List[Dict[str, Any]],
+    system: Optional[str | List[Dict[str, Any]]] = None,
+    provider: Optional[Provider] = None,
+) -> int:
+    """`estimate_prompt_tokens` for the messages and system prompt of a raw body."""
+    tokens = 0
+    for message in messages:
+        tokens += MESSAGE_OVERHEAD_TOKENS + estimate_content_tokens(
+            message.get("content", ""), provider
+        )
+    if system:
+        tokens += estimate_content_tokens(system, provider)
+    return tokens
+
+
+def estimate_prompt_tokens(body: "Body", provider: Optional[Provider] = None) -> int:
+    """
+    Cheap upper-bound-ish estimate of the prompt size of a request.
+
+    Text is counted at roughly four characters per token. Images cost a fixed
+    amount, or, for a `provider`, what it bills for the image's size, which is
+    close enough for budgeting rate limits and costs without a tokenizer.
+    """
+    return estimate_messages_tokens(
+        body.messages, getattr(body, "system", None), provider
+    )
+
+
+def estimate_request_tokens(body: "Body") -> int:
+    """Tokens a provider counts against a TPM limit: prompt plus `max_tokens`."""
+    return estimate_prompt_tokens(body) + body.max_tokens
@@ -0,0 +1,169 @@
+import os
+import queue
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Literal, Optional
+
+from pydantic import BaseModel
+
+from llmbatch.utils import codec
+
+type FsyncPolicy = Literal["flush", "close", "never"]
+
+FSYNC_POLICIES: tuple[FsyncPolicy, ...] = ("flush", "close", "never")
+
+_CLOSE = object()
+
+
+class JsonlWriter:
+    """
+    Appends models to a JSONL file from a background thread.
+
+    `write` only enqueues the model, so the caller (e.g. the event loop) never
+    waits for the disk. The thread keeps the file open and flushes it once
+    `flush_bytes` are buffered, `flush_every` records were written since the last
+    flush or `flush_interval` seconds have passed. With the `"flush"` fsync
+    policy every flush is also fsynced, so a flushed record survives a power
+    loss; `"close"` fsyncs only when the writer is closed and `"never"` leaves it
+    to the OS. `close` drains the queue, so nothing handed to `write` is lost.
+
+    The file is created with the first record. An error in the thread (e.g. a
+    full disk) is raised by the next `write` or `close`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        flush_bytes: int = 1 << 20,
+        flush_interval: float = 5.0,
+        flush_every: Optional[int] = None,
+        fsync: FsyncPolicy = "flush",
+    ):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.path: str = path
+        self.flush_bytes: int = flush_bytes
+        self.flush_interval: float = flush_interval
+        self.flush_every: Optional[int] = flush_every
+        self.fsync: FsyncPolicy = fsync
+        self.written: int = 0
+        self.flushed: int = 0
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._error: Optional[BaseException] = None
+        self._closed: bool = False
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"JsonlWriter({os.path.basename(path)})",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def write(self, model: BaseModel) -> None:
+        if self._error is not None:
+            raise self._error
+        if self._closed:
+            raise ValueError("Write to a closed writer")
+        self._queue.put(model)
+
+    def close(self) -> None:
+        """Write and flush everything enqueued so far, then stop the thread."""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(_CLOSE)
+            self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self) -> "JsonlWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        f = None
+        buffered = records = 0
+        last_flush = time.monotonic()
+        closing = False
+
+        def flush(sync: bool) -> None:
+            nonlocal buffered, records, last_flush
+            f.flush()
+            if sync:
+                os.fsync(f.fileno())
+            self.flushed = self.written
+            buffered = records = 0
+            last_flush = time.monotonic()
+
+        try:
+            while True:
+                timeout = None
+                if records:
+                    timeout = max(
+                        0.0, last_flush + self.flush_interval - time.monotonic()
+                    )
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    flush(self.fsync == "flush")
+                    continue
+                if item is _CLOSE:
+                    closing = True
+                    break
+                line = codec.dump_model(item) + b"\n"
+                if f is None:
+                    f = open(self.path, "ab", buffering=max(self.flush_bytes, 1 << 16))
+                f.write(line)
+                self.written += 1
+                buffered += len(line)
+                records += 1
+                if (
+                    buffered >= self.flush_bytes
+                    or (self.flush_every and records >= self.flush_every)
+                    or time.monotonic() - last_flush >= self.flush_interval
+                ):
+                    flush(self.fsync == "flush")
+            if f is not None:
+                flush(self.fsync != "never")
+        except BaseException as e:
+            self._error = e
+            # Keep consuming so that `close` does not wait forever
+            while not closing:
+                closing = self._queue.get() is _CLOSE
+        finally:
+            if f is not None:
+                try:
+                    f.close()
+                except OSError as e:
+                    self._error = self._error or e
+
+
+@contextmanager
+def forward_sigterm() -> Iterator[None]:
+    """
+    Handle SIGTERM like Ctrl-C (SIGINT) for the duration of the block.
+
+    Inside `asyncio.run`, SIGINT cancels the main task, so its `finally` blocks
+    run, and then raises `KeyboardInterrupt`; SIGTERM now does the same, letting
+    writers drain before the process exits.
+    """
+
+    def handler(signum, frame) -> None:
+        sigint_handler = signal.getsignal(signal.SIGINT)
+        if callable(sigint_handler):
+            sigint_handler(signal.SIGINT, frame)
+        else:
+            raise KeyboardInterrupt
+
+    try:
+        previous = signal.signal(signal.SIGTERM, handler)
+    except ValueError:
+        # Signal handlers can only be installed from the main thread
+        yield
+        return
+    try:
+        yield
+    finally:
+        signal.signal(signal.SIGTERM, previous)
@@ -0,0 +1,422 @@
+import asyncio
+import json
+
+import httpx
+from anthropic import AsyncAnthropic
+from openai import AsyncOpenAI
+
+from llmbatch.pipelines.batch_api import (
+    _run_batches,
+    run_anthropic_batches,
+    run_openai_batches,
+)
+from llmbatch.pipelines.post import parse_anthropic_jsonl, parse_openai_jsonl
+from llmbatch.services.anthropic_service import AsyncAnthropicBatchService
+from llmbatch.services.openai_service import AsyncOpenAIBatchService
+
+BASE_URL = "http://batches.test"
+
+
+class FakeBatchesAPI:
+    """In-memory stand-in for the Message Batches endpoints."""
+
+    def __init__(self, polls_until_ended: int = 2):
+        self.polls_until_ended = polls_until_ended
+        self.batches: dict[str, list[dict]] = {}
+        self.polls: dict[str, int] = {}
+
+    def _batch(self, batch_id: str) -> dict:
+        ended = self.polls[batch_id] >= self.polls_until_ended
+        count = len(self.batches[batch_id])
+        return {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {
+                "processing": 0 if ended else count,
+                "succeeded": count if ended else 0,
+                "errored": 0,
+                "canceled": 0,
+                "expired": 0,
+            },
+            "created_at": "2025-01-01T00:00:00Z",
+            "expires_at": "2025-01-02T00:00:00Z",
+            "archived_at": None,
+            "cancel_initiated_at": None,
+            "ended_at": "2025-01-01T01:00:00Z" if ended else None,
+            "results_url": f"{BASE_URL}/results/{batch_id}" if ended else None,
+        }
+
+    def _result(self, request: dict) -> dict:
+        return {
+            "custom_id": request["custom_id"],
+            "result": {
+                "type": "succeeded",
+                "message": {
+                    "id": "msg_1",
+                    "type": "message",
+                    "role": "assistant",
+                    "model": request["params"]["model"],
+                    "content": [{"type": "text", "text": "Answer"}],
+                    "stop_reason": "end_turn",
+                    "stop_sequence": None,
+                    "usage": {"input_tokens": 10, "output_tokens": 5},
+                },
+            },
+        }
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if request.method == "POST" and path == "/v1/messages/batches":
+            batch_id = f"msgbatch_{len(self.batches)}"
+            self.batches[batch_id] = json.loads(request.content)["requests"]
+            self.polls[batch_id] = 0
+            return httpx.Response(200, json=self._batch(batch_id))
+        if path.startswith("/v1/messages/batches/"):
+            batch_id = path.rsplit("/", 1)[-1]
+            self.polls[batch_id] += 1
+            return httpx.Response(200, json=self._batch(batch_id))
+        if path.startswith("/results/"):
+            batch_id = path.rsplit("/", 1)[-1]
+            lines = [json.dumps(self._result(r)) for r in self.batches[batch_id]]
+            return httpx.Response(200, content="\n".join(lines).encode())
+        return httpx.Response(404)
+
+
+def _requests(start: int, count: int) -> list[dict]:
+    return [
+        {
+            "custom_id": f"q{i}_rep00",
+            "params": {
+                "model": "claude-3-5-haiku-latest",
+                "max_tokens": 100,
+                "messages": [{"role": "user", "content": "Hi"}],
+            },
+        }
+        for i in range(start, start + count)
+    ]
+
+
+def test_run_anthropic_batches_submits_polls_and_downloads(tmp_path):
+    # Arrange
+    api = FakeBatchesAPI(polls_until_ended=2)
+    client = AsyncAnthropic(
+        api_key="test",
+        base_url=BASE_URL,
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(api.handler)),
+    )
+    service = AsyncAnthropicBatchService(client=client, poll_interval=0.01)
+    output_path = tmp_path / "batch_output.jsonl"
+
+    # Act
+    batches = asyncio.run(
+        run_anthropic_batches(
+            iter([_requests(0, 3), _requests(3, 2)]), str(output_path), service
+        )
+    )
+
+    # Assert
+    assert [batch.processing_status for batch in batches] == ["ended", "ended"]
+    # Two status polls, plus the lookup of `results_url` before downloading
+    assert all(polls == 3 for polls in api.polls.values())
+    results = parse_anthropic_jsonl(str(output_path))
+    assert sorted(result.custom_id for result in results) == [f"q{i}" for i in range(5)]
+    assert all(result.type == "succeeded" for result in results)
+    assert results[0].output_tokens == 5
+
+
+def test_run_anthropic_batches_reports_each_batch_when_submitted(tmp_path):
+    """Test that `on_submit` gets each batch ID before the batch is polled."""
+    # Arrange
+    api = FakeBatchesAPI(polls_until_ended=2)
+    client = AsyncAnthropic(
+        api_key="test",
+        base_url=BASE_URL,
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(api.handler)),
+    )
+    service = AsyncAnthropicBatchService(client=client, poll_interval=0.01)
+    submitted: list[tuple[str, int, int]] = []
+
+    def on_submit(batch_id: str, num_requests: int) -> None:
+        submitted.append((batch_id, num_requests, api.polls[batch_id]))
+
+    # Act
+    asyncio.run(
+        run_anthropic_batches(
+            iter([_requests(0, 3), _requests(3, 2)]),
+            str(tmp_path / "batch_output.jsonl"),
+            service,
+            on_submit=on_submit,
+        )
+    )
+
+    # Assert
+    assert sorted(submitted) == [("msgbatch_0", 3, 0), ("msgbatch_1", 2, 0)]
+
+
+def test_run_batches_reads_chunks_only_when_a_submit_slot_is_free(tmp_path):
+    """Test that at most `max_concurrent_submits` chunks are held in memory."""
+    # Arrange
+    submitted = 0
+    held: list[int] = []
+
+    def chunks():
+        for index in range(6):
+            # Chunks read so far (including this one) minus those submitted
+            held.append(index + 1 - submitted)
+            yield [index]
+
+    async def submit(chunk: list[int], index: int) -> str:
+        nonlocal submitted
+        await asyncio.sleep(0.01)
+        submitted += 1
+        return f"batch_{index}"
+
+    async def finish(batch_id: str, output_file) -> str:
+        return batch_id
+
+    # Act
+    result = asyncio.run(
+        _run_batches(chunks(), str(tmp_path / "out.jsonl"), submit, finish, 2)
+    )
+
+    # Assert
+    assert result == [f"batch_{index}" for index in range(6)]
+    assert max(held) == 2
+
+
+def test_wait_backs_off_between_polls(monkeypatch):
+    # Arrange
+    api = FakeBatchesAPI(polls_until_ended=4)
+    api.batches["msgbatch_0"] = _requests(0, 1)
+    api.polls["msgbatch_0"] = 0
+    client = AsyncAnthropic(
+        api_key="test",
+        base_url=BASE_URL,
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(api.handler)),
+    )
+    service = AsyncAnthropicBatchService(
+        client=client, poll_interval=1.0, max_poll_interval=3.0, poll_backoff=2.0
+    )
+    sleeps: list[float] = []
+
+    async def fake_sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+
+    # Act
+    batch = asyncio.run(service.wait("msgbatch_0"))
+
+    # Assert
+    assert batch.processing_status == "ended"
+    assert sleeps == [1.0, 2.0, 3.0]
+
+
+class FakeOpenAIBatchAPI:
+    """In-memory stand-in for the OpenAI Files and Batch endpoints."""
+
+    def __init__(self, polls_until_ended: int = 2):
+        self.polls_until_ended = polls_until_ended
+        self.files: dict[str, bytes] = {}
+        self.batches: dict[str, str] = {}
+        self.polls: dict[str, int] = {}
+
+    def _batch(self, batch_id: str) -> dict:
+        ended = self.polls[batch_id] >= self.polls_until_ended
+        lines = self.files[self.batches[batch_id]].splitlines()
+        return {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": "/v1/chat/completions",
+            "completion_window": "24h",
+            "created_at": 0,
+            "input_file_id": self.batches[batch_id],
+            "status": "completed" if ended else "in_progress",
+            "output_file_id": f"{batch_id}_output" if ended else None,
+            "error_file_id": f"{batch_id}_errors" if ended else None,
+            "request_counts": {
+                "completed": len(lines) - 1 if ended else 0,
+                "failed": 1 if ended else 0,
+                "total": len(lines),
+            },
+        }
+
+    def _output_line(self, request: dict, batch_id: str, failed: bool) -> str:
+        body = (
+            {"error": {"message": "Invalid request", "type": "invalid_request_error"}}
+            if failed
+            else {
+                "id": "chatcmpl-1",
+                "object": "chat.completion",
+                "created": 0,
+                "model": request["body"]["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": "Answer"},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": 10,
+                    "completion_tokens": 5,
+                    "total_tokens": 15,
+                },
+            }
+        )
+        return json.dumps(
+            {
+                "id": f"{batch_id}_req",
+                "custom_id": request["custom_id"],
+                "response": {
+                    "status_code": 400 if failed else 200,
+                    "request_id": "req_1",
+                    "body": body,
+                },
+                "error": None,
+            }
+        )
+
+    def _result_file(self, file_id: str) -> bytes:
+        batch_id, kind = file_id.rsplit("_", 1)
+        requests = [
+            json.loads(line) for line in self.files[self.batches[batch_id]].splitlines()
+        ]
+        # The last request of every batch fails and is reported in the error file
+        selected = requests[-1:] if kind == "errors" else requests[:-1]
+        lines = [
+            self._output_line(request, batch_id, kind == "errors")
+            for request in selected
+        ]
+        return "\n".join(lines).encode() + b"\n"
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if request.method == "POST" and path == "/v1/files":
+            content = request.read()
+            start = content.index(b"\r\n\r\n", content.index(b'name="file"')) + 4
+            end = content.index(b"\r\n--", start)
+            file_id = f"file_{len(self.files)}"
+            self.files[file_id] = content[start:end]
+            return httpx.Response(
+                200,
+                json={
+                    "id": file_id,
+                    "object": "file",
+                    "bytes": end - start,
+                    "created_at": 0,
+                    "filename": "batch.jsonl",
+                    "purpose": "batch",
+                    "status": "processed",
+                },
+            )
+        if request.method == "POST" and path == "/v1/batches":
+            batch_id = f"batch_{len(self.batches)}"
+            self.batches[batch_id] = json.loads(request.content)["input_file_id"]
+            self.polls[batch_id] = 0
+            return httpx.Response(200, json=self._batch(batch_id))
+        if path.startswith("/v1/batches/"):
+            batch_id = path.rsplit("/", 1)[-1]
+            self.polls[batch_id] += 1
+            return httpx.Response(200, json=self._batch(batch_id))
+        if path.startswith("/v1/files/") and path.endswith("/content"):
+            return httpx.Response(200, content=self._result_file(path.split("/")[3]))
+        return httpx.Response(404)
+
+
+def _openai_lines(start: int, count: int) -> list[bytes]:
+    return [
+        json.dumps(
+            {
+                "custom_id": f"q{i}_rep00",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": "gpt-4o-mini",
+                    "messages": [{"role": "user", "content": "Hi"}],
+                },
+            }
+        ).encode()
+        + b"\n"
+        for i in range(start, start + count)
+    ]
+
+
+def test_run_openai_batches_uploads_polls_and_downloads(tmp_path):
+    # Arrange
+    api = FakeOpenAIBatchAPI(polls_until_ended=2)
+    client = AsyncOpenAI(
+        api_key="test",
+        base_url=f"{BASE_URL}/v1",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(api.handler)),
+    )
+    service = AsyncOpenAIBatchService(client=client, poll_interval=0.01)
+    output_path = tmp_path / "batch_output.jsonl"
+
+    # Act
+    batches = asyncio.run(
+        run_openai_batches(
+            iter([_openai_lines(0, 3), _openai_lines(3, 2)]), str(output_path), service
+        )
+    )
+
+    # Assert
+    assert [batch.status for batch in batches] == ["completed", "completed"]
+    assert len(api.files) == 2
+    results = parse_openai_jsonl(str(output_path))
+    assert sorted(result.custom_id for result in results) == [f"q{i}" for i in range(5)]
+    failed = sorted(result.custom_id for result in results if result.type == "failed")
+    assert failed == ["q2", "q4"]
+
+
+class FailingOpenAIBatchAPI(FakeOpenAIBatchAPI):
+    """Batches fail validation, with batch-level errors and no output files."""
+
+    def _batch(self, batch_id: str) -> dict:
+        batch = super()._batch(batch_id)
+        if batch["status"] == "completed":
+            batch.update(
+                status="failed",
+                output_file_id=None,
+                error_file_id=None,
+                errors={
+                    "object": "list",
+                    "data": [{"code": "invalid_json", "message": "Bad line 1"}],
+                },
+            )
+        return batch
+
+
+def test_run_openai_batches_reports_submits_and_batch_errors(tmp_path, caplog):
+    """Test that batch IDs are reported on submit and failed batches are logged."""
+    # Arrange
+    api = FailingOpenAIBatchAPI(polls_until_ended=1)
+    client = AsyncOpenAI(
+        api_key="test",
+        base_url=f"{BASE_URL}/v1",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(api.handler)),
+    )
+    service = AsyncOpenAIBatchService(client=client, poll_interval=0.01)
+    submitted: list[tuple[str, int, int]] = []
+
+    def on_submit(batch_id: str, num_requests: int) -> None:
+        submitted.append((batch_id, num_requests, api.polls[batch_id]))
+
+    # Act
+    with caplog.at_level("WARNING"):
+        batches = asyncio.run(
+            run_openai_batches(
+                iter([_openai_lines(0, 3)]),
+                str(tmp_path / "batch_output.jsonl"),
+                service,
+                on_submit=on_submit,
+            )
+        )
+
+    # Assert
+    assert [batch.status for batch in batches] == ["failed"]
+    assert submitted == [("batch_0", 3, 0)]
+    messages = [record.getMessage() for record in caplog.records]
+    assert any(message.startswith("Batch batch_0 failed") for message in messages)
+    assert "Batch batch_0: Bad line 1" in messages
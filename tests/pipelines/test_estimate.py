@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from llmbatch.pipelines.estimate import (
+    context_window,
+    estimate_batch,
+    format_report,
+    project,
+    throughput_from_metrics,
+)
+
+
+@pytest.fixture
+def batch_file(tmp_path):
+    path = tmp_path / "batch.jsonl"
+    with open(path, "w", encoding="utf-8") as f:
+        for i, content in enumerate(["a" * 400, "b" * 20_000]):
+            item = {
+                "custom_id": f"q{i}_rep00",
+                "body": {
+                    "messages": [{"role": "user", "content": content}],
+                    "model": "gpt-4-0613",
+                    "temperature": 0.7,
+                    "max_tokens": 100,
+                },
+            }
+            f.write(json.dumps(item) + "\n")
+    return str(path)
+
+
+def test_context_window_longest_prefix():
+    assert context_window("gpt-4o-mini") == 128_000
+    assert context_window("gpt-4-0613") == 8_192
+    assert context_window("my-finetune") is None
+
+
+def test_estimate_batch_totals_and_context_flags(batch_file):
+    # Act
+    estimate = estimate_batch([batch_file])
+
+    # Assert
+    assert estimate.provider == "openai"
+    assert estimate.requests == 2
+    assert estimate.max_completion_tokens == 200
+    assert 5_000 < estimate.prompt_tokens < 5_200
+    assert estimate.over_context == 0
+    assert estimate.models == {"gpt-4-0613": 2}
+
+
+def test_estimate_batch_context_window_override(batch_file):
+    estimate = estimate_batch([batch_file], context_window=1000)
+
+    assert estimate.over_context == 1
+    assert estimate.over_context_ids == ["q1_rep00"]
+
+
+def test_project_cost_and_runtime(batch_file):
+    # Arrange
+    estimate = estimate_batch([batch_file])
+
+    # Act
+    upper = project(estimate, input_price=1.0, output_price=4.0, tokens_per_s=10)
+    measured = project(
+        estimate, output_price=4.0, tokens_per_s=10, completion_tokens_per_request=25
+    )
+
+    # Assert
+    assert upper["completion_tokens"] == 200
+    assert upper["cost_usd"] == pytest.approx(
+        (estimate.prompt_tokens * 1.0 + 200 * 4.0) / 1e6
+    )
+    assert upper["runtime_s"] == pytest.approx(20)
+    assert measured["completion_tokens"] == 50
+    assert measured["runtime_s"] == pytest.approx(5)
+    assert any("cost" in line for line in format_report(estimate, upper))
+
+
+def test_throughput_from_metrics(tmp_path):
+    # Arrange
+    metrics_path = tmp_path / "metrics.json"
+    metrics_path.write_text(
+        json.dumps(
+            {
+                "requests": 15,
+                "cached": 2,
+                "failed": 3,
+                "completion_tokens": 500,
+                "elapsed_s": 10.0,
+            }
+        )
+    )
+
+    # Act & Assert
+    assert throughput_from_metrics(str(metrics_path)) == (50.0, 50.0)
@@ -0,0 +1,85 @@
+import csv
+import sys
+
+import pytest
+
+from llmbatch.models.schemas import OutputModel
+from llmbatch.pipelines.export import export_results
+
+
+@pytest.fixture
+def sample_models() -> list[OutputModel]:
+    return [
+        OutputModel(
+            custom_id=f"q{i}",
+            type="succeeded" if i % 2 else "failed",
+            model="gemma2:2b",
+            response=f"Response {i}",
+            input_tokens=10 + i,
+            output_tokens=20 + i,
+        )
+        for i in range(5)
+    ]
+
+
+def test_export_results_csv(sample_models, tmp_path):
+    # Arrange
+    path = tmp_path / "results.csv"
+
+    # Act
+    count = export_results(iter(sample_models), str(path), "csv")
+
+    # Assert
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f, delimiter=";"))
+    assert count == 5
+    assert [row["custom_id"] for row in rows] == [m.custom_id for m in sample_models]
+    assert rows[0]["input_tokens"] == "10"
+
+
+def test_export_results_parquet(sample_models, tmp_path):
+    # Arrange
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "results.parquet"
+
+    # Act
+    count = export_results(iter(sample_models), str(path), "parquet", chunk_size=2)
+
+    # Assert
+    table = pq.read_table(path)
+    assert count == 5
+    assert pq.ParquetFile(path).num_row_groups == 3
+    assert str(table.schema.field("input_tokens").type) == "int64"
+    assert table.column("custom_id").to_pylist() == [m.custom_id for m in sample_models]
+    assert table.column("type").to_pylist()[:2] == ["failed", "succeeded"]
+
+
+def test_export_results_arrow(sample_models, tmp_path):
+    # Arrange
+    pa = pytest.importorskip("pyarrow")
+    path = tmp_path / "results.arrow"
+
+    # Act
+    count = export_results(iter(sample_models), str(path), "arrow", chunk_size=2)
+
+    # Assert
+    with pa.ipc.open_file(path) as reader:
+        table = reader.read_all()
+        num_batches = reader.num_record_batches
+    assert count == 5
+    assert num_batches == 3
+    assert table.column("output_tokens").to_pylist() == [20, 21, 22, 23, 24]
+
+
+def test_export_results_without_pyarrow(sample_models, tmp_path, monkeypatch):
+    # Arrange
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+
+    # Act & Assert
+    with pytest.raises(ImportError, match="pip install pyarrow"):
+        export_results(iter(sample_models), str(tmp_path / "r.parquet"), "parquet")
+
+
+def test_export_results_invalid_format(sample_models, tmp_path):
+    with pytest.raises(ValueError, match="Invalid output format: xlsx"):
+        export_results(iter(sample_models), str(tmp_path / "r.xlsx"), "xlsx")
@@ -1,12 +1,26 @@
-from unittest.mock import Mock, patch
+import asyncio
+import json
+from unittest.mock import AsyncMock, Mock, patch
 
+import httpx
 import pytest
+from openai import APITimeoutError, RateLimitError
 from openai.types.chat.chat_completion import ChatCompletion, Choice
 from openai.types.chat.chat_completion_message import ChatCompletionMessage
 from openai.types.completion_usage import CompletionUsage
 
 from llmbatch.models.schemas import Body, OpenAIBatch
-from llmbatch.pipelines.inference import process_request
+from llmbatch.pipelines.inference import (
+    _truncate_partial_line,
+    load_resume_state,
+    process_request,
+    process_request_async,
+    run_batch,
+)
+from llmbatch.pipelines.retry import DEFAULT_MAX_ATTEMPTS, RetryPolicy
+from llmbatch.services.rate_limiter import RateLimiter
+from llmbatch.services.streaming import StreamedCompletion
+from llmbatch.utils.response_cache import ResponseCache
 
 
 @pytest.fixture
@@ -148,5 +162,441 @@ def test_process_request_non_stop_finish_reason(
 
     # Assert
     assert (
-        result.response is not None and result.response.status_code == 500
-    )  # Should be 500 if finish_reason is not "stop"
+        result.response is not None and result.response.status_code == 422
+    )  # Truncated completions are recorded as 422
+
+
+def test_process_request_async_success(
+    sample_openai_batch, successful_api_response, mock_uuid
+):
+    """Test successful processing of a request with the async service"""
+    # Arrange
+    mock_service = Mock()
+    mock_service.create_completion = AsyncMock(return_value=successful_api_response)
+    batch_id = "test-batch-id"
+
+    # Act
+    result = asyncio.run(
+        process_request_async(sample_openai_batch, batch_id, mock_service)
+    )
+
+    # Assert
+    mock_service.create_completion.assert_awaited_once_with(
+        **sample_openai_batch.body.model_dump()
+    )
+    assert result.custom_id == sample_openai_batch.custom_id
+    assert result.error is None
+    assert result.response is not None
+    assert result.response.status_code == 200
+    assert result.response.body == successful_api_response
+
+
+def test_process_request_async_error(sample_openai_batch, mock_uuid):
+    """Test handling of an error with the async service"""
+    # Arrange
+    mock_service = Mock()
+    mock_service.create_completion = AsyncMock(side_effect=Exception("timeout"))
+
+    # Act
+    result = asyncio.run(
+        process_request_async(sample_openai_batch, "test-batch-id", mock_service)
+    )
+
+    # Assert
+    assert result.error == "timeout"
+    assert result.response is not None
+    assert result.response.status_code == 500
+    assert result.response.body is None
+
+
+def test_run_batch_bounds_concurrency(sample_openai_batch, successful_api_response):
+    """Test that run_batch processes every request without exceeding concurrency"""
+    # Arrange
+    in_flight = 0
+    max_in_flight = 0
+
+    async def create_completion(**kwargs):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return successful_api_response
+
+    mock_service = Mock()
+    mock_service.create_completion = create_completion
+    requests = [
+        sample_openai_batch.model_copy(update={"custom_id": f"id-{i}"})
+        for i in range(20)
+    ]
+    results = []
+
+    # Act
+    asyncio.run(
+        run_batch(
+            iter(requests),
+            "test-batch-id",
+            results.append,
+            concurrency=4,
+            service=mock_service,
+        )
+    )
+
+    # Assert
+    assert len(results) == 20
+    assert {r.custom_id for r in results} == {f"id-{i}" for i in range(20)}
+    assert max_in_flight == 4
+    mock_service.close.assert_not_called()
+
+
+def test_run_batch_invalid_concurrency(sample_openai_batch):
+    """Test that a non-positive concurrency is rejected"""
+    with pytest.raises(ValueError, match="Concurrency must be at least 1"):
+        asyncio.run(run_batch([sample_openai_batch], "id", print, concurrency=0))
+
+
+@patch("llmbatch.pipelines.inference.OpenAIService")
+def test_process_request_uses_injected_service(
+    mock_openai_service_cls, sample_openai_batch, successful_api_response, mock_uuid
+):
+    """Test that a shared service is reused instead of constructing a new one"""
+    # Arrange
+    shared_service = Mock()
+    shared_service.create_completion.return_value = successful_api_response
+
+    # Act
+    for _ in range(3):
+        process_request(sample_openai_batch, "test-batch-id", service=shared_service)
+
+    # Assert
+    mock_openai_service_cls.assert_not_called()
+    assert shared_service.create_completion.call_count == 3
+
+
+@pytest.fixture
+def partial_output_file(tmp_path):
+    """Create an output file of an interrupted run with a half-written last line"""
+    records = [
+        {"id": "batch-1", "custom_id": "q1_rep00", "response": {"status_code": 200}},
+        {
+            "id": "batch-1",
+            "custom_id": "q2_rep00",
+            "response": {"status_code": 500},
+            "error": "timeout",
+        },
+        {"id": "batch-1", "custom_id": "q3_rep00", "response": {"status_code": 200}},
+    ]
+    file_path = tmp_path / "batch_output.jsonl"
+    with open(file_path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+        f.write('{"id": "batch-1", "custom_id": "q4_r')
+    return file_path
+
+
+def test_load_resume_state_skips_recorded_responses(partial_output_file):
+    """Test that successes and failures are skipped and the partial line removed"""
+    batch_id, done = load_resume_state(str(partial_output_file))
+
+    assert batch_id == "batch-1"
+    assert done == {"q1_rep00", "q2_rep00", "q3_rep00"}
+    assert partial_output_file.read_text(encoding="utf-8").endswith("\n")
+    assert len(partial_output_file.read_text(encoding="utf-8").splitlines()) == 3
+
+
+def test_truncate_partial_line_across_blocks(partial_output_file):
+    """Test that a partial line longer than the read block is removed"""
+    # Arrange
+    complete = partial_output_file.read_bytes().rsplit(b"\n", 1)[0] + b"\n"
+
+    # Act
+    _truncate_partial_line(str(partial_output_file), block_size=4)
+
+    # Assert
+    assert partial_output_file.read_bytes() == complete
+
+
+def test_truncate_partial_line_without_newline(tmp_path):
+    """Test that a file holding only a partial line is emptied"""
+    # Arrange
+    file_path = tmp_path / "batch_output.jsonl"
+    file_path.write_bytes(b'{"id": "batch-1", "cus')
+
+    # Act
+    _truncate_partial_line(str(file_path), block_size=4)
+
+    # Assert
+    assert file_path.read_bytes() == b""
+
+
+def test_load_resume_state_retry_failed(partial_output_file):
+    """Test that failed responses are dropped from the file when retrying them"""
+    batch_id, done = load_resume_state(str(partial_output_file), retry_failed=True)
+
+    assert batch_id == "batch-1"
+    assert done == {"q1_rep00", "q3_rep00"}
+    lines = partial_output_file.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["custom_id"] for line in lines] == [
+        "q1_rep00",
+        "q3_rep00",
+    ]
+
+
+def _rate_limit_error(retry_after: str) -> RateLimitError:
+    request = httpx.Request("POST", "http://localhost/v1/chat/completions")
+    response = httpx.Response(
+        429, headers={"retry-after": retry_after}, request=request
+    )
+    return RateLimitError("Too many requests", response=response, body=None)
+
+
+def test_process_request_async_retries_rate_limit(
+    sample_openai_batch, successful_api_response, mock_uuid
+):
+    """Test that a 429 is retried through the rate limiter instead of failing"""
+    # Arrange
+    mock_service = Mock()
+    mock_service.create_completion = AsyncMock(
+        side_effect=[_rate_limit_error("0.01"), successful_api_response]
+    )
+    rate_limiter = RateLimiter(max_concurrency=4)
+    retry_policy = RetryPolicy(base_delay=0.01)
+
+    # Act
+    result = asyncio.run(
+        process_request_async(
+            sample_openai_batch,
+            "test-batch-id",
+            mock_service,
+            rate_limiter,
+            retry_policy,
+        )
+    )
+
+    # Assert
+    assert mock_service.create_completion.await_count == 2
+    assert result.error is None
+    assert result.response is not None
+    assert result.response.status_code == 200
+    assert rate_limiter.throttled == 1
+    assert rate_limiter.concurrency.limit < 4
+
+
+def test_process_request_async_rate_limit_exhausted(sample_openai_batch, mock_uuid):
+    """Test that persistent 429s are recorded as an error after max attempts"""
+    # Arrange
+    mock_service = Mock()
+    mock_service.create_completion = AsyncMock(side_effect=_rate_limit_error("0"))
+    rate_limiter = RateLimiter(max_concurrency=1)
+    retry_policy = RetryPolicy(max_attempts={"rate_limit": 3}, base_delay=0.0)
+
+    # Act
+    result = asyncio.run(
+        process_request_async(
+            sample_openai_batch,
+            "test-batch-id",
+            mock_service,
+            rate_limiter,
+            retry_policy,
+        )
+    )
+
+    # Assert
+    assert mock_service.create_completion.await_count == 3
+    assert rate_limiter.throttled == 3
+    assert result.error == "Too many requests"
+    assert result.response is not None
+    assert result.response.status_code == 429
+
+
+def test_process_request_async_rate_limit_single_attempt(
+    sample_openai_batch, mock_uuid
+):
+    """Test that `--max-attempts 1` sends a rate-limited request only once"""
+    # Arrange
+    mock_service = Mock()
+    mock_service.create_completion = AsyncMock(side_effect=_rate_limit_error("0"))
+    rate_limiter = RateLimiter(rpm=600, max_concurrency=4)
+    retry_policy = RetryPolicy(max_attempts=dict.fromkeys(DEFAULT_MAX_ATTEMPTS, 1))
+
+    # Act
+    result = asyncio.run(
+        process_request_async(
+            sample_openai_batch,
+            "test-batch-id",
+            mock_service,
+            rate_limiter,
+            retry_policy,
+        )
+    )
+
+    # Assert
+    assert mock_service.create_completion.await_count == 1
+    assert rate_limiter.throttled == 1
+    assert result.response is not None
+    assert result.response.status_code == 429
+
+
+def test_process_request_retries_transient_error(
+    sample_openai_batch, successful_api_response, mock_uuid
+):
+    """Test that a timeout is retried according to the retry policy"""
+    # Arrange
+    mock_service = Mock()
+    timeout = APITimeoutError(request=httpx.Request("POST", "http://localhost"))
+    mock_service.create_completion.side_effect = [timeout, successful_api_response]
+    retry_policy = RetryPolicy(base_delay=0)
+
+    # Act
+    result = process_request(
+        sample_openai_batch, "test-batch-id", mock_service, retry_policy
+    )
+
+    # Assert
+    assert mock_service.create_completion.call_count == 2
+    assert result.error is None
+    assert result.response is not None
+    assert result.response.status_code == 200
+
+
+def test_process_request_async_does_not_retry_permanent_error(
+    sample_openai_batch, mock_uuid
+):
+    """Test that an unclassified error fails on the first attempt"""
+    # Arrange
+    mock_service = Mock()
+    mock_service.create_completion = AsyncMock(side_effect=ValueError("bad input"))
+
+    # Act
+    result = asyncio.run(
+        process_request_async(
+            sample_openai_batch,
+            "test-batch-id",
+            mock_service,
+            retry_policy=RetryPolicy(base_delay=0),
+        )
+    )
+
+    # Assert
+    assert mock_service.create_completion.await_count == 1
+    assert result.error == "bad input"
+    assert result.response is not None
+    assert result.response.status_code == 500
+
+
+def test_run_batch_reports_failures(sample_openai_batch, successful_api_response):
+    """Test that permanently failed requests are passed to on_failure"""
+    # Arrange
+    truncated = successful_api_response.model_copy(deep=True)
+    truncated.choices[0].finish_reason = "length"
+    mock_service = Mock()
+    mock_service.create_completion = AsyncMock(
+        side_effect=[successful_api_response, truncated]
+    )
+    requests = [
+        sample_openai_batch.model_copy(update={"custom_id": "ok"}),
+        sample_openai_batch.model_copy(update={"custom_id": "truncated"}),
+    ]
+    results = []
+    failures = []
+
+    # Act
+    asyncio.run(
+        run_batch(
+            requests,
+            "test-batch-id",
+            results.append,
+            service=mock_service,
+            on_failure=failures.append,
+        )
+    )
+
+    # Assert
+    assert len(results) == 2
+    assert len(failures) == 1
+    assert failures[0].custom_id == "truncated"
+    assert failures[0].status_code == 422
+    assert failures[0].error == "finish_reason: length"
+    assert OpenAIBatch(**failures[0].model_dump()).body == sample_openai_batch.body
+
+
+def test_process_request_async_uses_response_cache(
+    sample_openai_batch, successful_api_response, tmp_path
+):
+    """Deterministic requests are answered from the cache on a second run"""
+    # Arrange
+    sample_openai_batch.body.temperature = 0
+    mock_service = Mock()
+    mock_service.create_completion = AsyncMock(return_value=successful_api_response)
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+
+    # Act
+    first = asyncio.run(
+        process_request_async(sample_openai_batch, "b1", mock_service, cache=cache)
+    )
+    second = asyncio.run(
+        process_request_async(sample_openai_batch, "b2", mock_service, cache=cache)
+    )
+
+    # Assert
+    assert mock_service.create_completion.await_count == 1
+    assert second.id == "b2"
+    assert second.response == first.response
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_run_batch_records_request_metrics(
+    sample_openai_batch, successful_api_response
+):
+    """Every response carries its timing and token counts"""
+    # Arrange
+    mock_service = Mock()
+    mock_service.create_completion = AsyncMock(return_value=successful_api_response)
+    results = []
+
+    # Act
+    asyncio.run(
+        run_batch(
+            [sample_openai_batch] * 3,
+            "batch",
+            results.append,
+            concurrency=1,
+            service=mock_service,
+        )
+    )
+
+    # Assert
+    metrics = [result.metrics for result in results]
+    assert all(m.attempts == 1 and not m.cached for m in metrics)
+    assert all(m.latency_s >= 0 and m.total_s >= m.latency_s for m in metrics)
+    assert all(m.queue_wait_s >= 0 for m in metrics)
+    assert [(m.prompt_tokens, m.completion_tokens) for m in metrics] == [(8, 10)] * 3
+
+
+def test_process_request_async_stream_records_token_timing(
+    sample_openai_batch, successful_api_response, mock_uuid
+):
+    """Streamed requests keep the response body and add TTFT and inter-token time"""
+    # Arrange
+    mock_service = Mock()
+    mock_service.stream_completion = AsyncMock(
+        return_value=StreamedCompletion(successful_api_response, 0.25, 0.01)
+    )
+
+    # Act
+    result = asyncio.run(
+        process_request_async(
+            sample_openai_batch,
+            "test-batch-id",
+            mock_service,
+            stream=True,
+            stall_timeout=5.0,
+        )
+    )
+
+    # Assert
+    mock_service.create_completion.assert_not_called()
+    assert mock_service.stream_completion.call_args.kwargs["stall_timeout"] == 5.0
+    assert result.response.body == successful_api_response
+    assert result.metrics.ttft_s == 0.25
+    assert result.metrics.inter_token_s == 0.01
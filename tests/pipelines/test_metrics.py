@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from llmbatch.models.responses import BatchResponse, Response
+from llmbatch.models.schemas import RequestMetrics
+from llmbatch.pipelines.metrics import MetricsCollector, percentiles
+
+
+def _response(latency: float, status_code: int = 200, **metrics) -> BatchResponse:
+    return BatchResponse(
+        id="batch",
+        custom_id="q0_rep00",
+        response=Response(status_code=status_code, request_id="req"),
+        metrics=RequestMetrics(latency_s=latency, total_s=latency, **metrics),
+    )
+
+
+def test_percentiles_nearest_rank():
+    values = [float(i) for i in range(1, 101)]
+    assert percentiles(values) == {0.5: 50.0, 0.95: 95.0, 0.99: 99.0}
+    assert percentiles([]) == {}
+
+
+def test_collector_summary():
+    # Arrange
+    collector = MetricsCollector()
+    responses = [
+        _response(0.1 * i, prompt_tokens=10, completion_tokens=20, tokens_per_s=5.0)
+        for i in range(1, 11)
+    ]
+    responses.append(_response(1.0, status_code=500))
+    responses.append(_response(0.0, cached=True))
+
+    # Act
+    for response in responses:
+        collector.observe(response)
+    summary = collector.summary()
+
+    # Assert
+    assert (summary["requests"], summary["failed"], summary["cached"]) == (12, 1, 1)
+    assert summary["completion_tokens"] == 200
+    assert summary["latency"]["count"] == 11
+    assert summary["latency"]["p50"] == pytest.approx(0.6)
+    assert summary["tokens_per_s"]["p99"] == 5.0
+    assert summary["ttft"] == {"count": 0, "sum": 0}
+
+
+def test_collector_writes_json_and_prometheus(tmp_path):
+    # Arrange
+    collector = MetricsCollector()
+    collector.observe(_response(0.25, completion_tokens=4))
+
+    # Act
+    collector.write(str(tmp_path / "metrics.json"))
+    collector.write(str(tmp_path / "metrics.prom"))
+
+    # Assert
+    with open(tmp_path / "metrics.json", "r", encoding="utf-8") as f:
+        assert json.load(f)["latency"]["p95"] == 0.25
+    prometheus = (tmp_path / "metrics.prom").read_text(encoding="utf-8")
+    assert 'llmbatch_request_latency_seconds{quantile="0.5"} 0.25' in prometheus
+    assert "llmbatch_request_latency_seconds_count 1" in prometheus
+    assert "llmbatch_completion_tokens_total 4" in prometheus
@@ -2,11 +2,13 @@ import json
 import os
 import tempfile
 from typing import List
+from unittest.mock import patch
 
 import pytest
 
 from llmbatch.models.schemas import OutputModel
-from llmbatch.pipelines.post import parse_batch_jsonl
+from llmbatch.pipelines.post import iter_batch_jsonl, parse_batch_jsonl
+from llmbatch.utils.general import load_jsonl_generator
 
 
 @pytest.fixture
@@ -173,3 +175,63 @@ def test_parse_batch_jsonl_unknown_format():
             parse_batch_jsonl(file_path)
     finally:
         os.unlink(file_path)
+
+
+def test_iter_batch_jsonl_reads_file_once(openai_jsonl_file):
+    # Arrange
+    with patch(
+        "llmbatch.pipelines.post.load_jsonl_generator",
+        wraps=load_jsonl_generator,
+    ) as mock_loader:
+        # Act
+        results = iter_batch_jsonl(openai_jsonl_file)
+        first = next(results)
+        rest = list(results)
+
+    # Assert
+    assert mock_loader.call_count == 1
+    assert first.custom_id == "test3"
+    assert [r.custom_id for r in rest] == ["test4"]
+
+
+def test_parse_openai_jsonl_failed_request_without_body(tmp_path):
+    # Arrange: a failed request as written by `run`, without a response body
+    file_path = tmp_path / "batch_output.jsonl"
+    record = {
+        "id": "batch-1",
+        "custom_id": "q1_rep00",
+        "response": {"status_code": 503, "request_id": "abc", "body": None},
+        "error": "Connection error.",
+    }
+    file_path.write_text(json.dumps(record) + "\n", encoding="utf-8")
+
+    # Act
+    results = parse_batch_jsonl(str(file_path))
+
+    # Assert
+    assert len(results) == 1
+    assert results[0].custom_id == "q1"
+    assert results[0].type == "failed"
+    assert results[0].response == ""
+    assert results[0].input_tokens == 0
+
+
+def test_parse_batch_jsonl_error_only_file(tmp_path):
+    # Arrange: an OpenAI Batch API error file, where every request expired
+    file_path = tmp_path / "batch_output.jsonl"
+    record = {
+        "id": "batch_req_1",
+        "custom_id": "q1_rep00",
+        "response": None,
+        "error": {"code": "batch_expired", "message": "This request expired"},
+    }
+    file_path.write_text(json.dumps(record) + "\n", encoding="utf-8")
+
+    # Act
+    results = parse_batch_jsonl(str(file_path))
+
+    # Assert
+    assert len(results) == 1
+    assert results[0].custom_id == "q1"
+    assert results[0].type == "failed"
+    assert results[0].response == ""
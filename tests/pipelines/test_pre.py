@@ -4,7 +4,11 @@ from unittest.mock import patch
 import pytest
 
 from llmbatch.models.schemas import AnthropicBatch, OpenAIBatch, Question
-from llmbatch.pipelines.pre import create_batch
+from llmbatch.pipelines.pre import (
+    create_batch,
+    create_batch_generator,
+    create_batch_parallel,
+)
 
 
 @pytest.fixture
@@ -148,3 +152,62 @@ def test_create_batch_invalid_format(sample_questions):
     # Act & Assert
     with pytest.raises(ValueError, match="Invalid format: unknown"):
         create_batch(questions=sample_questions, format="unknown")
+
+
+def test_create_batch_generator_is_lazy(sample_questions, mock_create_body_funcs):
+    # Arrange
+    mock_openai, _ = mock_create_body_funcs
+
+    # Act
+    batch = create_batch_generator(
+        questions=iter(sample_questions),
+        format="openai",
+        n_answers=2,
+        model="gpt-4",
+        temperature=0.7,
+        max_tokens=100,
+    )
+    first_item = next(batch)
+
+    # Assert
+    assert first_item.custom_id == "q1_rep00"
+    assert mock_openai.call_count == 1
+    assert [item.custom_id for item in batch] == ["q1_rep01", "q2_rep00", "q2_rep01"]
+
+
+def test_create_batch_generator_invalid_format(sample_questions):
+    # Act & Assert: the format is validated before iteration starts
+    with pytest.raises(ValueError, match="Invalid format: unknown"):
+        create_batch_generator(questions=sample_questions, format="unknown")
+
+
+def test_create_batch_parallel_preserves_order():
+    # Arrange
+    questions = [
+        Question(question_id=f"q{i}", question=f"Question number {i}")
+        for i in range(10)
+    ]
+    params = {"model": "gpt-4", "temperature": 0.7, "max_tokens": 100}
+
+    # Act
+    expected = create_batch(questions, format="openai", n_answers=3, **params)
+    result = list(
+        create_batch_parallel(
+            iter(questions),
+            format="openai",
+            n_answers=3,
+            workers=2,
+            chunk_size=3,
+            **params,
+        )
+    )
+
+    # Assert
+    assert [item.custom_id for item in result] == [item.custom_id for item in expected]
+    assert result == expected
+
+
+def test_create_batch_parallel_invalid_format(sample_questions):
+    # Act & Assert
+    with pytest.raises(ValueError, match="Invalid format: unknown"):
+        create_batch_parallel(questions=sample_questions, format="unknown")
@@ -0,0 +1,76 @@
+import httpx
+import pytest
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    BadRequestError,
+    InternalServerError,
+    RateLimitError,
+)
+
+from llmbatch.pipelines.retry import (
+    RetryPolicy,
+    classify_error,
+    error_status_code,
+    finish_reason_status_code,
+)
+
+REQUEST = httpx.Request("POST", "http://localhost/v1/chat/completions")
+
+
+def _status_error(cls, status_code: int, headers: dict | None = None):
+    response = httpx.Response(status_code, headers=headers, request=REQUEST)
+    return cls("error", response=response, body=None)
+
+
+@pytest.mark.parametrize(
+    "error, expected_class, expected_status",
+    [
+        (_status_error(RateLimitError, 429), "rate_limit", 429),
+        (APITimeoutError(request=REQUEST), "timeout", 408),
+        (APIConnectionError(request=REQUEST), "connection", 503),
+        (_status_error(InternalServerError, 502), "server", 502),
+        (_status_error(BadRequestError, 400), "client", 400),
+        (ValueError("boom"), "unknown", 500),
+    ],
+)
+def test_classify_error(error, expected_class, expected_status):
+    assert classify_error(error) == expected_class
+    assert error_status_code(error) == expected_status
+
+
+@pytest.mark.parametrize(
+    "finish_reason, expected_status",
+    [("stop", 200), ("length", 422), ("content_filter", 500), (None, 500)],
+)
+def test_finish_reason_status_code(finish_reason, expected_status):
+    assert finish_reason_status_code(finish_reason) == expected_status
+
+
+def test_retry_policy_per_class_attempts():
+    """Test that transient errors are retried and permanent ones are not."""
+    policy = RetryPolicy(max_attempts={"timeout": 3})
+    timeout = APITimeoutError(request=REQUEST)
+
+    assert policy.should_retry(timeout, attempt=1)
+    assert policy.should_retry(timeout, attempt=2)
+    assert not policy.should_retry(timeout, attempt=3)
+    assert not policy.should_retry(_status_error(BadRequestError, 400), attempt=1)
+
+
+def test_retry_policy_delay_is_bounded():
+    """Test that the jittered delay stays within the exponential envelope."""
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+    error = APITimeoutError(request=REQUEST)
+
+    for attempt in range(1, 10):
+        delay = policy.delay(error, attempt)
+        assert 0 <= delay <= min(5.0, 2 ** (attempt - 1))
+
+
+def test_retry_policy_delay_honours_retry_after():
+    """Test that a retry-after header is used as a lower bound."""
+    policy = RetryPolicy(base_delay=0.01, max_delay=60.0)
+    error = _status_error(RateLimitError, 429, headers={"retry-after": "7"})
+
+    assert policy.delay(error, attempt=1) == 7.0
@@ -0,0 +1,175 @@
+import json
+
+import pytest
+
+from llmbatch.models.schemas import Body
+from llmbatch.pipelines.schedule import (
+    estimate_cost,
+    plan_schedule,
+    prefix_key,
+    prefix_stats,
+)
+
+
+@pytest.fixture
+def batch_file(tmp_path):
+    """Requests whose cost grows with the prompt length or max_tokens"""
+    items = [
+        ("short", "Hi", 10),
+        ("long_prompt", "x" * 40_000, 10),
+        ("long_answer", "Hi", 8196),
+        ("medium", "Hi", 500),
+    ]
+    path = tmp_path / "batch.jsonl"
+    with open(path, "w", encoding="utf-8") as f:
+        for custom_id, content, max_tokens in items:
+            item = {
+                "custom_id": custom_id,
+                "body": {
+                    "messages": [{"role": "user", "content": content}],
+                    "model": "gemma2:2b",
+                    "temperature": 0.7,
+                    "max_tokens": max_tokens,
+                },
+            }
+            f.write(json.dumps(item) + "\n")
+    return str(path)
+
+
+def _ids(schedule) -> list[str]:
+    return [request.custom_id for request in schedule]
+
+
+def test_estimate_cost_weighs_prompt_and_max_tokens():
+    # Arrange
+    body = Body(
+        messages=[{"role": "user", "content": "x" * 4000}],
+        model="gemma2:2b",
+        temperature=0,
+        max_tokens=100,
+    )
+
+    # Act
+    cost = estimate_cost(body)
+
+    # Assert
+    assert 100 < cost < 1100
+
+
+def test_plan_schedule_fifo_keeps_file_order(batch_file):
+    schedule = plan_schedule(batch_file)
+
+    assert len(schedule) == 4
+    assert _ids(schedule) == ["short", "long_prompt", "long_answer", "medium"]
+
+
+def test_plan_schedule_longest_first(batch_file):
+    schedule = plan_schedule(batch_file, "longest-first")
+
+    assert _ids(schedule) == ["long_answer", "long_prompt", "medium", "short"]
+
+
+def test_plan_schedule_shortest_first_skips_done(batch_file):
+    schedule = plan_schedule(batch_file, "shortest-first", skip={"medium"})
+
+    assert _ids(schedule) == ["short", "long_prompt", "long_answer"]
+
+
+def test_plan_schedule_unknown_policy(batch_file):
+    with pytest.raises(ValueError, match="schedule policy"):
+        plan_schedule(batch_file, "random")  # type: ignore
+
+
+@pytest.fixture
+def image_batch_file(tmp_path):
+    """Two questions on each of two images, with two repetitions, interleaved"""
+    path = tmp_path / "batch.jsonl"
+    with open(path, "w", encoding="utf-8") as f:
+        for rep in range(2):
+            for question in range(4):
+                image = f"data:image/png;base64,{'AB' * 500}{question % 2}"
+                item = {
+                    "custom_id": f"q{question}_rep{rep:02d}",
+                    "body": {
+                        "messages": [
+                            {"role": "system", "content": "You are helpful." * 20},
+                            {
+                                "role": "user",
+                                "content": [
+                                    {"type": "image_url", "image_url": {"url": image}},
+                                    {"type": "text", "text": f"Question {question}"},
+                                ],
+                            },
+                        ],
+                        "model": "gemma2:2b",
+                        "temperature": 0.7,
+                        "max_tokens": 100,
+                    },
+                }
+                f.write(json.dumps(item) + "\n")
+    return str(path)
+
+
+def test_prefix_key_ignores_generation_parameters():
+    # Arrange
+    bodies = [
+        Body(
+            messages=[{"role": "user", "content": "Hello"}],
+            model="gemma2:2b",
+            temperature=temperature,
+            max_tokens=100,
+        )
+        for temperature in (0, 0.7)
+    ]
+
+    # Act & Assert
+    assert prefix_key(bodies[0]) == prefix_key(bodies[1])
+
+
+def test_plan_schedule_prefix_groups_images_and_repetitions(image_batch_file):
+    # Act
+    schedule = plan_schedule(image_batch_file, "prefix")
+    ids = _ids(schedule)
+
+    # Assert: repetitions are adjacent, and questions on one image are adjacent
+    question_order = [custom_id.split("_")[0] for custom_id in ids]
+    assert question_order[::2] == question_order[1::2]
+    images = [int(question[1:]) % 2 for question in question_order]
+    assert images == sorted(images) or images == sorted(images, reverse=True)
+
+
+def test_prefix_stats_counts_groups_and_shared_tokens(image_batch_file):
+    # Act
+    fifo = prefix_stats(plan_schedule(image_batch_file))
+    grouped = prefix_stats(plan_schedule(image_batch_file, "prefix"))
+
+    # Assert
+    assert (grouped["system_prompts"], grouped["image_groups"]) == (1, 2)
+    assert grouped["prompts"] == 4
+    assert grouped["prompt_tokens"] == fifo["prompt_tokens"]
+    assert grouped["reusable_tokens"] > fifo["reusable_tokens"]
+
+
+def test_plan_schedule_prefix_accepts_empty_messages(tmp_path):
+    # Arrange
+    path = tmp_path / "batch.jsonl"
+    with open(path, "w", encoding="utf-8") as f:
+        for custom_id, messages in [
+            ("empty", []),
+            ("hello", [{"role": "user", "content": "Hello"}]),
+        ]:
+            body = {
+                "messages": messages,
+                "model": "gemma2:2b",
+                "temperature": 0,
+                "max_tokens": 10,
+            }
+            f.write(json.dumps({"custom_id": custom_id, "body": body}) + "\n")
+
+    # Act
+    schedule = plan_schedule(str(path), "prefix")
+    stats = prefix_stats(schedule)
+
+    # Assert
+    assert sorted(_ids(schedule)) == ["empty", "hello"]
+    assert stats["requests"] == 2
@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+from llmbatch.models.schemas import Body, OpenAIBatch
+from llmbatch.pipelines.shard import (
+    iter_request_chunks,
+    resolve_batch_files,
+    write_sharded_jsonl,
+)
+
+
+@pytest.fixture
+def sample_items() -> list[OpenAIBatch]:
+    return [
+        OpenAIBatch(
+            custom_id=f"q{i}_rep00",
+            body=Body(
+                messages=[{"role": "user", "content": "Hi"}],
+                model="gemma2:2b",
+                temperature=0.7,
+                max_tokens=100,
+            ),
+        )
+        for i in range(5)
+    ]
+
+
+def test_write_sharded_jsonl_bounds_request_count(sample_items, tmp_path):
+    # Arrange
+    output_path = tmp_path / "batch.jsonl"
+
+    # Act
+    manifest = write_sharded_jsonl(
+        iter(sample_items), str(output_path), "openai", max_requests=2
+    )
+
+    # Assert
+    assert [shard.requests for shard in manifest.shards] == [2, 2, 1]
+    assert [shard.path for shard in manifest.shards] == [
+        "batch_000.jsonl",
+        "batch_001.jsonl",
+        "batch_002.jsonl",
+    ]
+    with open(tmp_path / "batch_manifest.json", "r", encoding="utf-8") as f:
+        assert json.load(f)["total_requests"] == 5
+
+
+def test_write_sharded_jsonl_bounds_bytes(sample_items, tmp_path):
+    # Arrange
+    line_size = len(sample_items[0].model_dump_json()) + 1
+    output_path = tmp_path / "batch.jsonl"
+
+    # Act
+    manifest = write_sharded_jsonl(
+        iter(sample_items), str(output_path), "openai", max_bytes=3 * line_size
+    )
+
+    # Assert
+    assert [shard.requests for shard in manifest.shards] == [3, 2]
+    assert all(shard.bytes <= 3 * line_size for shard in manifest.shards)
+    assert manifest.total_bytes == sum(
+        (tmp_path / shard.path).stat().st_size for shard in manifest.shards
+    )
+
+
+def test_write_sharded_jsonl_rejects_oversized_request(sample_items, tmp_path):
+    with pytest.raises(ValueError, match="exceeds the shard limit"):
+        write_sharded_jsonl(
+            iter(sample_items), str(tmp_path / "batch.jsonl"), "openai", max_bytes=10
+        )
+
+
+def test_resolve_and_chunk_manifest(sample_items, tmp_path):
+    # Arrange
+    write_sharded_jsonl(
+        iter(sample_items), str(tmp_path / "batch.jsonl"), "openai", max_requests=2
+    )
+
+    # Act
+    files = resolve_batch_files(str(tmp_path / "batch_manifest.json"))
+    chunks = list(iter_request_chunks(files, max_requests=4, max_bytes=10**6))
+
+    # Assert
+    assert len(files) == 3
+    assert [len(chunk) for chunk in chunks] == [4, 1]
+    assert [item["custom_id"] for chunk in chunks for item in chunk] == [
+        item.custom_id for item in sample_items
+    ]
@@ -0,0 +1,206 @@
+import asyncio
+import json
+import sqlite3
+import time
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from openai.types.chat.chat_completion import ChatCompletion, Choice
+from openai.types.chat.chat_completion_message import ChatCompletionMessage
+
+from llmbatch.pipelines import work_queue
+from llmbatch.pipelines.work_queue import WorkQueue, run_worker
+
+
+@pytest.fixture
+def batch_file(tmp_path):
+    path = tmp_path / "batch.jsonl"
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(10):
+            item = {
+                "custom_id": f"q{i}_rep00",
+                "body": {
+                    "messages": [{"role": "user", "content": f"Question {i}"}],
+                    "model": "gemma2:2b",
+                    "temperature": 0.7,
+                    "max_tokens": 100,
+                },
+            }
+            f.write(json.dumps(item) + "\n")
+    return str(path)
+
+
+@pytest.fixture
+def completion():
+    return ChatCompletion(
+        id="chatcmpl-123",
+        choices=[
+            Choice(
+                finish_reason="stop",
+                index=0,
+                message=ChatCompletionMessage(content="Answer", role="assistant"),
+            )
+        ],
+        created=0,
+        model="gemma2:2b",
+        object="chat.completion",
+    )
+
+
+def test_load_is_idempotent(batch_file, tmp_path):
+    """Test that loading the same batch twice does not duplicate requests"""
+    # Arrange
+    queue = WorkQueue(str(tmp_path / "queue.sqlite"))
+
+    # Act
+    first = queue.load(batch_file)
+    second = queue.load(batch_file)
+
+    # Assert
+    assert (first, second) == (10, 0)
+    assert queue.counts() == {"pending": 10, "leased": 0, "done": 0}
+    assert queue.batch_id
+
+
+def test_expired_leases_are_requeued(batch_file, tmp_path):
+    """Test that requests of a worker that stopped heartbeating are leased again"""
+    # Arrange
+    queue = WorkQueue(str(tmp_path / "queue.sqlite"))
+    queue.load(batch_file)
+    crashed = queue.lease("crashed", 4, lease_seconds=0.05)
+    alive = queue.lease("alive", 2, lease_seconds=60.0)
+    time.sleep(0.1)
+
+    # Act
+    released = queue.lease("other", 10, lease_seconds=60.0)
+
+    # Assert
+    assert [r.custom_id for r in crashed] == [f"q{i}_rep00" for i in range(4)]
+    assert [r.custom_id for r in alive] == ["q4_rep00", "q5_rep00"]
+    assert sorted(r.custom_id for r in released) == sorted(
+        [r.custom_id for r in crashed] + [f"q{i}_rep00" for i in range(6, 10)]
+    )
+
+
+def test_heartbeat_extends_leases(batch_file, tmp_path):
+    """Test that a heartbeat keeps leases from expiring"""
+    # Arrange
+    queue = WorkQueue(str(tmp_path / "queue.sqlite"))
+    queue.load(batch_file)
+    queue.lease("worker", 3, lease_seconds=0.0)
+
+    # Act
+    extended = queue.heartbeat("worker", lease_seconds=60.0)
+    time.sleep(0.01)
+
+    # Assert
+    assert extended == 3
+    assert len(queue.lease("other", 10, lease_seconds=60.0)) == 7
+
+
+def test_workers_share_queue(batch_file, tmp_path, completion):
+    """Test that concurrent workers process every request exactly once"""
+    # Arrange
+    path = str(tmp_path / "queue.sqlite")
+    WorkQueue(path).load(batch_file)
+    services = [Mock(), Mock()]
+    for service in services:
+        service.create_completion = AsyncMock(return_value=completion)
+    queues = [WorkQueue(path), WorkQueue(path)]
+
+    async def work():
+        return await asyncio.gather(
+            *(
+                run_worker(queue, f"w{i}", concurrency=2, service=service)
+                for i, (queue, service) in enumerate(zip(queues, services))
+            )
+        )
+
+    # Act
+    results = asyncio.run(work())
+    output_path = tmp_path / "output.jsonl"
+    count = queues[0].export(str(output_path))
+
+    # Assert
+    assert sum(processed for processed, _ in results) == 10
+    assert sum(s.create_completion.await_count for s in services) == 10
+    assert queues[0].counts() == {"pending": 0, "leased": 0, "done": 10}
+    with open(output_path, "r", encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    assert count == 10
+    assert [line["custom_id"] for line in lines] == [f"q{i}_rep00" for i in range(10)]
+    assert {line["id"] for line in lines} == {queues[0].batch_id}
+
+
+def test_worker_waits_for_locked_queue_off_the_event_loop(
+    batch_file, tmp_path, completion, monkeypatch
+):
+    """Test that a locked queue neither blocks the event loop nor stops the worker"""
+    # Arrange
+    monkeypatch.setattr(work_queue, "DB_RETRY_DELAY", 0.05)
+    path = str(tmp_path / "queue.sqlite")
+    WorkQueue(path).load(batch_file)
+    queue = WorkQueue(path, timeout=0.05)
+    service = Mock()
+    service.create_completion = AsyncMock(return_value=completion)
+    other_worker = sqlite3.connect(path, isolation_level=None)
+    other_worker.execute("BEGIN IMMEDIATE")
+
+    async def work():
+        async def release_lock():
+            # Only runs if leasing does not block the event loop
+            await asyncio.sleep(0.2)
+            other_worker.execute("COMMIT")
+
+        release = asyncio.create_task(release_lock())
+        result = await run_worker(queue, "w0", concurrency=2, service=service)
+        await release
+        return result
+
+    # Act
+    processed, failed = asyncio.run(work())
+
+    # Assert
+    assert (processed, failed) == (10, 0)
+    assert queue.counts() == {"pending": 0, "leased": 0, "done": 10}
+
+
+def test_interrupted_worker_commits_collected_responses(
+    batch_file, tmp_path, completion
+):
+    """Test that responses collected before a cancellation are committed"""
+    # Arrange
+    queue = WorkQueue(str(tmp_path / "queue.sqlite"))
+    queue.load(batch_file)
+    answered = []
+
+    async def create_completion(messages, **kwargs):
+        if messages[0]["content"] in ("Question 0", "Question 1", "Question 2"):
+            return completion
+        await asyncio.sleep(10)
+
+    service = Mock()
+    service.create_completion = AsyncMock(side_effect=create_completion)
+
+    async def work():
+        worker = asyncio.create_task(
+            run_worker(
+                queue,
+                "w0",
+                concurrency=10,
+                commit_every=100,
+                service=service,
+                on_result=answered.append,
+            )
+        )
+        while len(answered) < 3:
+            await asyncio.sleep(0.01)
+        worker.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await worker
+
+    # Act
+    asyncio.run(work())
+
+    # Assert
+    assert queue.counts() == {"pending": 0, "leased": 7, "done": 3}
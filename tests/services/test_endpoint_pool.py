@@ -0,0 +1,125 @@
+import asyncio
+
+import httpx
+import pytest
+from openai import APIConnectionError
+
+from llmbatch.services.endpoint_pool import AsyncEndpointPool, base_urls_from_env
+
+
+class FakeModels:
+    def __init__(self, healthy: bool):
+        self.healthy = healthy
+
+    async def list(self):
+        if not self.healthy:
+            raise APIConnectionError(request=httpx.Request("GET", "http://test"))
+        return []
+
+
+class FakeClient:
+    def __init__(self):
+        self.models = FakeModels(healthy=True)
+
+    def with_options(self, **kwargs):
+        return self
+
+
+class FakeService:
+    """Stand-in for AsyncOpenAIService recording the requests it receives."""
+
+    def __init__(self, fail: bool = False, delay: float = 0.0):
+        self.fail = fail
+        self.delay = delay
+        self.calls = 0
+        self.client = FakeClient()
+        self.closed = False
+
+    async def create_completion(self, messages, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise APIConnectionError(request=httpx.Request("POST", "http://test"))
+        return "completion"
+
+    async def close(self):
+        self.closed = True
+
+
+def _pool(services, **kwargs) -> AsyncEndpointPool:
+    urls = [f"http://host{i}/v1/" for i in range(len(services))]
+    return AsyncEndpointPool(urls, services=services, **kwargs)
+
+
+def test_base_urls_from_env(monkeypatch):
+    """Test that base URLs can be separated by commas or whitespace."""
+    monkeypatch.setenv("LLMBATCH_BASE_URLS", "http://a/v1/, http://b/v1/ http://c/v1/")
+    assert base_urls_from_env() == ["http://a/v1/", "http://b/v1/", "http://c/v1/"]
+
+
+def test_pool_balances_outstanding_requests():
+    """Test that concurrent requests are spread over the least loaded endpoints."""
+    services = [FakeService(delay=0.05), FakeService(delay=0.05), FakeService()]
+    pool = _pool(services)
+
+    async def send_many():
+        # The fast endpoint frees up immediately, so it takes the later requests
+        first = [asyncio.create_task(pool.create_completion([])) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        for _ in range(3):
+            await pool.create_completion([])
+        await asyncio.gather(*first)
+
+    asyncio.run(send_many())
+
+    assert [service.calls for service in services[:2]] == [1, 1]
+    assert services[2].calls == 4
+
+
+def test_pool_ejects_failing_endpoint():
+    """Test that an endpoint is ejected after consecutive failures."""
+    failing, healthy = FakeService(fail=True), FakeService()
+    pool = _pool([failing, healthy], max_failures=2, cooldown=60)
+
+    async def send_many():
+        for _ in range(10):
+            try:
+                await pool.create_completion([])
+            except APIConnectionError:
+                pass
+
+    asyncio.run(send_many())
+
+    assert failing.calls == 2
+    assert healthy.calls == 8
+    assert pool.endpoints[0].ejected_until > 0
+
+
+def test_pool_readmits_endpoint_after_health_check():
+    """Test that an ejected endpoint comes back once its health check passes."""
+    flaky, healthy = FakeService(fail=True), FakeService()
+    pool = _pool([flaky, healthy], max_failures=1, cooldown=0.01)
+
+    async def scenario():
+        with pytest.raises(APIConnectionError):
+            while True:
+                await pool.create_completion([])
+        flaky.fail = False
+        await asyncio.sleep(0.02)
+        # Triggers the health check, which readmits the endpoint
+        await pool.create_completion([])
+        await asyncio.sleep(0)
+        for _ in range(4):
+            await pool.create_completion([])
+
+    asyncio.run(scenario())
+
+    assert pool.endpoints[0].ejected_until == 0.0
+    assert flaky.calls >= 3
+
+
+def test_pool_close_closes_every_service():
+    """Test that closing the pool closes the service of every endpoint."""
+    services = [FakeService(), FakeService()]
+    asyncio.run(_pool(services).close())
+    assert all(service.closed for service in services)
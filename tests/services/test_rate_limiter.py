@@ -0,0 +1,116 @@
+import asyncio
+import time
+
+import pytest
+
+from llmbatch.services.rate_limiter import (
+    AdaptiveConcurrency,
+    RateLimiter,
+    TokenBucket,
+    retry_after_seconds,
+)
+
+
+def test_retry_after_seconds():
+    """Test parsing of retry-after style headers."""
+    assert retry_after_seconds({"retry-after": "2"}) == 2.0
+    assert retry_after_seconds({"retry-after-ms": "1500"}) == 1.5
+    assert retry_after_seconds({"retry-after": "not-a-date"}) is None
+    assert retry_after_seconds({}) is None
+    assert retry_after_seconds(None) is None
+
+
+def test_token_bucket_waits_for_refill():
+    """Test that acquiring beyond the burst capacity waits for the refill rate."""
+    # 600 per minute = 10 per second, 0.5 s burst = capacity of 5
+    bucket = TokenBucket(rate_per_minute=600, burst_seconds=0.5)
+
+    async def acquire_many():
+        start = time.monotonic()
+        for _ in range(7):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(acquire_many())
+    assert 0.15 <= elapsed < 1.0
+
+
+def test_token_bucket_allows_oversized_request():
+    """Test that a request larger than the capacity goes through and leaves debt."""
+    bucket = TokenBucket(rate_per_minute=60, burst_seconds=1)
+
+    asyncio.run(bucket.acquire(5))
+
+    assert bucket.level < 0
+
+
+def test_token_bucket_invalid_rate():
+    with pytest.raises(ValueError, match="Rate must be positive"):
+        TokenBucket(rate_per_minute=0)
+
+
+def test_adaptive_concurrency_aimd():
+    """Test additive increase and multiplicative decrease of the limit."""
+    concurrency = AdaptiveConcurrency(max_limit=8, min_limit=1, cooldown=0)
+
+    concurrency.on_throttle()
+    assert concurrency.limit == 4
+    concurrency.on_throttle()
+    assert concurrency.limit == 2
+
+    for _ in range(2):
+        concurrency.on_success()
+    assert 2.5 < concurrency.limit < 3.5
+
+    for _ in range(100):
+        concurrency.on_success()
+    assert concurrency.limit == 8
+
+
+def test_adaptive_concurrency_cooldown():
+    """Test that a burst of throttles only halves the limit once."""
+    concurrency = AdaptiveConcurrency(max_limit=8, cooldown=60)
+
+    for _ in range(5):
+        concurrency.on_throttle()
+
+    assert concurrency.limit == 4
+
+
+def test_rate_limiter_bounds_in_flight_requests():
+    """Test that the adaptive limit caps concurrent requests."""
+    limiter = RateLimiter(max_concurrency=4)
+    limiter.concurrency.limit = 2
+    in_flight = 0
+    max_in_flight = 0
+
+    async def request():
+        nonlocal in_flight, max_in_flight
+        async with limiter.limit(tokens=10):
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+    async def main():
+        await asyncio.gather(*(request() for _ in range(10)))
+
+    asyncio.run(main())
+    assert max_in_flight == 2
+
+
+def test_rate_limiter_pauses_after_rate_limit():
+    """Test that a 429 pauses subsequent requests for the retry-after delay."""
+    limiter = RateLimiter(max_concurrency=2)
+
+    async def main():
+        limiter.on_rate_limited(retry_after=0.2)
+        start = time.monotonic()
+        async with limiter.limit(tokens=1):
+            pass
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(main())
+    assert elapsed >= 0.15
+    assert limiter.throttled == 1
+    assert limiter.concurrency.limit == 1
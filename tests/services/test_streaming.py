@@ -0,0 +1,218 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from openai import APIConnectionError, AsyncOpenAI
+
+from llmbatch.services.openai_service import AsyncOpenAIService
+from llmbatch.services.streaming import StreamStalledError
+
+
+def _chunk(delta: dict, finish_reason=None, usage=None) -> dict:
+    return {
+        "id": "chatcmpl-1",
+        "object": "chat.completion.chunk",
+        "created": 1700000000,
+        "model": "mock",
+        "choices": []
+        if usage
+        else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        "usage": usage,
+    }
+
+
+COMPLETE_STREAM = [
+    _chunk({"role": "assistant"}),
+    _chunk({"content": "Hello"}),
+    _chunk({"content": ", world"}),
+    _chunk({}, finish_reason="stop"),
+    _chunk({}, usage={"prompt_tokens": 5, "completion_tokens": 2, "total_tokens": 7}),
+]
+
+
+def _service(
+    chunks: list[dict],
+    stall_after: int | None = None,
+    chunk_delay: float = 0.0,
+    headers_delay: float = 0.0,
+) -> AsyncOpenAIService:
+    """
+    A service whose server streams `chunks`, going silent after `stall_after`.
+
+    Every chunk is sent `chunk_delay` seconds after the previous one, and the
+    response headers `headers_delay` seconds after the request.
+    """
+
+    async def events():
+        for i, chunk in enumerate(chunks):
+            if i == stall_after:
+                await asyncio.sleep(10)
+            await asyncio.sleep(chunk_delay)
+            yield f"data: {json.dumps(chunk)}\n\n".encode()
+        yield b"data: [DONE]\n\n"
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        assert json.loads(request.content)["stream"] is True
+        await asyncio.sleep(headers_delay)
+        return httpx.Response(
+            200, headers={"content-type": "text/event-stream"}, content=events()
+        )
+
+    service = AsyncOpenAIService()
+    service.client = AsyncOpenAI(
+        base_url="http://test/v1/",
+        api_key="test",
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    return service
+
+
+def test_stream_completion_assembles_chat_completion():
+    """Test that chunks are merged into the body a non-streaming call returns."""
+    # Arrange
+    service = _service(COMPLETE_STREAM)
+
+    # Act
+    streamed = asyncio.run(
+        service.stream_completion([{"role": "user", "content": "Hi"}], model="mock")
+    )
+
+    # Assert
+    completion = streamed.completion
+    assert completion.object == "chat.completion"
+    assert completion.choices[0].message.content == "Hello, world"
+    assert completion.choices[0].finish_reason == "stop"
+    assert completion.usage.completion_tokens == 2
+    assert streamed.ttft is not None and streamed.ttft >= 0
+    assert streamed.inter_token is not None and streamed.inter_token >= 0
+
+
+def test_stream_completion_aborts_stalled_stream():
+    """Test that a stream going silent past the stall timeout is aborted."""
+    # Arrange
+    service = _service(COMPLETE_STREAM, stall_after=2)
+
+    # Act & Assert
+    with pytest.raises(StreamStalledError):
+        asyncio.run(
+            asyncio.wait_for(
+                service.stream_completion(
+                    [{"role": "user", "content": "Hi"}],
+                    stall_timeout=0.05,
+                    model="mock",
+                ),
+                timeout=5,
+            )
+        )
+
+
+def test_stream_completion_first_token_timeout():
+    """Test that waiting too long for the first token aborts the request."""
+    # Arrange
+    service = _service(COMPLETE_STREAM, stall_after=1)
+
+    # Act & Assert
+    with pytest.raises(StreamStalledError):
+        asyncio.run(
+            service.stream_completion(
+                [{"role": "user", "content": "Hi"}],
+                first_token_timeout=0.05,
+                model="mock",
+            )
+        )
+
+
+def test_stream_completion_stall_after_role_chunk():
+    """Test that the stall timeout applies from the first chunk, whatever it holds."""
+    # Arrange
+    service = _service(COMPLETE_STREAM, stall_after=1)
+
+    # Act & Assert
+    with pytest.raises(StreamStalledError, match="stalled"):
+        asyncio.run(
+            asyncio.wait_for(
+                service.stream_completion(
+                    [{"role": "user", "content": "Hi"}],
+                    stall_timeout=0.05,
+                    model="mock",
+                ),
+                timeout=5,
+            )
+        )
+
+
+def test_stream_completion_first_token_timeout_is_a_deadline():
+    """Test that chunks without tokens do not extend the first token timeout."""
+    # Arrange
+    empty_chunks = [_chunk({"role": "assistant"})] + [_chunk({})] * 20
+    service = _service(empty_chunks + COMPLETE_STREAM[1:], chunk_delay=0.02)
+
+    # Act & Assert
+    with pytest.raises(StreamStalledError, match="first token"):
+        asyncio.run(
+            service.stream_completion(
+                [{"role": "user", "content": "Hi"}],
+                first_token_timeout=0.1,
+                model="mock",
+            )
+        )
+
+
+def test_stream_completion_first_token_timeout_covers_headers():
+    """Test that a request still waiting for its response headers is aborted."""
+    # Arrange
+    service = _service(COMPLETE_STREAM, headers_delay=10)
+
+    # Act & Assert
+    with pytest.raises(StreamStalledError, match="first token"):
+        asyncio.run(
+            asyncio.wait_for(
+                service.stream_completion(
+                    [{"role": "user", "content": "Hi"}],
+                    first_token_timeout=0.05,
+                    model="mock",
+                ),
+                timeout=5,
+            )
+        )
+
+
+def test_stream_completion_tool_calls_count_as_tokens():
+    """Test that a tool-call-only completion meets the first token timeout."""
+    # Arrange
+    tool_call = {
+        "index": 0,
+        "id": "call_1",
+        "type": "function",
+        "function": {"name": "lookup", "arguments": "{}"},
+    }
+    chunks = [_chunk({"role": "assistant", "tool_calls": [tool_call]})]
+    chunks += [_chunk({})] * 10 + [_chunk({}, finish_reason="tool_calls")]
+    service = _service(chunks, chunk_delay=0.04)
+
+    # Act: the stream outlasts the timeout, but its first chunk is a token
+    streamed = asyncio.run(
+        service.stream_completion(
+            [{"role": "user", "content": "Hi"}],
+            first_token_timeout=0.2,
+            model="mock",
+        )
+    )
+
+    # Assert
+    assert streamed.completion.choices[0].message.tool_calls[0].id == "call_1"
+    assert streamed.ttft is not None
+
+
+def test_stream_completion_incomplete_stream():
+    """Test that a stream ending without a finish reason is a connection error."""
+    # Arrange
+    service = _service(COMPLETE_STREAM[:2])
+
+    # Act & Assert
+    with pytest.raises(APIConnectionError):
+        asyncio.run(
+            service.stream_completion([{"role": "user", "content": "Hi"}], model="mock")
+        )
@@ -0,0 +1,99 @@
+import subprocess
+import sys
+
+import click
+import pytest
+from click.testing import CliRunner
+
+from llmbatch.cli import COMMANDS, cli
+
+
+@pytest.mark.parametrize(
+    "module, heavy",
+    [
+        (
+            "llmbatch.cli",
+            ("anthropic", "openai", "instructor", "PIL", "tqdm", "pydantic"),
+        ),
+        # Commands that only read files must not pay for the SDKs either
+        ("llmbatch.commands.parse", ("anthropic", "openai")),
+        ("llmbatch.commands.estimate", ("anthropic", "openai")),
+    ],
+)
+def test_cli_import_skips_heavy_modules(module, heavy):
+    """Test that importing the CLI entry point or a light command skips the SDKs."""
+    # Arrange
+    code = f"import sys, {module}; print([m for m in {heavy!r} if m in sys.modules])"
+
+    # Act
+    result = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    )
+
+    # Assert
+    assert result.stdout.strip() == "[]"
+
+
+def test_cli_help_lists_commands():
+    # Act
+    result = CliRunner().invoke(cli, ["--help"])
+
+    # Assert
+    assert result.exit_code == 0
+    for name, (_, short_help) in COMMANDS.items():
+        assert name in result.output
+        assert short_help in result.output
+
+
+@pytest.mark.parametrize("name", COMMANDS)
+def test_cli_short_help_matches_command(name):
+    """Test that the registry's short help matches the command's own docstring."""
+    # Act
+    command = cli.get_command(click.Context(cli), name)
+
+    # Assert
+    assert isinstance(command, click.Command)
+    assert command.get_short_help_str(limit=200) == COMMANDS[name][1]
+
+
+def test_work_accepts_the_worker_options_of_run():
+    """Test that `work` takes the server, limit, retry and cache options of `run`."""
+    # Arrange
+    run_command = cli.get_command(click.Context(cli), "run")
+    work_command = cli.get_command(click.Context(cli), "work")
+    shared = {
+        "concurrency",
+        "base_urls",
+        "http2",
+        "stream",
+        "stall_timeout",
+        "first_token_timeout",
+        "rpm",
+        "tpm",
+        "max_attempts",
+        "dead_letter_path",
+        "cache_path",
+        "cache_all",
+    }
+
+    # Act
+    run_params = {param.name for param in run_command.params}
+    work_params = {param.name for param in work_command.params}
+
+    # Assert
+    assert shared <= run_params & work_params
+
+
+def test_work_checks_worker_options_like_run(tmp_path):
+    # Arrange
+    queue_path = tmp_path / "queue.sqlite"
+    queue_path.touch()
+
+    # Act
+    result = CliRunner().invoke(cli, ["work", str(queue_path), "--stall-timeout", "5"])
+
+    # Assert
+    assert result.exit_code == 2
+    assert "--stall-timeout and --first-token-timeout require --stream" in (
+        result.output
+    )
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+from pydantic import BaseModel
+
+from llmbatch.utils import codec
+
+
+class SampleModel(BaseModel):
+    name: str
+    values: list[int]
+
+
+@pytest.fixture(params=["orjson", "json"])
+def backend(request, monkeypatch):
+    """Run each test with orjson (when installed) and the stdlib fallback."""
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(codec, "orjson", None)
+    return request.param
+
+
+def test_loads_bytes_and_str(backend):
+    """Test decoding both raw bytes lines and text."""
+    data = {"text": "zażółć", "n": [1, 2.5, None]}
+    line = json.dumps(data, ensure_ascii=False).encode("utf-8") + b"\n"
+
+    assert codec.loads(line) == data
+    assert codec.loads(line.decode("utf-8")) == data
+
+
+def test_dumps_roundtrip(backend):
+    """Test that dumps produces compact UTF-8 JSON bytes."""
+    data = {"text": "zażółć", "nested": {"a": [1, 2]}}
+
+    encoded = codec.dumps(data)
+
+    assert isinstance(encoded, bytes)
+    assert "zażółć".encode("utf-8") in encoded
+    assert b"\n" not in encoded
+    assert codec.loads(encoded) == data
+
+
+def test_dump_model(backend):
+    """Test serialising a pydantic model straight to bytes."""
+    model = SampleModel(name="test", values=[1, 2, 3])
+
+    encoded = codec.dump_model(model)
+
+    assert isinstance(encoded, bytes)
+    assert json.loads(encoded) == model.model_dump()
+
+
+def test_loads_invalid(backend):
+    """Test that invalid input raises a ValueError for both backends."""
+    with pytest.raises(ValueError):
+        codec.loads(b'{"truncated": ')
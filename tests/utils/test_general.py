@@ -1,3 +1,4 @@
+import io
 import json
 from pathlib import Path
 from typing import List
@@ -5,12 +6,15 @@ from typing import List
 import pytest
 from pydantic import BaseModel
 
-from llmbatch.models.schemas import Config
+from llmbatch.models.schemas import Config, Question
 from llmbatch.utils.general import (
     append_to_jsonl,
+    iter_json_array,
     load_config,
     load_jsonl,
     load_jsonl_generator,
+    load_questions_generator,
+    write_jsonl,
 )
 
 
@@ -113,3 +117,61 @@ def test_load_config(sample_yaml_file):
     assert config.params.max_tokens == 1000
     assert config.n_answers == 1
     assert config.system_message == "You are a helpful assistant."
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 1 << 16])
+def test_iter_json_array(chunk_size):
+    """Test streaming the elements of a JSON array across chunk boundaries."""
+    data = [{"a": 1, "b": "x, ]"}, [1, 2], 12345, "text", None, {"nested": {"k": []}}]
+    f = io.StringIO(" \n" + json.dumps(data, indent=2))
+
+    assert list(iter_json_array(f, chunk_size=chunk_size)) == data
+
+
+def test_iter_json_array_empty_and_invalid():
+    """Test an empty array and a non-array document."""
+    assert list(iter_json_array(io.StringIO("[ ]"))) == []
+    with pytest.raises(ValueError, match="Expected a JSON array"):
+        list(iter_json_array(io.StringIO('{"a": 1}')))
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".json", ".jsonl"])
+def test_load_questions_generator(tmp_path, suffix):
+    """Test streaming questions from every supported input format."""
+    rows = [
+        {"question_id": "q1", "question": "What is AI?"},
+        {"question_id": "q2", "question": "Describe", "image_path": "img.png"},
+    ]
+    file_path = tmp_path / f"questions{suffix}"
+    with open(file_path, "w", encoding="utf-8", newline="") as f:
+        if suffix == ".csv":
+            f.write("question_id,question,image_path\n")
+            f.write("q1,What is AI?,\nq2,Describe,img.png\n")
+        elif suffix == ".json":
+            json.dump(rows, f)
+        else:
+            f.writelines(json.dumps(row) + "\n" for row in rows)
+
+    questions = list(load_questions_generator(str(file_path)))
+
+    assert [q.question_id for q in questions] == ["q1", "q2"]
+    assert all(isinstance(q, Question) for q in questions)
+    assert questions[1].image_path == "img.png"
+
+
+def test_load_questions_generator_unsupported_format(tmp_path):
+    """Test that unsupported inputs are rejected before anything is read."""
+    with pytest.raises(ValueError, match="Input file must be"):
+        load_questions_generator(str(tmp_path / "questions.txt"))
+
+
+def test_write_jsonl(tmp_path):
+    """Test writing models from an iterator to a new JSONL file."""
+    output_path = tmp_path / "output.jsonl"
+    models = (TestModel(name=f"test{i}", value=i) for i in range(3))
+
+    count = write_jsonl(models, str(output_path))
+
+    lines = output_path.read_text(encoding="utf-8").splitlines()
+    assert count == 3
+    assert [json.loads(line)["name"] for line in lines] == ["test0", "test1", "test2"]
@@ -1,10 +1,25 @@
 import base64
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
 from PIL import Image
 
-from llmbatch.utils.images import encode_image, get_base64_image
+from llmbatch.utils import images
+from llmbatch.utils.images import (
+    ImageCache,
+    configure_image_cache,
+    encode_image,
+    get_base64_image,
+)
+
+
+@pytest.fixture(autouse=True)
+def restore_image_cache():
+    """Restore the module-global image cache replaced by `configure_image_cache`."""
+    image_cache = images.get_image_cache()
+    yield
+    images._image_cache = image_cache
 
 
 @pytest.fixture
@@ -98,3 +113,57 @@ def test_encode_image_unsupported_format(tmp_path):
         encode_image(unsupported_path)
 
     assert "Unsupported image format" in str(excinfo.value)
+
+
+def test_encode_image_uses_cache(temp_image_file):
+    """Test that an image is only encoded once per content and parameters."""
+    cache = configure_image_cache()
+    png_path = temp_image_file / "test_image.png"
+
+    with patch("PIL.Image.open", wraps=Image.open) as mock_open:
+        first = encode_image(png_path)
+        second = encode_image(png_path)
+        encode_image(png_path, max_size=(50, 50))
+
+    assert first == second
+    assert mock_open.call_count == 2
+    assert cache.hits == 1
+    assert cache.misses == 2
+
+
+def test_encode_image_cache_keyed_by_content(temp_image_file, tmp_path):
+    """Test that two paths with identical content share one cache entry."""
+    cache = configure_image_cache()
+    png_path = temp_image_file / "test_image.png"
+    copy_path = tmp_path / "copy.png"
+    copy_path.write_bytes(png_path.read_bytes())
+
+    assert encode_image(png_path) == encode_image(copy_path)
+    assert cache.hits == 1
+
+
+def test_encode_image_disk_cache(temp_image_file, tmp_path):
+    """Test that the on-disk cache is reused by a fresh cache instance."""
+    cache_dir = tmp_path / "image_cache"
+    png_path = temp_image_file / "test_image.png"
+    configure_image_cache(cache_dir=cache_dir)
+    expected = encode_image(png_path)
+
+    cache = configure_image_cache(cache_dir=cache_dir)
+    with patch("PIL.Image.open") as mock_open:
+        result = encode_image(png_path)
+
+    mock_open.assert_not_called()
+    assert result == expected
+    assert cache.hits == 1
+    assert len(list(cache_dir.iterdir())) == 1
+
+
+def test_image_cache_lru_eviction():
+    """Test that the in-memory cache keeps at most max_entries items."""
+    cache = ImageCache(max_entries=2)
+    for key in ["a", "b", "c"]:
+        cache.put(key, ("image/png", key))
+
+    assert cache.get("a") is None
+    assert cache.get("c") == ("image/png", "c")
@@ -144,3 +144,22 @@ def test_create_anthropic_body_with_image(mock_encode_image, tmp_path):
     assert body.messages[0]["content"][1]["source"]["type"] == "base64"
     assert body.messages[0]["content"][1]["source"]["media_type"] == "image/png"
     assert body.messages[0]["content"][1]["source"]["data"] == "mock_base64_data"
+
+
+def test_create_openai_body_image_first(mock_encode_image, tmp_path):
+    """Test that the image can precede the question to share a prompt prefix."""
+    image_path = tmp_path / "test.png"
+    image_path.touch()
+
+    body = create_openai_body(
+        "What's in this image?",
+        image_path=image_path,
+        image_first=True,
+        model="gpt-4-vision",
+        temperature=0.7,
+        max_tokens=1000,
+    )
+
+    content = body.messages[0]["content"]
+    assert [part["type"] for part in content] == ["image_url", "text"]
+    assert "image_first" not in body.model_dump()
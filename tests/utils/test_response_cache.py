@@ -0,0 +1,105 @@
+from openai.types.chat.chat_completion import ChatCompletion, Choice
+from openai.types.chat.chat_completion_message import ChatCompletionMessage
+
+from llmbatch.models.responses import Response
+from llmbatch.models.schemas import Body
+from llmbatch.utils.response_cache import ResponseCache, request_key
+
+
+def _body(content: str = "Hello", temperature: float = 0) -> Body:
+    return Body(
+        messages=[{"role": "user", "content": content}],
+        model="gemma2:2b",
+        temperature=temperature,
+        max_tokens=100,
+    )
+
+
+def _response(content: str = "Hi", status_code: int = 200) -> Response:
+    return Response(
+        status_code=status_code,
+        request_id="req-1",
+        body=ChatCompletion(
+            id="chatcmpl-1",
+            choices=[
+                Choice(
+                    finish_reason="stop",
+                    index=0,
+                    message=ChatCompletionMessage(content=content, role="assistant"),
+                )
+            ],
+            created=0,
+            model="gemma2:2b",
+            object="chat.completion",
+        ),
+    )
+
+
+def test_request_key_ignores_key_order():
+    # Arrange
+    body = _body()
+    reordered = Body(**dict(reversed(list(body.model_dump().items()))))
+
+    # Act / Assert
+    assert request_key(body) == request_key(reordered)
+    assert request_key(body) != request_key(_body("Other"))
+
+
+def test_cache_persists_across_instances(tmp_path):
+    # Arrange
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResponseCache(path)
+    cache.put(_body(), _response())
+    cache.close()
+
+    # Act
+    reopened = ResponseCache(path)
+    cached = reopened.get(_body())
+
+    # Assert
+    assert cached == _response()
+    assert reopened.size > 0
+    assert (reopened.hits, reopened.misses) == (1, 0)
+
+
+def test_cache_skips_sampled_and_failed_requests(tmp_path):
+    # Arrange
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+
+    # Act
+    cache.put(_body(temperature=0.7), _response())
+    cache.put(_body("Failed"), _response(status_code=500))
+
+    # Assert
+    assert cache.get(_body(temperature=0.7)) is None
+    assert cache.get(_body("Failed")) is None
+    assert cache.size == 0
+
+
+def test_cache_all_caches_sampled_requests(tmp_path):
+    # Arrange
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), cache_all=True)
+
+    # Act
+    cache.put(_body(temperature=0.7), _response())
+
+    # Assert
+    assert cache.get(_body(temperature=0.7)) == _response()
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    # Arrange
+    entry_size = len(_response("a").model_dump_json())
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_bytes=2 * entry_size)
+    cache.put(_body("a"), _response("a"))
+    cache.put(_body("b"), _response("b"))
+    cache.get(_body("a"))
+
+    # Act
+    cache.put(_body("c"), _response("c"))
+
+    # Assert
+    assert cache.evictions == 1
+    assert cache.get(_body("b")) is None
+    assert cache.get(_body("a")) is not None
+    assert cache.get(_body("c")) is not None
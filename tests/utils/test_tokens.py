@@ -0,0 +1,106 @@
+import base64
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from llmbatch.models.schemas import Body
+from llmbatch.utils.tokens import (
+    IMAGE_TOKENS,
+    estimate_image_tokens,
+    estimate_prompt_tokens,
+    estimate_request_tokens,
+    image_size,
+)
+
+
+def _image(size: tuple[int, int], format: str = "JPEG") -> bytes:
+    buffer = BytesIO()
+    Image.new("RGB", size).save(buffer, format=format)
+    return buffer.getvalue()
+
+
+def test_estimate_prompt_tokens_text():
+    """Test that text is counted at about four characters per token."""
+    body = Body(
+        messages=[{"role": "user", "content": "a" * 400}],
+        model="gpt-4",
+        temperature=0.0,
+        max_tokens=50,
+    )
+
+    assert 100 <= estimate_prompt_tokens(body) <= 110
+    assert estimate_request_tokens(body) == estimate_prompt_tokens(body) + 50
+
+
+def test_estimate_prompt_tokens_image_and_system():
+    """Test that images and an Anthropic-style system prompt are counted."""
+    body = Body(
+        messages=[
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": "Describe this image"},
+                    {"type": "image", "source": {"data": "..."}},
+                ],
+            }
+        ],
+        model="claude-3",
+        temperature=0.0,
+        max_tokens=50,
+        system="s" * 40,
+    )
+
+    assert estimate_prompt_tokens(body) > IMAGE_TOKENS + 10
+
+
+@pytest.mark.parametrize("format", ["PNG", "JPEG", "GIF", "WEBP"])
+def test_image_size_reads_header(format):
+    """Test that image dimensions are read without decoding the image."""
+    assert image_size(_image((640, 480), format)) == (640, 480)
+
+
+def test_estimate_image_tokens_jpeg_with_large_header():
+    """Test that a JPEG frame header behind a large ICC profile is found."""
+    buffer = BytesIO()
+    Image.new("RGB", (400, 300)).save(buffer, format="JPEG", icc_profile=b"\0" * 50_000)
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    part = {"type": "image", "source": {"type": "base64", "data": encoded}}
+
+    assert estimate_image_tokens(part, "anthropic") == 160
+
+
+def test_image_size_unknown_format():
+    assert image_size(b"not an image") is None
+
+
+@pytest.mark.parametrize(
+    ("size", "expected"),
+    [
+        ((1024, 1024), 765),  # 768x768: 4 tiles
+        ((2048, 4096), 1105),  # 1024x2048 -> 768x1536: 6 tiles
+        ((400, 300), 255),  # 1 tile
+    ],
+)
+def test_estimate_image_tokens_openai(size, expected):
+    encoded = base64.b64encode(_image(size)).decode()
+    part = {
+        "type": "image_url",
+        "image_url": {"url": f"data:image/jpeg;base64,{encoded}"},
+    }
+
+    assert estimate_image_tokens(part, "openai") == expected
+    assert estimate_image_tokens(part) == IMAGE_TOKENS
+
+
+def test_estimate_image_tokens_anthropic():
+    encoded = base64.b64encode(_image((1000, 750), "PNG")).decode()
+    part = {"type": "image", "source": {"type": "base64", "data": encoded}}
+
+    assert estimate_image_tokens(part, "anthropic") == 1000
+
+
+def test_estimate_image_tokens_remote_url_falls_back():
+    part = {"type": "image_url", "image_url": {"url": "https://example.com/a.png"}}
+
+    assert estimate_image_tokens(part, "openai") == IMAGE_TOKENS
@@ -0,0 +1,135 @@
+import asyncio
+import json
+import os
+import signal
+import time
+
+import pytest
+from pydantic import BaseModel
+
+from llmbatch.utils.writer import JsonlWriter, forward_sigterm
+
+
+class Record(BaseModel):
+    custom_id: str
+
+
+def _lines(path) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_writer_close_drains_queue(tmp_path):
+    """Test that every record handed to the writer is on disk after close."""
+    # Arrange
+    output_path = tmp_path / "out.jsonl"
+    writer = JsonlWriter(str(output_path), flush_interval=60)
+
+    # Act
+    for i in range(1000):
+        writer.write(Record(custom_id=f"q{i}"))
+    writer.close()
+
+    # Assert
+    assert [line["custom_id"] for line in _lines(output_path)] == [
+        f"q{i}" for i in range(1000)
+    ]
+    assert writer.flushed == 1000
+
+
+def test_writer_flushes_after_interval(tmp_path):
+    """Test that buffered records are flushed once the flush interval passes."""
+    # Arrange
+    output_path = tmp_path / "out.jsonl"
+    writer = JsonlWriter(str(output_path), flush_interval=0.05)
+
+    # Act
+    writer.write(Record(custom_id="q1"))
+    deadline = time.monotonic() + 5
+    while writer.flushed < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    # Assert
+    assert _lines(output_path) == [{"custom_id": "q1"}]
+    writer.close()
+
+
+def test_writer_flushes_every_n_records(tmp_path):
+    """Test that the writer flushes after `flush_every` records."""
+    # Arrange
+    output_path = tmp_path / "out.jsonl"
+    writer = JsonlWriter(str(output_path), flush_interval=60, flush_every=2)
+
+    # Act
+    writer.write(Record(custom_id="q1"))
+    writer.write(Record(custom_id="q2"))
+    deadline = time.monotonic() + 5
+    while writer.flushed < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    # Assert
+    assert len(_lines(output_path)) == 2
+    writer.close()
+
+
+def test_writer_creates_file_lazily(tmp_path):
+    """Test that a writer that received nothing leaves no file behind."""
+    # Arrange
+    output_path = tmp_path / "dead_letter.jsonl"
+
+    # Act
+    JsonlWriter(str(output_path)).close()
+
+    # Assert
+    assert not output_path.exists()
+
+
+def test_writer_reports_errors(tmp_path):
+    """Test that a failure in the writer thread is raised to the caller."""
+    # Arrange
+    writer = JsonlWriter(str(tmp_path / "missing" / "out.jsonl"))
+
+    # Act
+    writer.write(Record(custom_id="q1"))
+
+    # Assert
+    with pytest.raises(FileNotFoundError):
+        writer.close()
+
+
+def test_writer_rejects_unknown_fsync_policy(tmp_path):
+    with pytest.raises(ValueError, match="fsync"):
+        JsonlWriter(str(tmp_path / "out.jsonl"), fsync="sometimes")  # type: ignore
+
+
+def test_forward_sigterm_drains_writer(tmp_path):
+    """Test that SIGTERM cancels `asyncio.run` like Ctrl-C and the writer drains."""
+    # Arrange
+    output_path = tmp_path / "out.jsonl"
+    writer = JsonlWriter(str(output_path), flush_interval=60)
+    handler = signal.getsignal(signal.SIGTERM)
+    cancelled = False
+
+    async def main():
+        nonlocal cancelled
+        for i in range(100):
+            writer.write(Record(custom_id=f"q{i}"))
+        os.kill(os.getpid(), signal.SIGTERM)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+
+    # Act
+    with pytest.raises(KeyboardInterrupt):
+        try:
+            with forward_sigterm():
+                asyncio.run(main())
+        finally:
+            writer.close()
+
+    # Assert
+    assert cancelled
+    assert len(_lines(output_path)) == 100
+    assert signal.getsignal(signal.SIGTERM) == handler